@@ -0,0 +1,141 @@
+"""
+Analysis - Thống kê latency bằng NumPy cho các run hàng triệu request
+- latency_summary: min/avg/p50/p95/p99/max (cùng định nghĩa với statistics.quantiles)
+- rolling_mean: trung bình trượt bằng cumulative sum, O(n) bất kể window
+- window_means: trung bình của N cửa sổ liên tiếp (np.add.reduceat)
+- bucket_counts / bucket_percentiles: đếm và percentile theo bucket thời gian (từng giây)
+- percentile_bands / band_box_stats: chia latency đã sắp xếp thành dải percentile cho boxplot
+- latency_histogram / binned_cdf: histogram và CDF theo số bin cố định
+- downsample: giảm điểm scatter về ngân sách cố định, giữ điểm max của mỗi bucket
+
+Các hàm vẽ chỉ nhận kết quả có kích thước cố định (bins, buckets, ngân sách điểm),
+nên thời gian vẽ không phụ thuộc số request của run.
+"""
+
+import numpy as np
+
+PLOT_POINT_BUDGET = 20000    # Số điểm scatter tối đa
+HIST_BINS = 100
+CDF_BINS = 1000
+MAX_FLIERS = 200             # Số outlier tối đa vẽ cho mỗi box
+
+def as_array(values):
+    return np.asarray(values, dtype=np.float64)
+
+def latency_summary(latencies):
+    """
+    min/avg/p50/p95/p99/max. method='weibull' = phương pháp 'exclusive' của
+    statistics.quantiles, nên số liệu khớp với các benchmark khác.
+    """
+    values = as_array(latencies)
+    p50, p95, p99 = np.percentile(values, [50, 95, 99], method='weibull')
+    return {
+        'count': len(values),
+        'min': float(values.min()),
+        'avg': float(values.mean()),
+        'p50': float(p50),
+        'p95': float(p95),
+        'p99': float(p99),
+        'max': float(values.max()),
+    }
+
+def rolling_mean(values, window):
+    """Trung bình của window điểm gần nhất tại mỗi vị trí (đầu chuỗi: trung bình từ điểm 0)"""
+    values = as_array(values)
+    n = len(values)
+    cumulative = np.concatenate(([0.0], np.cumsum(values)))
+    head = min(window, n)
+    means = np.empty(n)
+    means[:head] = cumulative[1:head + 1] / np.arange(1, head + 1)
+    means[head:] = (cumulative[head + 1:] - cumulative[1:n - head + 1]) / window
+    return means
+
+def window_means(values, num_windows):
+    """(vị trí bắt đầu, trung bình) của num_windows cửa sổ liên tiếp gần bằng nhau"""
+    values = as_array(values)
+    starts = np.unique(np.linspace(0, len(values), num=min(num_windows, len(values)) + 1,
+                                   dtype=int))[:-1]
+    sizes = np.diff(np.append(starts, len(values)))
+    return starts, np.add.reduceat(values, starts) / sizes
+
+def _bucket_index(times, width, num_buckets):
+    return np.clip((as_array(times) // width).astype(int), 0, num_buckets - 1)
+
+def bucket_counts(times, width, num_buckets, weights=None):
+    """Số điểm (hoặc tổng weights) trong mỗi bucket [k*width, (k+1)*width)"""
+    return np.bincount(_bucket_index(times, width, num_buckets), weights=weights,
+                       minlength=num_buckets)
+
+def bucket_percentiles(times, values, width, num_buckets, percentiles=(50, 99)):
+    """
+    Percentile của values trong từng bucket thời gian với 1 lần lexsort.
+    Chỉ số sorted[int(n * p / 100)] như cách tính theo từng giây trước đây.
+    Returns: (counts, {p: ndarray}); bucket rỗng là NaN.
+    """
+    buckets = _bucket_index(times, width, num_buckets)
+    values = as_array(values)
+    ordered = values[np.lexsort((values, buckets))]
+    counts = np.bincount(buckets, minlength=num_buckets)
+    if not len(ordered):
+        return counts, {p: np.full(num_buckets, np.nan) for p in percentiles}
+    starts = np.cumsum(counts) - counts
+    result = {}
+    for p in percentiles:
+        offsets = np.minimum(counts - 1, (counts * p / 100).astype(int))
+        picked = ordered[np.clip(starts + offsets, 0, len(ordered) - 1)]
+        result[p] = np.where(counts > 0, picked, np.nan)
+    return counts, result
+
+def percentile_bands(latencies, edges=(0, 50, 95, 99, 100)):
+    """Chia latency ĐÃ SẮP XẾP thành các dải percentile [edges[i], edges[i+1])"""
+    ordered = np.sort(as_array(latencies))
+    bounds = (np.asarray(edges) / 100 * len(ordered)).astype(int)
+    return [ordered[start:end] for start, end in zip(bounds[:-1], bounds[1:])]
+
+def band_box_stats(ordered, label, max_fliers=MAX_FLIERS):
+    """Thống kê box (whisker 1.5 IQR) của 1 dải đã sắp xếp cho Axes.bxp, outlier được lấy mẫu"""
+    if not len(ordered):
+        return {'label': label, 'med': np.nan, 'q1': np.nan, 'q3': np.nan,
+                'whislo': np.nan, 'whishi': np.nan, 'fliers': []}
+    q1, med, q3 = np.percentile(ordered, [25, 50, 75])
+    iqr = q3 - q1
+    low = np.searchsorted(ordered, q1 - 1.5 * iqr, side='left')
+    high = np.searchsorted(ordered, q3 + 1.5 * iqr, side='right') - 1
+    fliers = np.concatenate((ordered[:low], ordered[high + 1:]))
+    if len(fliers) > max_fliers:
+        fliers = fliers[np.linspace(0, len(fliers) - 1, max_fliers).astype(int)]
+    return {'label': label, 'med': med, 'q1': q1, 'q3': q3,
+            'whislo': ordered[low], 'whishi': ordered[max(high, low)], 'fliers': fliers}
+
+def latency_histogram(latencies, bins=HIST_BINS):
+    """(counts, edges) - vẽ bằng Axes.stairs thay vì đưa toàn bộ điểm cho Axes.hist"""
+    return np.histogram(as_array(latencies), bins=bins)
+
+def binned_cdf(latencies, bins=CDF_BINS):
+    """(latency tại cạnh phải mỗi bin, % tích lũy); bin theo thang log khi latency > 0"""
+    values = as_array(latencies)
+    low, high = values.min(), values.max()
+    if low > 0 and high > low:
+        edges = np.geomspace(low, high, bins + 1)
+    else:
+        edges = np.linspace(low, high if high > low else low + 1, bins + 1)
+    counts, edges = np.histogram(values, bins=edges)
+    return edges[1:], np.cumsum(counts) / len(values) * 100
+
+def downsample(values, budget=PLOT_POINT_BUDGET):
+    """
+    (chỉ số gốc, giá trị) của tối đa budget điểm: 1 nửa lấy đều theo bước (hình dạng
+    phân phối), 1 nửa là điểm max của mỗi bucket để spike vẫn hiện trên biểu đồ.
+    """
+    values = as_array(values)
+    n = len(values)
+    if n <= budget:
+        return np.arange(n), values
+    size = int(np.ceil(n / (budget // 2)))
+    num_buckets = int(np.ceil(n / size))
+    padded = np.full(num_buckets * size, -np.inf)
+    padded[:n] = values
+    peaks = np.arange(num_buckets) * size + padded.reshape(num_buckets, size).argmax(axis=1)
+    strided = np.linspace(0, n - 1, budget - num_buckets).astype(int)
+    indices = np.unique(np.concatenate((strided, peaks)))
+    return indices, values[indices]
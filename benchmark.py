@@ -6,6 +6,7 @@ Test 3 kịch bản:
 3. Read Conversations (SELECT by user)
 """
 
+import argparse
 import asyncio
 import time
 import random
@@ -13,6 +14,12 @@ import uuid
 from cassandra.cluster import Cluster
 from cassandra.query import SimpleStatement, ConsistencyLevel
 import statistics
+from workload_manifest import get_sample_data as sample_ids
+from concurrency_control import (
+    GradientConcurrencyLimiter, run_adaptive, parse_concurrency, wait_for_response
+)
+from results_io import add_results_arguments, save_results, render_after_run
+from report import print_sweep_table
 
 # Configuration
 CONTACT_POINTS = ['127.0.0.1']
@@ -22,6 +29,37 @@ KEYSPACE = 'realtime_chat_app'
 # Benchmark parameters
 NUM_OPERATIONS = 10000  # Số operations mỗi test
 NUM_THREADS = 50        # Số concurrent threads
+AUTO_MAX_CONCURRENCY = 2048  # Trần cho chế độ --concurrency auto
+
+# Concurrency sweep (--sweep)
+SWEEP_LEVELS = [1, 8, 32, 128, 512]  # Các mức concurrency mặc định
+SWEEP_OPERATIONS = 5000              # Số operations đo mỗi mức
+SWEEP_WARMUP = 500                   # Số operations warmup mỗi mức (không tính)
+
+async def run_operations(make_operation, num_ops, concurrency):
+    """
+    Chạy num_ops operation (make_operation() trả về coroutine -> latency ms).
+    concurrency: số operation mỗi đợt gather, hoặc 'auto' để limiter tự điều chỉnh.
+    Returns: (latencies, total_time, concurrency thực tế/hội tụ)
+    """
+    start_time = time.time()
+    
+    if concurrency == 'auto':
+        limiter = GradientConcurrencyLimiter(max_limit=AUTO_MAX_CONCURRENCY)
+        latencies = await run_adaptive(make_operation, num_ops, limiter)
+        return latencies, time.time() - start_time, limiter.converged_limit()
+    
+    latencies = []
+    for i in range(0, num_ops, concurrency):
+        batch = [make_operation() for _ in range(min(concurrency, num_ops - i))]
+        results = await asyncio.gather(*batch)
+        latencies.extend(results)
+        
+        # Progress
+        if (i + concurrency) % 1000 == 0:
+            print(f"   ✓ Hoàn thành: {min(i+concurrency, num_ops):,}/{num_ops:,}")
+    
+    return latencies, time.time() - start_time, concurrency
 
 def connect_to_cassandra():
     """Kết nối đến Cassandra"""
@@ -31,16 +69,9 @@ def connect_to_cassandra():
     return session, cluster
 
 def get_sample_data(session):
-    """Lấy mẫu IDs để test"""
-    # Lấy 100 user IDs
-    users = session.execute("SELECT user_id FROM users_by_id LIMIT 100")
-    user_ids = [row.user_id for row in users]
-    
-    # Lấy 100 conversation IDs
-    convos = session.execute("SELECT conversation_id FROM conversations_by_user LIMIT 500")
-    
-    # Loại bỏ duplicates thủ công
-    conversation_ids = list(set([row.conversation_id for row in convos]))[:100]
+    """IDs để test: toàn bộ keyspace từ workload manifest, hoặc lấy mẫu theo token ring"""
+    user_ids, conversation_ids = sample_ids(session, num_users=100, num_conversations=100,
+                                            keyspace=KEYSPACE)
     
     print(f"📋 Lấy mẫu: {len(user_ids)} users, {len(conversation_ids)} conversations")
     return user_ids, conversation_ids
@@ -67,42 +98,30 @@ async def worker_write_message(session, conversation_ids, user_ids):
          "Benchmark test message", [])
     )
     
-    loop = asyncio.get_event_loop()
-    await loop.run_in_executor(None, future.result)
+    await wait_for_response(future)
     
     latency_ms = (time.perf_counter() - start) * 1000
     return latency_ms
 
-async def benchmark_write_messages(session, conversation_ids, user_ids, num_ops):
+async def benchmark_write_messages(session, conversation_ids, user_ids, num_ops,
+                                   concurrency=NUM_THREADS):
     """Benchmark: INSERT messages"""
     print(f"\n{'='*60}")
     print(f"📝 BENCHMARK 1: WRITE MESSAGES")
     print(f"{'='*60}")
     print(f"Số operations: {num_ops:,}")
-    print(f"Concurrency: {NUM_THREADS} threads")
-    
-    latencies = []
-    start_time = time.time()
-    
-    # Tạo tasks
-    tasks = []
-    for _ in range(num_ops):
-        tasks.append(worker_write_message(session, conversation_ids, user_ids))
-    
-    # Chạy concurrent với batch
-    batch_size = NUM_THREADS
-    for i in range(0, len(tasks), batch_size):
-        batch = tasks[i:i+batch_size]
-        results = await asyncio.gather(*batch)
-        latencies.extend(results)
-        
-        # Progress
-        if (i + batch_size) % 1000 == 0:
-            print(f"   ✓ Hoàn thành: {min(i+batch_size, num_ops):,}/{num_ops:,}")
+    print(f"Concurrency: {concurrency}" + (" (gradient limiter)" if concurrency == 'auto' else " threads"))
     
-    total_time = time.time() - start_time
+    latencies, total_time, effective_concurrency = await run_operations(
+        lambda: worker_write_message(session, conversation_ids, user_ids),
+        num_ops, concurrency
+    )
     
-    # Calculate metrics
+    return summarize_results(latencies, total_time, effective_concurrency, concurrency == 'auto')
+
+def summarize_results(latencies, total_time, effective_concurrency, is_auto):
+    """Tính và in metrics của 1 benchmark"""
+    num_ops = len(latencies)
     throughput = num_ops / total_time
     p50 = statistics.median(latencies)
     p95 = statistics.quantiles(latencies, n=20)[18]
@@ -114,13 +133,16 @@ async def benchmark_write_messages(session, conversation_ids, user_ids, num_ops)
     print(f"   - Latency p50: {p50:.2f}ms")
     print(f"   - Latency p95: {p95:.2f}ms")
     print(f"   - Latency p99: {p99:.2f}ms")
+    if is_auto:
+        print(f"   - Concurrency hội tụ: {effective_concurrency} in-flight")
     
     return {
         'total_time': total_time,
         'throughput': throughput,
         'p50': p50,
         'p95': p95,
-        'p99': p99
+        'p99': p99,
+        'concurrency': effective_concurrency
     }
 
 # ============================================================================
@@ -140,61 +162,118 @@ async def worker_read_messages(session, conversation_ids):
     start = time.perf_counter()
     
     future = session.execute_async(query, (conversation_id,))
-    loop = asyncio.get_event_loop()
-    result = await loop.run_in_executor(None, future.result)
+    result = await wait_for_response(future)
     
     latency_ms = (time.perf_counter() - start) * 1000
     return latency_ms
 
-async def benchmark_read_messages(session, conversation_ids, num_ops):
+async def benchmark_read_messages(session, conversation_ids, num_ops, concurrency=NUM_THREADS):
     """Benchmark: SELECT messages"""
     print(f"\n{'='*60}")
     print(f"📖 BENCHMARK 2: READ MESSAGES")
     print(f"{'='*60}")
     print(f"Số operations: {num_ops:,}")
-    print(f"Concurrency: {NUM_THREADS} threads")
+    print(f"Concurrency: {concurrency}" + (" (gradient limiter)" if concurrency == 'auto' else " threads"))
     
-    latencies = []
-    start_time = time.time()
+    latencies, total_time, effective_concurrency = await run_operations(
+        lambda: worker_read_messages(session, conversation_ids),
+        num_ops, concurrency
+    )
     
-    tasks = []
-    for _ in range(num_ops):
-        tasks.append(worker_read_messages(session, conversation_ids))
+    return summarize_results(latencies, total_time, effective_concurrency, concurrency == 'auto')
+
+# ============================================================================
+# BENCHMARK 3: CONCURRENCY SWEEP
+# ============================================================================
+async def run_closed_loop(make_operation, num_ops, concurrency):
+    """
+    Closed-loop đúng `concurrency` request in-flight: mỗi worker gửi request mới
+    ngay khi request trước hoàn thành (khác với gather theo đợt, in-flight không
+    bị tụt về 0 ở cuối mỗi batch).
+    Returns: (latencies, total_time)
+    """
+    latencies = []
+    remaining = num_ops
     
-    batch_size = NUM_THREADS
-    for i in range(0, len(tasks), batch_size):
-        batch = tasks[i:i+batch_size]
-        results = await asyncio.gather(*batch)
-        latencies.extend(results)
-        
-        if (i + batch_size) % 1000 == 0:
-            print(f"   ✓ Hoàn thành: {min(i+batch_size, num_ops):,}/{num_ops:,}")
+    async def worker():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            latencies.append(await make_operation())
     
-    total_time = time.time() - start_time
-    throughput = num_ops / total_time
-    p50 = statistics.median(latencies)
-    p95 = statistics.quantiles(latencies, n=20)[18]
-    p99 = statistics.quantiles(latencies, n=100)[98]
+    start_time = time.time()
+    await asyncio.gather(*[worker() for _ in range(min(concurrency, num_ops))])
+    return latencies, time.time() - start_time
+
+async def benchmark_concurrency_sweep(operations, levels, num_ops, warmup_ops):
+    """
+    Chạy từng operation ở từng mức concurrency (có warmup mỗi bước).
+    Little's law: N = X * W  =>  W = N / X là thời gian mỗi request "chiếm" 1 slot.
+    So với latency đo được R: W ≈ R nghĩa là client giữ đủ N request in-flight;
+    W >> R nghĩa là client (event loop/driver) là nút cổ chai, không phải cluster.
+    """
+    print(f"\n{'='*60}")
+    print(f"📐 BENCHMARK 3: CONCURRENCY SWEEP")
+    print(f"{'='*60}")
+    print(f"Mức concurrency: {', '.join(str(c) for c in levels)}")
+    print(f"Mỗi bước: {warmup_ops:,} warmup + {num_ops:,} operations")
     
-    print(f"\n📊 KẾT QUẢ:")
-    print(f"   - Tổng thời gian: {total_time:.2f}s")
-    print(f"   - Throughput: {throughput:.2f} ops/s")
-    print(f"   - Latency p50: {p50:.2f}ms")
-    print(f"   - Latency p95: {p95:.2f}ms")
-    print(f"   - Latency p99: {p99:.2f}ms")
+    results = {}
+    for op_name, make_operation in operations.items():
+        results[op_name] = []
+        for concurrency in levels:
+            await run_closed_loop(make_operation, warmup_ops, concurrency)
+            latencies, total_time = await run_closed_loop(make_operation, num_ops, concurrency)
+            
+            throughput = num_ops / total_time
+            mean_latency = statistics.mean(latencies)
+            step = {
+                'concurrency': concurrency,
+                'throughput': throughput,
+                'p50': statistics.median(latencies),
+                'p99': statistics.quantiles(latencies, n=100)[98],
+                'mean': mean_latency,
+                'little_latency': concurrency / throughput * 1000,  # W = N / X (ms)
+            }
+            step['client_overhead'] = step['little_latency'] - mean_latency
+            results[op_name].append(step)
+            
+            print(f"   ✓ {op_name.upper():<6} c={concurrency:<4} {throughput:>9,.0f} ops/s | "
+                  f"p50 {step['p50']:.1f}ms | p99 {step['p99']:.1f}ms | "
+                  f"N/X {step['little_latency']:.1f}ms")
     
-    return {
-        'total_time': total_time,
-        'throughput': throughput,
-        'p50': p50,
-        'p95': p95,
-        'p99': p99
-    }
+    return results
+
+def summary_metrics(results):
+    """Metric phẳng cho artifact: {op}.{metric} (chạy 1 mức) hoặc {op}.c{N}.{metric} (sweep)"""
+    summary = {}
+    for op_name, result in results.items():
+        if isinstance(result, list):
+            for step in result:
+                summary.update({f"{op_name}.c{step['concurrency']}.{metric}": step[metric]
+                                for metric in ('throughput', 'p50', 'p99')})
+        else:
+            summary.update({f"{op_name}.{metric}": result[metric]
+                            for metric in ('throughput', 'p50', 'p95', 'p99')})
+    return summary
 
 # ============================================================================
 # MAIN
 # ============================================================================
 async def main():
+    parser = argparse.ArgumentParser(description='Cassandra Chat App Benchmark')
+    parser.add_argument('--concurrency', type=parse_concurrency, default=NUM_THREADS,
+                        help="Số request đồng thời, hoặc 'auto' để tự tìm điểm knee")
+    parser.add_argument('--sweep', nargs='?', const=','.join(str(c) for c in SWEEP_LEVELS),
+                        default=None, metavar='LEVELS',
+                        help='Quét các mức concurrency (vd: 1,8,32,128,512) thay vì chạy 1 mức')
+    parser.add_argument('--sweep-ops', type=int, default=SWEEP_OPERATIONS,
+                        help='Số operations đo mỗi mức khi sweep')
+    parser.add_argument('--warmup', type=int, default=SWEEP_WARMUP,
+                        help='Số operations warmup mỗi mức khi sweep')
+    add_results_arguments(parser, 'benchmark')
+    args = parser.parse_args()
+    
     print("\n" + "="*60)
     print("🚀 CASSANDRA BENCHMARK - CHAT APP")
     print("="*60)
@@ -205,24 +284,45 @@ async def main():
         # Lấy sample data
         user_ids, conversation_ids = get_sample_data(session)
         
+        if args.sweep:
+            levels = sorted(int(c) for c in args.sweep.split(','))
+            results = await benchmark_concurrency_sweep(
+                {
+                    'write': lambda: worker_write_message(session, conversation_ids, user_ids),
+                    'read': lambda: worker_read_messages(session, conversation_ids),
+                },
+                levels, args.sweep_ops, args.warmup
+            )
+            print_sweep_table(results)
+            save_results(args.results, 'benchmark', summary_metrics(results),
+                         {'mode': 'sweep', 'sweep': results}, args)
+            render_after_run(args.results, args.no_report)
+            return
+        
         # Benchmark 1: Write Messages
         write_results = await benchmark_write_messages(
-            session, conversation_ids, user_ids, NUM_OPERATIONS
+            session, conversation_ids, user_ids, NUM_OPERATIONS, args.concurrency
         )
         
         # Benchmark 2: Read Messages
         read_results = await benchmark_read_messages(
-            session, conversation_ids, NUM_OPERATIONS
+            session, conversation_ids, NUM_OPERATIONS, args.concurrency
         )
         
         # Summary
         print(f"\n{'='*60}")
         print("📈 TỔNG KẾT")
         print("="*60)
-        print(f"WRITE: {write_results['throughput']:.0f} ops/s (p95: {write_results['p95']:.1f}ms)")
-        print(f"READ:  {read_results['throughput']:.0f} ops/s (p95: {read_results['p95']:.1f}ms)")
+        print(f"WRITE: {write_results['throughput']:.0f} ops/s (p95: {write_results['p95']:.1f}ms, "
+              f"p99: {write_results['p99']:.1f}ms, concurrency: {write_results['concurrency']})")
+        print(f"READ:  {read_results['throughput']:.0f} ops/s (p95: {read_results['p95']:.1f}ms, "
+              f"p99: {read_results['p99']:.1f}ms, concurrency: {read_results['concurrency']})")
         print("="*60 + "\n")
         
+        single = {'write': write_results, 'read': read_results}
+        save_results(args.results, 'benchmark', summary_metrics(single),
+                     dict(single, mode='single'), args)
+        
     finally:
         cluster.shutdown()
 
@@ -0,0 +1,256 @@
+"""
+Bucketed vs Single-Partition Messages Benchmark
+So sánh messages_by_conversation (1 partition / conversation) với
+messages_by_conversation_bucketed (schema_alternatives.cql) trên CÙNG dữ liệu:
+1. Write throughput (ghi toàn bộ tin nhắn vào từng thiết kế)
+2. Latency đọc trang mới nhất
+3. Latency deep-scroll (đọc trang ở sâu trong lịch sử, cursor keyset)
+Các conversation sinh ra được xóa khỏi cả 2 thiết kế khi kết thúc (kể cả khi lỗi),
+để không để lại partition lớn mồ côi trong keyspace thật.
+
+Yêu cầu: đã chạy schema.cql và schema_alternatives.cql.
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from faker import Faker
+
+from benchmark import connect_to_cassandra, run_closed_loop
+from bucketed_messages import (
+    BUCKET_SECONDS, DEFAULT_BUCKET, BucketedMessageStore, MessageStore, bucket_of
+)
+from data_generator import (
+    create_fake_conversation, create_fake_user, interleave_timelines, sample_partition_sizes
+)
+from report import print_bucketed_report
+from results_io import add_results_arguments, save_results, render_after_run
+
+# Dataset parameters
+NUM_USERS = 500
+NUM_CONVERSATIONS = 200       # Conversation mới, chỉ dùng cho benchmark này
+NUM_MESSAGES = 100_000        # Chia theo Pareto nên có vài group chat rất lớn
+HISTORY_DAYS = 180            # Conversation bắt đầu trong khoảng [HISTORY_DAYS/2, HISTORY_DAYS] ngày trước
+GROUP_RATIO = 0.3
+
+# Benchmark parameters
+WRITE_CONCURRENCY = 64
+READ_CONCURRENCY = 16
+READ_OPERATIONS = 2000        # Số lần đọc mỗi kịch bản, mỗi thiết kế
+READ_WARMUP = 200
+PAGE_SIZE = 50
+DEEP_SCROLL_MIN_PAGE = 10     # Deep-scroll: đọc trang thứ >= 10 tính từ mới nhất
+
+# ============================================================================
+# DATASET
+# ============================================================================
+def generate_dataset(num_conversations, num_messages, history_days):
+    """
+    Sinh conversation và tin nhắn (timeline dạng burst của data_generator).
+    Returns: (messages theo thứ tự ghi, {conversation_id: [message_id mới nhất trước]})
+    """
+    print(f"\n🎲 Sinh {num_messages:,} messages cho {num_conversations:,} conversations "
+          f"({history_days} ngày lịch sử)...")
+    fake = Faker()
+    users = [create_fake_user(fake) for _ in range(NUM_USERS)]
+
+    conversations = []
+    for _ in range(num_conversations):
+        convo = create_fake_conversation(users, fake, random.random() < GROUP_RATIO)
+        convo['created_at'] = datetime.now() - timedelta(
+            days=random.uniform(history_days / 2, history_days))
+        conversations.append(convo)
+
+    sizes = sample_partition_sizes(num_conversations, num_messages)
+    messages = list(interleave_timelines(conversations, sizes, fake))
+
+    timelines = {}
+    for msg in messages:
+        timelines.setdefault(msg['conversation_id'], []).append(msg['message_id'])
+    for message_ids in timelines.values():
+        message_ids.reverse()
+
+    largest = max(len(ids) for ids in timelines.values())
+    print(f"✅ Partition lớn nhất (single): {largest:,} messages")
+    return messages, timelines
+
+def print_bucket_stats(timelines, bucket_seconds):
+    """Số partition và kích thước partition lớn nhất của thiết kế bucketed"""
+    bucket_sizes = {}
+    for conversation_id, message_ids in timelines.items():
+        for message_id in message_ids:
+            key = (conversation_id, bucket_of(message_id, bucket_seconds))
+            bucket_sizes[key] = bucket_sizes.get(key, 0) + 1
+    print(f"   Bucketed: {len(bucket_sizes):,} partitions, lớn nhất "
+          f"{max(bucket_sizes.values()):,} messages, trung bình "
+          f"{statistics.mean(bucket_sizes.values()):.1f}")
+
+def build_read_targets(timelines, num_ops, page_size):
+    """
+    Danh sách (conversation_id, vị trí bắt đầu trang) dùng chung cho cả 2 thiết kế.
+    Deep-scroll chỉ chọn conversation có >= DEEP_SCROLL_MIN_PAGE + 1 trang.
+    """
+    conversation_ids = list(timelines)
+    latest = [(random.choice(conversation_ids), 0) for _ in range(num_ops)]
+
+    deep_candidates = [cid for cid, ids in timelines.items()
+                       if len(ids) > DEEP_SCROLL_MIN_PAGE * page_size]
+    deep = []
+    for _ in range(num_ops if deep_candidates else 0):
+        cid = random.choice(deep_candidates)
+        max_page = (len(timelines[cid]) - 1) // page_size
+        deep.append((cid, random.randint(DEEP_SCROLL_MIN_PAGE, max_page) * page_size))
+    return latest, deep
+
+# ============================================================================
+# BENCHMARK
+# ============================================================================
+def summarize(latencies, total_time, queries, num_ops):
+    return {
+        'throughput': num_ops / total_time,
+        'p50': statistics.median(latencies),
+        'p99': statistics.quantiles(latencies, n=100)[98],
+        'queries_per_op': queries / num_ops,
+    }
+
+async def benchmark_writes(store, messages, concurrency):
+    """Ghi toàn bộ messages vào 1 thiết kế (closed-loop)"""
+    print(f"\n📝 WRITE [{store.name}]: {len(messages):,} messages, concurrency {concurrency}")
+    stream = iter(messages)
+
+    async def write_one():
+        msg = next(stream)
+        start = time.perf_counter()
+        await store.write(msg)
+        return (time.perf_counter() - start) * 1000
+
+    store.queries = 0
+    latencies, total_time = await run_closed_loop(write_one, len(messages), concurrency)
+    result = summarize(latencies, total_time, store.queries, len(messages))
+    print(f"   {result['throughput']:,.0f} msgs/s | p50 {result['p50']:.2f}ms | "
+          f"p99 {result['p99']:.2f}ms | {result['queries_per_op']:.2f} requests/msg")
+    return result
+
+async def benchmark_reads(store, targets, timelines, page_size, concurrency, label):
+    """Đọc 1 trang cho mỗi target; kiểm tra trang trả về đúng message_id mong đợi"""
+    print(f"\n📖 {label.upper()} [{store.name}]: {len(targets):,} pages, concurrency {concurrency}")
+    mismatches = 0
+
+    def make_reader(items):
+        stream = iter(items)
+
+        async def read_one():
+            nonlocal mismatches
+            conversation_id, offset = next(stream)
+            message_ids = timelines[conversation_id]
+            cursor = store.cursor_before(message_ids[offset - 1]) if offset else None
+
+            start = time.perf_counter()
+            rows, _ = await store.read_page(conversation_id, page_size, cursor)
+            latency = (time.perf_counter() - start) * 1000
+
+            if [row.message_id for row in rows] != message_ids[offset:offset + page_size]:
+                mismatches += 1
+            return latency
+        return read_one
+
+    warmup = targets[:READ_WARMUP]
+    await run_closed_loop(make_reader(warmup), len(warmup), concurrency)
+
+    mismatches = 0
+    store.queries = 0
+    latencies, total_time = await run_closed_loop(make_reader(targets), len(targets), concurrency)
+    result = summarize(latencies, total_time, store.queries, len(targets))
+    result['mismatches'] = mismatches
+    print(f"   p50 {result['p50']:.2f}ms | p99 {result['p99']:.2f}ms | "
+          f"{result['queries_per_op']:.2f} queries/page"
+          + (f" | ⚠️  {mismatches} trang sai nội dung" if mismatches else ""))
+    return result
+
+async def cleanup_stores(stores, timelines):
+    """Xóa dữ liệu benchmark đã ghi; lỗi khi dọn chỉ cảnh báo (không che lỗi của lượt chạy)"""
+    print(f"\n🧹 Xóa {len(timelines):,} conversations benchmark...")
+    for store in stores:
+        try:
+            deleted = await store.cleanup(timelines)
+            print(f"   ✓ {store.name}: {deleted:,} partitions")
+        except Exception as e:
+            print(f"   ⚠️  {store.name}: không xóa được ({type(e).__name__}: {e})")
+
+# ============================================================================
+# ARTIFACT
+# ============================================================================
+def summary_metrics(results):
+    """{design}.write.throughput, {design}.{write|latest|deep}_p99"""
+    summary = {}
+    for name, r in results.items():
+        summary[f"{name}.write.throughput"] = r['write']['throughput']
+        for scenario in ('write', 'latest', 'deep'):
+            if scenario in r:
+                summary[f"{name}.{scenario}_p99"] = r[scenario]['p99']
+    return summary
+
+# ============================================================================
+# MAIN
+# ============================================================================
+async def main():
+    parser = argparse.ArgumentParser(description='So sánh bảng messages 1 partition vs time bucket')
+    parser.add_argument('--bucket', choices=sorted(BUCKET_SECONDS), default=DEFAULT_BUCKET,
+                        help=f'Kích thước bucket (mặc định {DEFAULT_BUCKET})')
+    parser.add_argument('--conversations', type=int, default=NUM_CONVERSATIONS)
+    parser.add_argument('--messages', type=int, default=NUM_MESSAGES)
+    parser.add_argument('--history-days', type=int, default=HISTORY_DAYS)
+    parser.add_argument('--read-ops', type=int, default=READ_OPERATIONS,
+                        help=f'Số trang đọc mỗi kịch bản (mặc định {READ_OPERATIONS})')
+    parser.add_argument('--page-size', type=int, default=PAGE_SIZE)
+    parser.add_argument('--write-concurrency', type=int, default=WRITE_CONCURRENCY)
+    parser.add_argument('--read-concurrency', type=int, default=READ_CONCURRENCY)
+    add_results_arguments(parser, 'bucketed')
+    args = parser.parse_args()
+
+    print("\n" + "="*60)
+    print("🪣 BUCKETED vs SINGLE-PARTITION MESSAGES BENCHMARK")
+    print("="*60)
+
+    session, cluster = connect_to_cassandra()
+    stores, timelines = [], None
+    try:
+        messages, timelines = generate_dataset(args.conversations, args.messages, args.history_days)
+        print_bucket_stats(timelines, BUCKET_SECONDS[args.bucket])
+        latest_targets, deep_targets = build_read_targets(timelines, args.read_ops, args.page_size)
+        if not deep_targets:
+            print(f"⚠️  Không có conversation nào > {DEEP_SCROLL_MIN_PAGE} trang, bỏ qua deep-scroll")
+
+        stores = [MessageStore(session), BucketedMessageStore(session, args.bucket)]
+        results = {store.name: {} for store in stores}
+
+        # Ghi cùng dữ liệu vào cả 2 thiết kế trước, rồi mới đo đọc
+        for store in stores:
+            results[store.name]['write'] = await benchmark_writes(
+                store, messages, args.write_concurrency)
+
+        for scenario, targets in [('latest', latest_targets), ('deep', deep_targets)]:
+            if not targets:
+                continue
+            for store in stores:
+                results[store.name][scenario] = await benchmark_reads(
+                    store, targets, timelines, args.page_size, args.read_concurrency,
+                    'latest page' if scenario == 'latest' else 'deep scroll')
+
+        print_bucketed_report(results)
+
+        # Artifact + visualization (report.py)
+        save_results(args.results, 'bucketed', summary_metrics(results),
+                     {'results': results, 'deep_min_page': DEEP_SCROLL_MIN_PAGE}, args)
+        render_after_run(args.results, args.no_report)
+    finally:
+        if stores and timelines:
+            await cleanup_stores(stores, timelines)
+        cluster.shutdown()
+
+if __name__ == "__main__":
+    asyncio.run(main())
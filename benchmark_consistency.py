@@ -1,33 +1,98 @@
 """
 Benchmark Consistency Levels - Test hiệu suất với các mức độ consistency khác nhau
-So sánh: ONE vs QUORUM vs ALL
+So sánh: ONE / LOCAL_ONE / TWO / LOCAL_QUORUM / QUORUM / ALL
+Với mỗi level chạy:
+1. Write-only (INSERT messages_by_conversation)
+2. Read-only (SELECT tin nhắn mới nhất của 1 conversation)
+Sau đó chạy workload trộn read/write (READ_RATIO) với các cặp (W, R) trong
+CL_PAIRS để chọn cặp consistency level cho write và read theo chi phí đo được.
+
+Mỗi trial chạy tất cả cấu hình theo thứ tự ngẫu nhiên (mỗi cấu hình có warmup
+riêng), lặp NUM_TRIALS lần; kết quả là trung bình ± khoảng tin cậy 95% (t-Student)
+giữa các trial, để thứ tự chạy và cache nóng không làm lệch so sánh.
 """
 
+import argparse
 import asyncio
 import time
 import random
 import uuid
 from cassandra.cluster import Cluster
-from cassandra.query import SimpleStatement, ConsistencyLevel
+from cassandra.query import ConsistencyLevel
 import statistics
-import matplotlib.pyplot as plt
-import numpy as np
+from workload_manifest import get_sample_data as sample_ids
+from benchmark import run_closed_loop
+from concurrency_control import wait_for_response
+from results_io import add_results_arguments, save_results, render_after_run
+from report import summarize, print_consistency_report
 
 # Configuration
 CONTACT_POINTS = ['127.0.0.1']
 PORT = 9042
 KEYSPACE = 'realtime_chat_app'
+REPLICATION_FACTOR = 3  # Theo schema.cql, dùng để kiểm tra R + W > RF
 
 # Test parameters
-NUM_OPERATIONS = 5000
+NUM_OPERATIONS = 2000    # Số operations đo mỗi cấu hình, mỗi trial
+WARMUP_OPERATIONS = 300  # Số operations warmup trước mỗi lần đo (không tính)
+NUM_TRIALS = 5
 NUM_THREADS = 50
+READ_LIMIT = 20          # Số tin nhắn mỗi lần đọc (1 trang chat)
+READ_RATIO = 0.8         # Tỷ lệ read trong workload trộn (chat: đọc nhiều hơn ghi)
 
-# Mapping consistency level values to names
+# Mapping consistency level values to names (thứ tự từ yếu đến mạnh)
 CL_NAMES = {
     ConsistencyLevel.ONE: 'ONE',
+    ConsistencyLevel.LOCAL_ONE: 'LOCAL_ONE',
+    ConsistencyLevel.TWO: 'TWO',
+    ConsistencyLevel.LOCAL_QUORUM: 'LOCAL_QUORUM',
     ConsistencyLevel.QUORUM: 'QUORUM',
     ConsistencyLevel.ALL: 'ALL'
 }
+CL_BY_NAME = {name: cl for cl, name in CL_NAMES.items()}
+CONSISTENCY_LEVELS = list(CL_NAMES)
+
+# Các cặp (write CL, read CL) cho workload trộn
+CL_PAIRS = [
+    (ConsistencyLevel.ONE, ConsistencyLevel.ONE),
+    (ConsistencyLevel.QUORUM, ConsistencyLevel.ONE),
+    (ConsistencyLevel.ONE, ConsistencyLevel.QUORUM),
+    (ConsistencyLevel.QUORUM, ConsistencyLevel.QUORUM),
+    (ConsistencyLevel.LOCAL_QUORUM, ConsistencyLevel.LOCAL_QUORUM),
+    (ConsistencyLevel.ALL, ConsistencyLevel.ONE),
+    (ConsistencyLevel.ONE, ConsistencyLevel.ALL),
+]
+
+def parse_level(text):
+    try:
+        return CL_BY_NAME[text.upper()]
+    except KeyError:
+        raise argparse.ArgumentTypeError(
+            f"Consistency level không hợp lệ: {text} (chọn: {', '.join(CL_BY_NAME)})")
+
+def replicas_required(consistency_level, rf=REPLICATION_FACTOR):
+    """Số replica phải phản hồi (cluster 1 datacenter nên LOCAL_* = không LOCAL)"""
+    return {
+        ConsistencyLevel.ONE: 1,
+        ConsistencyLevel.LOCAL_ONE: 1,
+        ConsistencyLevel.TWO: 2,
+        ConsistencyLevel.QUORUM: rf // 2 + 1,
+        ConsistencyLevel.LOCAL_QUORUM: rf // 2 + 1,
+        ConsistencyLevel.ALL: rf,
+    }[consistency_level]
+
+def parse_pair(text):
+    """'QUORUM/ONE' -> (W, R)"""
+    try:
+        write_name, read_name = text.upper().split('/')
+        return CL_BY_NAME[write_name], CL_BY_NAME[read_name]
+    except (ValueError, KeyError):
+        raise argparse.ArgumentTypeError(
+            f"Cặp CL không hợp lệ: {text} (dạng W/R, ví dụ QUORUM/ONE; "
+            f"level: {', '.join(CL_BY_NAME)})")
+
+def pair_label(write_cl, read_cl):
+    return f"W={CL_NAMES[write_cl]}/R={CL_NAMES[read_cl]}"
 
 def connect_to_cassandra():
     """Kết nối đến Cassandra"""
@@ -37,273 +102,225 @@ def connect_to_cassandra():
     return session, cluster
 
 def get_sample_data(session):
-    """Lấy mẫu IDs để test"""
-    users = session.execute("SELECT user_id FROM users_by_id LIMIT 100")
-    user_ids = [row.user_id for row in users]
-    
-    convos = session.execute("SELECT conversation_id FROM conversations_by_user LIMIT 500")
-    conversation_ids = list(set([row.conversation_id for row in convos]))[:100]
-    
+    """IDs để test: toàn bộ keyspace từ workload manifest, hoặc lấy mẫu theo token ring"""
+    user_ids, conversation_ids = sample_ids(session, num_users=100, num_conversations=100,
+                                            keyspace=KEYSPACE)
+
     print(f"📋 Lấy mẫu: {len(user_ids)} users, {len(conversation_ids)} conversations")
     return user_ids, conversation_ids
 
 # ============================================================================
-# WRITE BENCHMARK với các Consistency Level khác nhau
+# OPERATIONS với các Consistency Level khác nhau
 # ============================================================================
-async def worker_write_cl(session, conversation_ids, user_ids, consistency_level):
-    """Worker: Write với consistency level chỉ định"""
-    conversation_id = random.choice(conversation_ids)
-    sender_id = random.choice(user_ids)
-    
-    query = """
-    INSERT INTO messages_by_conversation 
-    (conversation_id, message_id, sender_id, sender_username, text_content, attachments)
-    VALUES (%s, %s, %s, %s, %s, %s)
-    """
-    
-    statement = SimpleStatement(query, consistency_level=consistency_level)
-    
-    start = time.perf_counter()
-    
-    try:
-        future = session.execute_async(
-            statement,
-            (conversation_id, uuid.uuid1(), sender_id, "benchmark_user", 
-             "Consistency test message", [])
+class ConsistencyWorkload:
+    """Prepared statements cho write/read; CL gán trên từng bound statement"""
+
+    def __init__(self, session, conversation_ids, user_ids):
+        self.session = session
+        self.conversation_ids = conversation_ids
+        self.user_ids = user_ids
+        self._insert = session.prepare(
+            "INSERT INTO messages_by_conversation "
+            "(conversation_id, message_id, sender_id, sender_username, text_content, attachments) "
+            "VALUES (?, ?, ?, ?, ?, ?)"
+        )
+        self._select = session.prepare(
+            "SELECT message_id, sender_id, text_content FROM messages_by_conversation "
+            "WHERE conversation_id = ? LIMIT ?"
         )
-        
-        loop = asyncio.get_event_loop()
-        await loop.run_in_executor(None, future.result)
-        
-        latency_ms = (time.perf_counter() - start) * 1000
-        return latency_ms, True
-    except Exception as e:
-        latency_ms = (time.perf_counter() - start) * 1000
-        return latency_ms, False
-
-async def benchmark_consistency_level(session, conversation_ids, user_ids, 
-                                     consistency_level, num_ops):
-    """Benchmark với 1 consistency level"""
-    cl_name = CL_NAMES.get(consistency_level, str(consistency_level))
-    print(f"\n{'='*60}")
-    print(f"🔍 Testing Consistency Level: {cl_name}")
-    print(f"{'='*60}")
-    
-    latencies = []
-    failures = 0
-    start_time = time.time()
-    
-    tasks = []
-    for _ in range(num_ops):
-        tasks.append(worker_write_cl(session, conversation_ids, user_ids, consistency_level))
-    
-    batch_size = NUM_THREADS
-    for i in range(0, len(tasks), batch_size):
-        batch = tasks[i:i+batch_size]
-        results = await asyncio.gather(*batch)
-        
-        for latency, success in results:
-            latencies.append(latency)
-            if not success:
-                failures += 1
-        
-        if (i + batch_size) % 1000 == 0:
-            print(f"   ✓ Progress: {min(i+batch_size, num_ops):,}/{num_ops:,}")
-    
-    total_time = time.time() - start_time
-    
-    # Calculate metrics
-    throughput = num_ops / total_time
-    p50 = statistics.median(latencies)
+
+    async def _timed(self, statement, consistency_level):
+        statement.consistency_level = consistency_level
+        start = time.perf_counter()
+        try:
+            await wait_for_response(self.session.execute_async(statement))
+            success = True
+        except Exception:
+            success = False
+        return (time.perf_counter() - start) * 1000, success
+
+    async def write(self, consistency_level):
+        """Worker: Write với consistency level chỉ định"""
+        statement = self._insert.bind((
+            random.choice(self.conversation_ids), uuid.uuid1(), random.choice(self.user_ids),
+            "benchmark_user", "Consistency test message", []
+        ))
+        return await self._timed(statement, consistency_level)
+
+    async def read(self, consistency_level):
+        """Worker: Read trang tin nhắn mới nhất với consistency level chỉ định"""
+        statement = self._select.bind((random.choice(self.conversation_ids), READ_LIMIT))
+        return await self._timed(statement, consistency_level)
+
+def latency_stats(latencies):
     p95 = statistics.quantiles(latencies, n=20)[18] if len(latencies) > 20 else max(latencies)
     p99 = statistics.quantiles(latencies, n=100)[98] if len(latencies) > 100 else max(latencies)
-    avg = statistics.mean(latencies)
-    
-    print(f"\n📊 Kết quả {cl_name}:")
-    print(f"   - Throughput: {throughput:.2f} ops/s")
-    print(f"   - Latency avg: {avg:.2f}ms")
-    print(f"   - Latency p50: {p50:.2f}ms")
-    print(f"   - Latency p95: {p95:.2f}ms")
-    print(f"   - Latency p99: {p99:.2f}ms")
-    print(f"   - Failures: {failures}/{num_ops} ({failures/num_ops*100:.2f}%)")
-    
     return {
-        'cl_name': cl_name,
-        'throughput': throughput,
-        'avg': avg,
-        'p50': p50,
+        'avg': statistics.mean(latencies),
+        'p50': statistics.median(latencies),
         'p95': p95,
         'p99': p99,
-        'failures': failures,
-        'latencies': latencies
     }
 
+async def run_workload(workload, write_cl, read_cl, read_ratio, num_ops):
+    """
+    Chạy num_ops operation: read với xác suất read_ratio (CL = read_cl),
+    còn lại là write (CL = write_cl). Latency/failures ghi riêng theo loại.
+    """
+    per_op = {'write': {'latencies': [], 'failures': 0},
+              'read': {'latencies': [], 'failures': 0}}
+
+    async def run_one():
+        op = 'read' if random.random() < read_ratio else 'write'
+        if op == 'read':
+            latency, success = await workload.read(read_cl)
+        else:
+            latency, success = await workload.write(write_cl)
+        per_op[op]['latencies'].append(latency)
+        if not success:
+            per_op[op]['failures'] += 1
+        return latency
+
+    all_latencies, total_time = await run_closed_loop(run_one, num_ops, NUM_THREADS)
+
+    result = {
+        'throughput': len(all_latencies) / total_time,
+        'failures': sum(p['failures'] for p in per_op.values()),
+        'ops': {},
+    }
+    for op, data in per_op.items():
+        if not data['latencies']:
+            continue
+        stats = latency_stats(data['latencies'])
+        stats.update({
+            'count': len(data['latencies']),
+            'failures': data['failures'],
+            'throughput': len(data['latencies']) / total_time,
+        })
+        result['ops'][op] = stats
+    return result
+
+def build_configs(levels, pairs, read_ratio):
+    """
+    Danh sách cấu hình: write-only và read-only cho mỗi level, mixed cho mỗi cặp.
+    Key: ('write', cl) / ('read', cl) / ('mixed', (W, R))
+    """
+    configs = []
+    for cl in levels:
+        configs.append({'key': ('write', cl), 'write_cl': cl, 'read_cl': cl, 'read_ratio': 0.0,
+                        'label': f"{CL_NAMES[cl]} (write-only)"})
+        configs.append({'key': ('read', cl), 'write_cl': cl, 'read_cl': cl, 'read_ratio': 1.0,
+                        'label': f"{CL_NAMES[cl]} (read-only)"})
+    for write_cl, read_cl in pairs:
+        configs.append({'key': ('mixed', (write_cl, read_cl)), 'write_cl': write_cl,
+                        'read_cl': read_cl, 'read_ratio': read_ratio,
+                        'label': f"{pair_label(write_cl, read_cl)} (mixed)"})
+    return configs
+
+async def run_trials(workload, configs, num_trials, num_ops, warmup_ops):
+    """
+    Mỗi trial chạy mọi cấu hình theo thứ tự ngẫu nhiên, warmup trước mỗi lần đo.
+    Returns: {key: [kết quả từng trial]}
+    """
+    trials = {config['key']: [] for config in configs}
+    for trial in range(1, num_trials + 1):
+        order = random.sample(configs, len(configs))
+        print(f"\n🎲 Trial {trial}/{num_trials}: {len(order)} cấu hình (thứ tự ngẫu nhiên)")
+        for config in order:
+            args = (workload, config['write_cl'], config['read_cl'], config['read_ratio'])
+            if warmup_ops:
+                await run_workload(*args, warmup_ops)
+            result = await run_workload(*args, num_ops)
+            trials[config['key']].append(result)
+            print(f"   - {config['label']:<36} {result['throughput']:>9.2f} ops/s | " + ' | '.join(
+                f"{op} p50 {s['p50']:.2f}ms p99 {s['p99']:.2f}ms"
+                for op, s in result['ops'].items()))
+    return trials
+
 # ============================================================================
-# VISUALIZATION
+# ARTIFACT
 # ============================================================================
-def plot_consistency_comparison(results):
-    """Vẽ biểu đồ so sánh các consistency levels"""
-    fig, axes = plt.subplots(2, 2, figsize=(15, 10))
-    fig.suptitle('Consistency Level Performance Comparison', fontsize=16, fontweight='bold')
-    
-    cl_names = [r['cl_name'] for r in results]
-    colors = ['#2ecc71', '#3498db', '#e74c3c']
-    
-    # 1. Throughput comparison
-    ax1 = axes[0, 0]
-    throughputs = [r['throughput'] for r in results]
-    bars1 = ax1.bar(cl_names, throughputs, color=colors, alpha=0.7, edgecolor='black')
-    ax1.set_ylabel('Throughput (ops/s)', fontweight='bold')
-    ax1.set_title('Write Throughput by Consistency Level')
-    ax1.grid(axis='y', alpha=0.3)
-    
-    # Add value labels on bars
-    for bar in bars1:
-        height = bar.get_height()
-        ax1.text(bar.get_x() + bar.get_width()/2., height,
-                f'{height:.0f}',
-                ha='center', va='bottom', fontweight='bold')
-    
-    # 2. Latency comparison (p50, p95, p99)
-    ax2 = axes[0, 1]
-    x = np.arange(len(cl_names))
-    width = 0.25
-    
-    p50s = [r['p50'] for r in results]
-    p95s = [r['p95'] for r in results]
-    p99s = [r['p99'] for r in results]
-    
-    ax2.bar(x - width, p50s, width, label='p50', color='#2ecc71', alpha=0.7, edgecolor='black')
-    ax2.bar(x, p95s, width, label='p95', color='#f39c12', alpha=0.7, edgecolor='black')
-    ax2.bar(x + width, p99s, width, label='p99', color='#e74c3c', alpha=0.7, edgecolor='black')
-    
-    ax2.set_ylabel('Latency (ms)', fontweight='bold')
-    ax2.set_title('Latency Percentiles by Consistency Level')
-    ax2.set_xticks(x)
-    ax2.set_xticklabels(cl_names)
-    ax2.legend()
-    ax2.grid(axis='y', alpha=0.3)
-    
-    # 3. Latency distribution (histogram)
-    ax3 = axes[1, 0]
-    for i, result in enumerate(results):
-        ax3.hist(result['latencies'], bins=50, alpha=0.5, label=result['cl_name'], 
-                color=colors[i], edgecolor='black')
-    
-    ax3.set_xlabel('Latency (ms)', fontweight='bold')
-    ax3.set_ylabel('Frequency', fontweight='bold')
-    ax3.set_title('Latency Distribution')
-    ax3.legend()
-    ax3.grid(alpha=0.3)
-    
-    # 4. Cumulative Distribution Function (CDF)
-    ax4 = axes[1, 1]
-    for i, result in enumerate(results):
-        sorted_latencies = np.sort(result['latencies'])
-        cumulative = np.arange(1, len(sorted_latencies) + 1) / len(sorted_latencies) * 100
-        ax4.plot(sorted_latencies, cumulative, label=result['cl_name'], 
-                color=colors[i], linewidth=2)
-    
-    ax4.set_xlabel('Latency (ms)', fontweight='bold')
-    ax4.set_ylabel('Percentile (%)', fontweight='bold')
-    ax4.set_title('Cumulative Latency Distribution (CDF)')
-    ax4.legend()
-    ax4.grid(alpha=0.3)
-    ax4.axhline(y=50, color='gray', linestyle='--', alpha=0.5, label='p50')
-    ax4.axhline(y=95, color='orange', linestyle='--', alpha=0.5, label='p95')
-    ax4.axhline(y=99, color='red', linestyle='--', alpha=0.5, label='p99')
-    
-    plt.tight_layout()
-    plt.savefig('consistency_level_comparison.png', dpi=300, bbox_inches='tight')
-    print(f"\n📊 Biểu đồ đã lưu: consistency_level_comparison.png")
-    plt.show()
-
-def print_summary_table(results):
-    """In bảng tổng kết"""
-    print(f"\n{'='*80}")
-    print("📊 BẢNG TỔNG KẾT SO SÁNH CONSISTENCY LEVELS")
-    print(f"{'='*80}")
-    print(f"{'Metric':<20} {'ONE':<20} {'QUORUM':<20} {'ALL':<20}")
-    print(f"{'-'*80}")
-    
-    # Throughput
-    throughputs = [r['throughput'] for r in results]
-    print(f"{'Throughput (ops/s)':<20} {throughputs[0]:<20.2f} {throughputs[1]:<20.2f} {throughputs[2]:<20.2f}")
-    
-    # Latency p50
-    p50s = [r['p50'] for r in results]
-    print(f"{'Latency p50 (ms)':<20} {p50s[0]:<20.2f} {p50s[1]:<20.2f} {p50s[2]:<20.2f}")
-    
-    # Latency p95
-    p95s = [r['p95'] for r in results]
-    print(f"{'Latency p95 (ms)':<20} {p95s[0]:<20.2f} {p95s[1]:<20.2f} {p95s[2]:<20.2f}")
-    
-    # Latency p99
-    p99s = [r['p99'] for r in results]
-    print(f"{'Latency p99 (ms)':<20} {p99s[0]:<20.2f} {p99s[1]:<20.2f} {p99s[2]:<20.2f}")
-    
-    # Failures
-    failures = [r['failures'] for r in results]
-    print(f"{'Failures':<20} {failures[0]:<20} {failures[1]:<20} {failures[2]:<20}")
-    
-    print(f"{'='*80}")
-    
-    # Analysis
-    print(f"\n🔍 PHÂN TÍCH:")
-    print(f"   - Fastest: {results[0]['cl_name']} ({throughputs[0]:.0f} ops/s)")
-    print(f"   - Slowest: {results[2]['cl_name']} ({throughputs[2]:.0f} ops/s)")
-    print(f"   - Speed difference: {throughputs[0]/throughputs[2]:.2f}x")
-    print(f"   - Trade-off: {results[0]['cl_name']} nhanh nhưng ít đảm bảo, {results[2]['cl_name']} chậm nhưng đảm bảo cao")
+def config_key_name(key):
+    """('write', cl) -> 'write:ONE', ('mixed', (W, R)) -> 'mixed:QUORUM/ONE'"""
+    kind, value = key
+    if kind == 'mixed':
+        return f"mixed:{CL_NAMES[value[0]]}/{CL_NAMES[value[1]]}"
+    return f"{kind}:{CL_NAMES[value]}"
+
+def trials_to_data(trials, levels, pairs, read_ratio, num_trials):
+    """Dữ liệu artifact theo tên (report.print_consistency_report đọc dạng này)"""
+    return {
+        'levels': [CL_NAMES[cl] for cl in levels],
+        'pairs': [f"{CL_NAMES[w]}/{CL_NAMES[r]}" for w, r in pairs],
+        'strong': {f"{CL_NAMES[w]}/{CL_NAMES[r]}":
+                   replicas_required(w) + replicas_required(r) > REPLICATION_FACTOR
+                   for w, r in pairs},
+        'read_ratio': read_ratio,
+        'num_trials': num_trials,
+        'trials': {config_key_name(key): results for key, results in trials.items()},
+    }
+
+def summary_metrics(trials):
+    """Mean qua các trial: {config}.throughput và {config}.{op}_p99"""
+    summary = {}
+    for key, results in trials.items():
+        name = config_key_name(key).replace(':', '.')
+        summary[f"{name}.throughput"] = summarize(results, 'throughput')[0]
+        for op in ('write', 'read'):
+            p99 = summarize(results, (op, 'p99'))
+            if p99:
+                summary[f"{name}.{op}_p99"] = p99[0]
+    return summary
 
 # ============================================================================
 # MAIN
 # ============================================================================
 async def main():
+    parser = argparse.ArgumentParser(description='So sánh consistency levels cho read/write/mixed')
+    parser.add_argument('--levels', nargs='+', type=parse_level, default=CONSISTENCY_LEVELS,
+                        help=f"Các consistency level (mặc định: {' '.join(CL_BY_NAME)})")
+    parser.add_argument('--pairs', nargs='*', type=parse_pair, default=CL_PAIRS,
+                        help='Các cặp W/R cho workload trộn, ví dụ QUORUM/ONE ONE/ALL '
+                             '(để trống = bỏ qua workload trộn)')
+    parser.add_argument('--read-ratio', type=float, default=READ_RATIO,
+                        help='Tỷ lệ read trong workload trộn (0-1)')
+    parser.add_argument('--trials', type=int, default=NUM_TRIALS,
+                        help='Số trial lặp lại (mỗi trial đổi thứ tự ngẫu nhiên)')
+    parser.add_argument('--ops', type=int, default=NUM_OPERATIONS,
+                        help='Số operations đo mỗi cấu hình, mỗi trial')
+    parser.add_argument('--warmup', type=int, default=WARMUP_OPERATIONS,
+                        help='Số operations warmup trước mỗi lần đo')
+    add_results_arguments(parser, 'consistency')
+    args = parser.parse_args()
+    levels = list(dict.fromkeys(args.levels))
+    pairs = list(dict.fromkeys(args.pairs))
+
     print("\n" + "="*60)
     print("🚀 CONSISTENCY LEVEL BENCHMARK")
     print("="*60)
-    
+    print(f"Levels: {', '.join(CL_NAMES[cl] for cl in levels)}")
+    print(f"Pairs: {', '.join(pair_label(*p) for p in pairs) or '-'}")
+    print(f"{args.trials} trials x {args.ops:,} ops (warmup {args.warmup:,})")
+
     session, cluster = connect_to_cassandra()
-    
+
     try:
         user_ids, conversation_ids = get_sample_data(session)
-        
-        # Test 3 consistency levels
-        results = []
-        
-        # 1. ONE (fastest, least consistent)
-        result_one = await benchmark_consistency_level(
-            session, conversation_ids, user_ids, 
-            ConsistencyLevel.ONE, NUM_OPERATIONS
-        )
-        results.append(result_one)
-        
-        await asyncio.sleep(2)  # Cool down
-        
-        # 2. QUORUM (balanced)
-        result_quorum = await benchmark_consistency_level(
-            session, conversation_ids, user_ids, 
-            ConsistencyLevel.QUORUM, NUM_OPERATIONS
-        )
-        results.append(result_quorum)
-        
-        await asyncio.sleep(2)  # Cool down
-        
-        # 3. ALL (slowest, most consistent)
-        result_all = await benchmark_consistency_level(
-            session, conversation_ids, user_ids, 
-            ConsistencyLevel.ALL, NUM_OPERATIONS
-        )
-        results.append(result_all)
-        
+        workload = ConsistencyWorkload(session, conversation_ids, user_ids)
+
+        configs = build_configs(levels, pairs, args.read_ratio)
+        trials = await run_trials(workload, configs, args.trials, args.ops, args.warmup)
+
         # Summary
-        print_summary_table(results)
-        
-        # Visualization
-        plot_consistency_comparison(results)
-        
+        data = trials_to_data(trials, levels, pairs, args.read_ratio, args.trials)
+        print_consistency_report(data)
+
+        # Artifact + visualization (report.py)
+        save_results(args.results, 'consistency', summary_metrics(trials), data, args)
+        render_after_run(args.results, args.no_report)
+
     finally:
         cluster.shutdown()
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main())
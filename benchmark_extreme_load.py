@@ -3,6 +3,7 @@ Extreme Load Benchmark - Test với 1 triệu tin nhắn được ghi đồng th
 Mô phỏng spike traffic: Ví dụ Tết, event lớn
 """
 
+import argparse
 import asyncio
 import time
 import random
@@ -10,10 +11,12 @@ import uuid
 from cassandra.cluster import Cluster, ExecutionProfile, EXEC_PROFILE_DEFAULT
 from cassandra.policies import DCAwareRoundRobinPolicy, TokenAwarePolicy
 from cassandra.query import SimpleStatement, ConsistencyLevel
-import statistics
-import matplotlib.pyplot as plt
-import numpy as np
+from workload_manifest import get_sample_data as sample_ids
 from datetime import datetime
+from concurrency_control import (
+    GradientConcurrencyLimiter, run_adaptive, parse_concurrency, wait_for_response
+)
+from results_io import add_results_arguments, save_results, render_after_run
 
 # Configuration
 CONTACT_POINTS = ['127.0.0.1']
@@ -22,8 +25,8 @@ KEYSPACE = 'realtime_chat_app'
 
 # Extreme load parameters
 TARGET_MESSAGES = 1_000_000  # 1 triệu tin nhắn
-NUM_THREADS = 200            # Tăng concurrency
-BATCH_SIZE = 500             # Batch size lớn hơn
+BATCH_SIZE = 500             # Số request in-flight mỗi batch (chế độ concurrency cố định)
+AUTO_MAX_CONCURRENCY = 4096  # Trần cho chế độ --concurrency auto
 
 def connect_to_cassandra():
     """Kết nối với connection pool tối ưu"""
@@ -46,12 +49,9 @@ def connect_to_cassandra():
     return session, cluster
 
 def get_sample_data(session):
-    """Lấy mẫu IDs để test"""
-    users = session.execute("SELECT user_id FROM users_by_id LIMIT 1000")
-    user_ids = [row.user_id for row in users]
-    
-    convos = session.execute("SELECT conversation_id FROM conversations_by_user LIMIT 2000")
-    conversation_ids = list(set([row.conversation_id for row in convos]))[:1000]
+    """IDs để test: toàn bộ keyspace từ workload manifest, hoặc lấy mẫu theo token ring"""
+    user_ids, conversation_ids = sample_ids(session, num_users=1000, num_conversations=1000,
+                                            keyspace=KEYSPACE)
     
     print(f"📋 Lấy mẫu: {len(user_ids)} users, {len(conversation_ids)} conversations")
     return user_ids, conversation_ids
@@ -59,47 +59,56 @@ def get_sample_data(session):
 # ============================================================================
 # EXTREME LOAD WORKER
 # ============================================================================
+def prepare_write_statement(session):
+    """Prepare câu INSERT message dùng cho extreme load (CL ONE)"""
+    query = """
+    INSERT INTO messages_by_conversation 
+    (conversation_id, message_id, sender_id, sender_username, text_content, attachments)
+    VALUES (?, ?, ?, ?, ?, ?)
+    """
+    prepared_stmt = session.prepare(query)
+    prepared_stmt.consistency_level = ConsistencyLevel.ONE  # ONE cho throughput cao nhất
+    return prepared_stmt
+
+async def extreme_write(session, conversation_ids, user_ids, prepared_stmt):
+    """Ghi 1 tin nhắn spike; lỗi được raise (chế độ auto cần lỗi để limiter co lại)"""
+    future = session.execute_async(
+        prepared_stmt,
+        (random.choice(conversation_ids), uuid.uuid1(), random.choice(user_ids), "spike_user",
+         "Spike traffic message", [])
+    )
+    await wait_for_response(future)
+
 async def worker_extreme_write(session, conversation_ids, user_ids, prepared_stmt):
-    """Worker optimized cho extreme load"""
-    conversation_id = random.choice(conversation_ids)
-    sender_id = random.choice(user_ids)
-    
+    """Worker optimized cho extreme load: (latency ms, thành công), không raise"""
     start = time.perf_counter()
     
     try:
-        future = session.execute_async(
-            prepared_stmt,
-            (conversation_id, uuid.uuid1(), sender_id, "spike_user", 
-             "Spike traffic message", [])
-        )
-        
-        loop = asyncio.get_event_loop()
-        await loop.run_in_executor(None, future.result)
-        
+        await extreme_write(session, conversation_ids, user_ids, prepared_stmt)
         latency_ms = (time.perf_counter() - start) * 1000
         return latency_ms, True
     except Exception as e:
         latency_ms = (time.perf_counter() - start) * 1000
         return latency_ms, False
 
-async def benchmark_extreme_load(session, conversation_ids, user_ids, target_messages):
-    """Benchmark với extreme load"""
+async def benchmark_extreme_load(session, conversation_ids, user_ids, target_messages,
+                                 concurrency=BATCH_SIZE):
+    """
+    Benchmark với extreme load
+    concurrency: số request mỗi đợt gather, hoặc 'auto' để limiter tự tìm mức in-flight
+    """
     print(f"\n{'='*60}")
     print(f"🔥 EXTREME LOAD BENCHMARK")
     print(f"{'='*60}")
     print(f"Target: {target_messages:,} messages")
-    print(f"Concurrency: {NUM_THREADS} threads")
-    print(f"Batch size: {BATCH_SIZE}")
+    if concurrency == 'auto':
+        print(f"Concurrency: auto (gradient limiter, tối đa {AUTO_MAX_CONCURRENCY})")
+    else:
+        print(f"Concurrency: {concurrency} requests/batch")
     print()
     
     # Prepare statement (tối ưu performance)
-    query = """
-    INSERT INTO messages_by_conversation 
-    (conversation_id, message_id, sender_id, sender_username, text_content, attachments)
-    VALUES (?, ?, ?, ?, ?, ?)
-    """
-    prepared_stmt = session.prepare(query)
-    prepared_stmt.consistency_level = ConsistencyLevel.ONE  # ONE cho throughput cao nhất
+    prepared_stmt = prepare_write_statement(session)
     
     latencies = []
     failures = 0
@@ -110,23 +119,16 @@ async def benchmark_extreme_load(session, conversation_ids, user_ids, target_mes
     last_report_time = start_time
     last_report_count = 0
     
-    # Tạo tasks
-    tasks = []
-    for i in range(target_messages):
-        tasks.append(worker_extreme_write(session, conversation_ids, user_ids, prepared_stmt))
-    
     total_completed = 0
     
-    # Chạy với batches lớn
-    for i in range(0, len(tasks), BATCH_SIZE):
-        batch = tasks[i:i+BATCH_SIZE]
-        results = await asyncio.gather(*batch)
-        
-        for latency, success in results:
-            total_completed += 1
-            latencies.append(latency)
-            if not success:
-                failures += 1
+    def record(result):
+        """Ghi nhận 1 kết quả: latency, lỗi, báo cáo real-time và milestones"""
+        nonlocal total_completed, failures, last_report_time, last_report_count
+        latency, success = result
+        total_completed += 1
+        latencies.append(latency)
+        if not success:
+            failures += 1
         
         # Real-time metrics
         current_time = time.time()
@@ -144,18 +146,41 @@ async def benchmark_extreme_load(session, conversation_ids, user_ids, target_mes
         
         # Milestones
         progress = total_completed / target_messages
-        if progress >= 0.25 and len(milestone_labels) == 0:
-            milestone_times.append(time.time() - start_time)
-            milestone_labels.append("25%")
-            print(f"   ✓ Milestone: 25% @ {milestone_times[-1]:.1f}s")
-        elif progress >= 0.50 and len(milestone_labels) == 1:
-            milestone_times.append(time.time() - start_time)
-            milestone_labels.append("50%")
-            print(f"   ✓ Milestone: 50% @ {milestone_times[-1]:.1f}s")
-        elif progress >= 0.75 and len(milestone_labels) == 2:
-            milestone_times.append(time.time() - start_time)
-            milestone_labels.append("75%")
-            print(f"   ✓ Milestone: 75% @ {milestone_times[-1]:.1f}s")
+        for threshold, label in ((0.25, "25%"), (0.50, "50%"), (0.75, "75%")):
+            if progress >= threshold and label not in milestone_labels:
+                milestone_times.append(time.time() - start_time)
+                milestone_labels.append(label)
+                print(f"   ✓ Milestone: {label} @ {milestone_times[-1]:.1f}s")
+    
+    limiter = None
+    if concurrency == 'auto':
+        # Limiter tự điều chỉnh số request in-flight theo latency/throughput
+        limiter = GradientConcurrencyLimiter(max_limit=AUTO_MAX_CONCURRENCY)
+        
+        async def adaptive_write():
+            # Lỗi được ghi nhận rồi raise lại: limiter phải thấy timeout/overload để co lại,
+            # nếu không lỗi nhanh sẽ bị tính là mẫu latency thấp và đẩy limit lên
+            start = time.perf_counter()
+            try:
+                await extreme_write(session, conversation_ids, user_ids, prepared_stmt)
+            except Exception:
+                record(((time.perf_counter() - start) * 1000, False))
+                raise
+            return (time.perf_counter() - start) * 1000, True
+        
+        await run_adaptive(adaptive_write, target_messages, limiter, on_result=record,
+                           on_error=lambda error: None)
+        effective_concurrency = limiter.converged_limit()
+    else:
+        # Chạy với batches lớn (tạo task theo từng batch để không giữ 1 triệu coroutine)
+        for i in range(0, target_messages, concurrency):
+            batch = [
+                worker_extreme_write(session, conversation_ids, user_ids, prepared_stmt)
+                for _ in range(min(concurrency, target_messages - i))
+            ]
+            for result in await asyncio.gather(*batch):
+                record(result)
+        effective_concurrency = concurrency
     
     total_time = time.time() - start_time
     milestone_times.append(total_time)
@@ -163,12 +188,10 @@ async def benchmark_extreme_load(session, conversation_ids, user_ids, target_mes
     
     # Calculate metrics
     throughput = target_messages / total_time
-    p50 = statistics.median(latencies)
-    p95 = statistics.quantiles(latencies, n=20)[18]
-    p99 = statistics.quantiles(latencies, n=100)[98]
-    avg = statistics.mean(latencies)
-    min_lat = min(latencies)
-    max_lat = max(latencies)
+    from analysis import latency_summary
+    summary = latency_summary(latencies)
+    p50, p95, p99 = summary['p50'], summary['p95'], summary['p99']
+    avg, min_lat, max_lat = summary['avg'], summary['min'], summary['max']
     
     print(f"\n{'='*60}")
     print(f"🎉 HOÀN THÀNH!")
@@ -178,6 +201,9 @@ async def benchmark_extreme_load(session, conversation_ids, user_ids, target_mes
     print(f"   - Tổng thời gian: {total_time:.2f}s ({total_time/60:.2f} phút)")
     print(f"   - Throughput: {throughput:.2f} ops/s")
     print(f"   - Failures: {failures} ({failures/target_messages*100:.3f}%)")
+    if limiter is not None:
+        print(f"   - Concurrency hội tụ (auto): {effective_concurrency} in-flight "
+              f"(throughput {throughput:.0f} ops/s, p99 {p99:.2f}ms)")
     print()
     print(f"📈 LATENCY:")
     print(f"   - Min: {min_lat:.2f}ms")
@@ -204,176 +230,60 @@ async def benchmark_extreme_load(session, conversation_ids, user_ids, target_mes
         'min': min_lat,
         'max': max_lat,
         'milestone_times': milestone_times,
-        'milestone_labels': milestone_labels
+        'milestone_labels': milestone_labels,
+        'concurrency': effective_concurrency,
+        'concurrency_mode': 'auto' if limiter is not None else 'fixed',
+        'concurrency_history': limiter.history if limiter is not None else []
     }
 
 # ============================================================================
-# VISUALIZATION
+# ARTIFACT
 # ============================================================================
-def plot_extreme_load(result):
-    """Vẽ biểu đồ extreme load test"""
-    fig = plt.figure(figsize=(16, 10))
-    gs = fig.add_gridspec(3, 3, hspace=0.3, wspace=0.3)
-    
-    fig.suptitle(f'Extreme Load Test: {result["target"]:,} Messages', 
-                 fontsize=18, fontweight='bold')
-    
-    latencies = result['latencies']
-    
-    # 1. Summary metrics (text box) - Top left
-    ax1 = fig.add_subplot(gs[0, 0])
-    ax1.axis('off')
-    
-    summary_text = f"""
-    PERFORMANCE SUMMARY
-    {'='*30}
-    
-    Total Messages: {result['target']:,}
-    Duration: {result['total_time']:.1f}s ({result['total_time']/60:.1f}min)
-    Throughput: {result['throughput']:.0f} ops/s
-    Failures: {result['failures']} ({result['failures']/result['target']*100:.3f}%)
-    
-    LATENCY METRICS
-    {'='*30}
-    Min: {result['min']:.2f}ms
-    Avg: {result['avg']:.2f}ms
-    p50: {result['p50']:.2f}ms
-    p95: {result['p95']:.2f}ms
-    p99: {result['p99']:.2f}ms
-    Max: {result['max']:.2f}ms
+def artifact_data(result):
     """
+    Dữ liệu vẽ đã gom nhóm (kích thước cố định, không lưu latency thô): histogram,
+    CDF theo bin, scatter đã lấy mẫu, box stats theo dải percentile, throughput ước lượng.
+    """
+    import numpy as np
+    from analysis import (
+        latency_histogram, binned_cdf, downsample, percentile_bands, band_box_stats, window_means
+    )
     
-    ax1.text(0.1, 0.9, summary_text, transform=ax1.transAxes, 
-            fontsize=11, verticalalignment='top', fontfamily='monospace',
-            bbox=dict(boxstyle='round', facecolor='wheat', alpha=0.5))
-    
-    # 2. Milestone progress - Top middle & right
-    ax2 = fig.add_subplot(gs[0, 1:])
-    milestones = result['milestone_labels']
-    times = result['milestone_times']
-    
-    ax2.barh(milestones, times, color=['#2ecc71', '#3498db', '#f39c12', '#e74c3c'])
-    ax2.set_xlabel('Time (seconds)', fontweight='bold')
-    ax2.set_title('Progress Milestones')
-    ax2.grid(axis='x', alpha=0.3)
-    
-    for i, (label, time) in enumerate(zip(milestones, times)):
-        ax2.text(time, i, f' {time:.1f}s', va='center', fontweight='bold')
-    
-    # 3. Latency distribution - Middle left
-    ax3 = fig.add_subplot(gs[1, 0])
-    ax3.hist(latencies, bins=100, color='#3498db', alpha=0.7, edgecolor='black')
-    ax3.axvline(result['p50'], color='green', linestyle='--', linewidth=2, label=f'p50: {result["p50"]:.1f}ms')
-    ax3.axvline(result['p95'], color='orange', linestyle='--', linewidth=2, label=f'p95: {result["p95"]:.1f}ms')
-    ax3.axvline(result['p99'], color='red', linestyle='--', linewidth=2, label=f'p99: {result["p99"]:.1f}ms')
-    ax3.set_xlabel('Latency (ms)', fontweight='bold')
-    ax3.set_ylabel('Frequency', fontweight='bold')
-    ax3.set_title('Latency Distribution')
-    ax3.legend()
-    ax3.grid(alpha=0.3)
-    
-    # 4. Latency over time (scatter) - Middle middle
-    ax4 = fig.add_subplot(gs[1, 1])
-    sample_size = min(50000, len(latencies))  # Lấy mẫu để vẽ nhanh hơn
-    indices = np.random.choice(len(latencies), sample_size, replace=False)
-    sampled_latencies = [latencies[i] for i in sorted(indices)]
-    
-    ax4.scatter(range(len(sampled_latencies)), sampled_latencies, alpha=0.3, s=1, color='blue')
-    ax4.axhline(result['p95'], color='orange', linestyle='--', linewidth=1, label='p95')
-    ax4.set_xlabel('Operation #', fontweight='bold')
-    ax4.set_ylabel('Latency (ms)', fontweight='bold')
-    ax4.set_title(f'Latency Over Time (sample: {sample_size:,})')
-    ax4.legend()
-    ax4.grid(alpha=0.3)
-    
-    # 5. CDF - Middle right
-    ax5 = fig.add_subplot(gs[1, 2])
-    sorted_latencies = np.sort(latencies)
-    cumulative = np.arange(1, len(sorted_latencies) + 1) / len(sorted_latencies) * 100
-    ax5.plot(sorted_latencies, cumulative, linewidth=2, color='#2ecc71')
-    ax5.axhline(50, color='green', linestyle='--', alpha=0.5, label='p50')
-    ax5.axhline(95, color='orange', linestyle='--', alpha=0.5, label='p95')
-    ax5.axhline(99, color='red', linestyle='--', alpha=0.5, label='p99')
-    ax5.set_xlabel('Latency (ms)', fontweight='bold')
-    ax5.set_ylabel('Percentile (%)', fontweight='bold')
-    ax5.set_title('Cumulative Distribution (CDF)')
-    ax5.legend()
-    ax5.grid(alpha=0.3)
-    
-    # 6. Box plot percentiles - Bottom left
-    ax6 = fig.add_subplot(gs[2, 0])
-    
-    percentile_data = [
-        latencies[:int(len(latencies)*0.5)],    # Bottom 50%
-        latencies[int(len(latencies)*0.5):int(len(latencies)*0.95)],  # 50-95%
-        latencies[int(len(latencies)*0.95):int(len(latencies)*0.99)], # 95-99%
-        latencies[int(len(latencies)*0.99):]    # Top 1%
-    ]
-    
-    bp = ax6.boxplot(percentile_data, labels=['0-50%', '50-95%', '95-99%', '99-100%'],
-                     patch_artist=True)
-    
-    colors = ['#2ecc71', '#3498db', '#f39c12', '#e74c3c']
-    for patch, color in zip(bp['boxes'], colors):
-        patch.set_facecolor(color)
-        patch.set_alpha(0.7)
-    
-    ax6.set_ylabel('Latency (ms)', fontweight='bold')
-    ax6.set_title('Latency by Percentile Range')
-    ax6.grid(axis='y', alpha=0.3)
-    
-    # 7. Throughput estimation - Bottom middle
-    ax7 = fig.add_subplot(gs[2, 1])
-    
-    # Calculate throughput per time window
-    window_size = max(1, len(latencies) // 100)  # 100 windows
-    throughputs = []
-    time_points = []
-    
-    for i in range(0, len(latencies), window_size):
-        window = latencies[i:i+window_size]
-        if window:
-            # Estimate throughput (simplified)
-            avg_latency_sec = statistics.mean(window) / 1000
-            estimated_throughput = NUM_THREADS / avg_latency_sec if avg_latency_sec > 0 else 0
-            throughputs.append(estimated_throughput)
-            time_points.append(i / len(latencies) * result['total_time'])
-    
-    ax7.plot(time_points, throughputs, linewidth=2, color='#9b59b6')
-    ax7.axhline(result['throughput'], color='red', linestyle='--', 
-               label=f'Avg: {result["throughput"]:.0f} ops/s')
-    ax7.set_xlabel('Time (seconds)', fontweight='bold')
-    ax7.set_ylabel('Throughput (ops/s)', fontweight='bold')
-    ax7.set_title('Estimated Throughput Over Time')
-    ax7.legend()
-    ax7.grid(alpha=0.3)
-    
-    # 8. Comparison bar chart - Bottom right
-    ax8 = fig.add_subplot(gs[2, 2])
-    
-    metrics = ['Avg', 'p50', 'p95', 'p99']
-    values = [result['avg'], result['p50'], result['p95'], result['p99']]
-    colors = ['#3498db', '#2ecc71', '#f39c12', '#e74c3c']
-    
-    bars = ax8.bar(metrics, values, color=colors, alpha=0.7, edgecolor='black')
-    ax8.set_ylabel('Latency (ms)', fontweight='bold')
-    ax8.set_title('Latency Metrics Comparison')
-    ax8.grid(axis='y', alpha=0.3)
-    
-    for bar in bars:
-        height = bar.get_height()
-        ax8.text(bar.get_x() + bar.get_width()/2., height,
-                f'{height:.1f}ms',
-                ha='center', va='bottom', fontweight='bold')
-    
-    plt.savefig('extreme_load_benchmark.png', dpi=300, bbox_inches='tight')
-    print(f"\n📊 Biểu đồ đã lưu: extreme_load_benchmark.png")
-    plt.show()
+    latencies = np.asarray(result['latencies'])
+    counts, edges = latency_histogram(latencies)
+    cdf_latencies, cumulative = binned_cdf(latencies)
+    indices, sampled = downsample(latencies)
+    band_labels = ['0-50%', '50-95%', '95-99%', '99-100%']
+    starts, mean_latencies = window_means(latencies, 100)
+    return {
+        'stats': {key: value for key, value in result.items() if key != 'latencies'},
+        'histogram': {'counts': counts, 'edges': edges},
+        'cdf': {'latency': cdf_latencies, 'percent': cumulative},
+        'scatter': {'index': indices, 'latency': sampled},
+        'bands': [band_box_stats(band, label)
+                  for band, label in zip(percentile_bands(latencies), band_labels)],
+        # Little's law: concurrency / latency trung bình của 100 cửa sổ liên tiếp
+        'windows': {'time': starts / len(latencies) * result['total_time'],
+                    'mean_latency': mean_latencies},
+    }
+
+def summary_metrics(result):
+    summary = {key: result[key] for key in ('throughput', 'failures', 'avg', 'p50', 'p95', 'p99')}
+    summary['failure_rate'] = result['failures'] / result['target']
+    return summary
 
 # ============================================================================
 # MAIN
 # ============================================================================
 async def main():
+    parser = argparse.ArgumentParser(description='Extreme Load Benchmark')
+    parser.add_argument('--concurrency', type=parse_concurrency, default=BATCH_SIZE,
+                        help="Số request mỗi batch, hoặc 'auto' để tự tìm điểm knee")
+    parser.add_argument('--yes', action='store_true',
+                        help='Bỏ qua bước xác nhận (chạy không tương tác, vd. benchmark_runner.py)')
+    add_results_arguments(parser, 'extreme_load')
+    args = parser.parse_args()
+    
     print("\n" + "="*60)
     print("🔥 EXTREME LOAD BENCHMARK - 1 TRIỆU TIN NHẮN")
     print("="*60)
@@ -383,10 +293,11 @@ async def main():
     print("   - Mất 10-30 phút tùy hardware")
     print("="*60)
     
-    response = input("\n⚡ Bạn có muốn tiếp tục? (yes/no): ")
-    if response.lower() != 'yes':
-        print("❌ Đã hủy test")
-        return
+    if not args.yes:
+        response = input("\n⚡ Bạn có muốn tiếp tục? (yes/no): ")
+        if response.lower() != 'yes':
+            print("❌ Đã hủy test")
+            return
     
     session, cluster = connect_to_cassandra()
     
@@ -394,14 +305,17 @@ async def main():
         user_ids, conversation_ids = get_sample_data(session)
         
         result = await benchmark_extreme_load(
-            session, conversation_ids, user_ids, TARGET_MESSAGES
+            session, conversation_ids, user_ids, TARGET_MESSAGES, args.concurrency
         )
         
-        plot_extreme_load(result)
+        save_results(args.results, 'extreme_load', summary_metrics(result), artifact_data(result),
+                     args)
+        render_after_run(args.results, args.no_report)
         
         print(f"\n✅ Test hoàn thành!")
         print(f"🎉 Cassandra đã xử lý {TARGET_MESSAGES:,} messages trong {result['total_time']/60:.1f} phút")
-        print(f"⚡ Throughput trung bình: {result['throughput']:.0f} messages/s")
+        print(f"⚡ Throughput trung bình: {result['throughput']:.0f} messages/s "
+              f"@ concurrency {result['concurrency']} (p99 {result['p99']:.1f}ms)")
         
     finally:
         cluster.shutdown()
@@ -1,357 +1,393 @@
 """
 Fault Tolerance Benchmark - Test khả năng chống chịu lỗi của Cassandra
-Kịch bản: Tắt 1 node trong quá trình chạy benchmark
+Kịch bản theo timeline: tắt 1 node tại t1, khởi động lại tại t2, tiếp tục tải tới t3.
+Lỗi do FaultScheduler bắn theo giờ, song song với tải (--fault để tự định nghĩa
+lịch: stop/kill/start/pause/unpause container, hoặc lỗi mạng qua --proxy).
+Tải ghi QUORUM chạy liên tục suốt 3 pha; đo theo từng giây:
+- Throughput, latency p50/p99, tỷ lệ lỗi
+- Thời điểm driver đánh dấu node DOWN/UP (HostStateListener)
+- Số hint files đang chờ trên các node còn sống (nodetool listpendinghints)
+Báo cáo: time-to-detect, thời gian rejoin, time-to-steady-state sau khi node
+quay lại, và latency trong lúc hints được replay. Chuỗi theo giây kèm thời điểm
+chính xác của từng lỗi được lưu vào artifact fault_tolerance_results.json (report.py vẽ).
 """
 
+import argparse
 import asyncio
+import re
 import time
 import random
 import uuid
-import subprocess
+from collections import Counter
 from cassandra.cluster import Cluster
-from cassandra.query import SimpleStatement, ConsistencyLevel
-import statistics
-import matplotlib.pyplot as plt
-from datetime import datetime
+from cassandra.policies import HostStateListener
+from cassandra.query import ConsistencyLevel
+from workload_manifest import get_sample_data as sample_ids
+from concurrency_control import wait_for_response
+from fault_scheduler import (
+    DISRUPTIVE_ACTIONS, RECOVERY_ACTIONS, FaultScheduler, describe, docker, kill_restart_steps,
+    parse_step
+)
+from results_io import add_results_arguments, save_results, render_after_run
+from report import print_fault_tolerance_report
 
 # Configuration
 CONTACT_POINTS = ['127.0.0.1']
 PORT = 9042
 KEYSPACE = 'realtime_chat_app'
+NODES = ['cassandra-1', 'cassandra-2', 'cassandra-3']
 
 # Test parameters
-NUM_OPERATIONS = 10000
 NUM_THREADS = 50
 NODE_TO_KILL = 'cassandra-2'  # Node sẽ bị tắt
-KILL_AT_OPERATION = 5000       # Tắt node sau operation thứ 5000
+KILL_AT = 30.0                # t1: giây tắt node
+RESTART_AT = 90.0             # t2: giây khởi động lại node
+END_AT = 240.0                # t3: giây kết thúc tải
 
-def connect_to_cassandra():
-    """Kết nối đến Cassandra"""
-    cluster = Cluster(CONTACT_POINTS, port=PORT)
+# Recovery
+BASELINE_SKIP = 5             # Bỏ qua vài giây đầu (warmup) khi tính baseline
+STEADY_WINDOW = 5             # Số giây liên tiếp đạt ngưỡng để coi là ổn định
+STEADY_THROUGHPUT = 0.9       # >= 90% throughput baseline
+STEADY_P99 = 1.5              # <= 1.5x p99 baseline
+HINT_POLL_INTERVAL = 2.0      # Giây giữa 2 lần đọc pending hints
+
+HINTS_ROW = re.compile(r'^\s*[0-9a-f-]{36}\s+(\S+)\s+\S+\s+\S+\s+\S+\s+(\d+)')
+
+def connect_to_cassandra(cluster_kwargs=None):
+    """Kết nối đến Cassandra (cluster_kwargs: đi qua fault proxy)"""
+    cluster = Cluster(**cluster_kwargs) if cluster_kwargs else Cluster(CONTACT_POINTS, port=PORT)
     session = cluster.connect(KEYSPACE)
     print(f"✅ Kết nối thành công đến {KEYSPACE}")
     return session, cluster
 
 def get_sample_data(session):
-    """Lấy mẫu IDs để test"""
-    users = session.execute("SELECT user_id FROM users_by_id LIMIT 100")
-    user_ids = [row.user_id for row in users]
-    
-    convos = session.execute("SELECT conversation_id FROM conversations_by_user LIMIT 500")
-    conversation_ids = list(set([row.conversation_id for row in convos]))[:100]
-    
-    return user_ids, conversation_ids
-
-def kill_node(node_name):
-    """Tắt 1 Cassandra node"""
-    try:
-        subprocess.run(['docker', 'stop', node_name], check=True, capture_output=True)
-        return True
-    except subprocess.CalledProcessError:
-        return False
+    """IDs để test: toàn bộ keyspace từ workload manifest, hoặc lấy mẫu theo token ring"""
+    return sample_ids(session, num_users=100, num_conversations=100, keyspace=KEYSPACE)
 
-def start_node(node_name):
-    """Khởi động lại node"""
-    try:
-        subprocess.run(['docker', 'start', node_name], check=True, capture_output=True)
-        return True
-    except subprocess.CalledProcessError:
-        return False
+# ============================================================================
+# OBSERVERS
+# ============================================================================
+class HostEventRecorder(HostStateListener):
+    """Ghi lại thời điểm driver thấy host DOWN/UP (gọi từ thread của driver)"""
+
+    def __init__(self, start_time):
+        self.start_time = start_time
+        self.events = []
+
+    def _record(self, kind, host):
+        elapsed = time.time() - self.start_time
+        self.events.append((elapsed, kind, host.address))
+        print(f"   📡 [{elapsed:6.1f}s] Driver: host {host.address} {kind.upper()}")
+
+    def on_up(self, host):
+        self._record('up', host)
+
+    def on_down(self, host):
+        self._record('down', host)
+
+    def on_add(self, host):
+        self._record('add', host)
+
+    def on_remove(self, host):
+        self._record('remove', host)
+
+    def first(self, kind, after):
+        return next((t for t, k, _ in self.events if k == kind and t >= after), None)
+
+def parse_pending_hints(output):
+    """Tổng số hint files đang chờ trong output của nodetool listpendinghints"""
+    return sum(int(match.group(2)) for match in map(HINTS_ROW.match, output.splitlines()) if match)
+
+async def poll_pending_hints(nodes, start_time, end_time, samples):
+    """Đọc pending hints trên các node còn sống định kỳ (node bị tắt thì lệnh lỗi, bỏ qua)"""
+    while time.time() < end_time:
+        total, answered = 0, 0
+        for node in nodes:
+            ok, output = await docker('exec', node, 'nodetool', 'listpendinghints')
+            if ok:
+                total += parse_pending_hints(output)
+                answered += 1
+        if answered:
+            samples.append((time.time() - start_time, total))
+        await asyncio.sleep(HINT_POLL_INTERVAL)
 
 # ============================================================================
 # BENCHMARK với Node Failure
 # ============================================================================
-async def worker_write_fault_tolerant(session, conversation_ids, user_ids):
-    """Worker: Write message với fault tolerance"""
-    conversation_id = random.choice(conversation_ids)
-    sender_id = random.choice(user_ids)
-    
-    query = """
-    INSERT INTO messages_by_conversation 
-    (conversation_id, message_id, sender_id, sender_username, text_content, attachments)
-    VALUES (%s, %s, %s, %s, %s, %s)
-    """
-    
-    # Sử dụng QUORUM để vẫn hoạt động khi 1 node down
-    statement = SimpleStatement(query, consistency_level=ConsistencyLevel.QUORUM)
-    
-    start = time.perf_counter()
-    
-    try:
-        future = session.execute_async(
-            statement,
-            (conversation_id, uuid.uuid1(), sender_id, "fault_test", 
-             "Fault tolerance test", [])
+class FaultTolerantWriter:
+    """Write QUORUM để vẫn hoạt động khi 1/3 nodes down"""
+
+    def __init__(self, session, conversation_ids, user_ids):
+        self.session = session
+        self.conversation_ids = conversation_ids
+        self.user_ids = user_ids
+        self._insert = session.prepare(
+            "INSERT INTO messages_by_conversation "
+            "(conversation_id, message_id, sender_id, sender_username, text_content, attachments) "
+            "VALUES (?, ?, ?, ?, ?, ?)"
         )
-        
-        loop = asyncio.get_event_loop()
-        await loop.run_in_executor(None, future.result)
-        
-        latency_ms = (time.perf_counter() - start) * 1000
-        return latency_ms, True, 'success'
-    except Exception as e:
-        latency_ms = (time.perf_counter() - start) * 1000
-        error_type = type(e).__name__
-        return latency_ms, False, error_type
-
-async def benchmark_fault_tolerance(session, conversation_ids, user_ids, num_ops):
-    """Benchmark với node failure simulation"""
-    print(f"\n{'='*60}")
-    print(f"🛡️ FAULT TOLERANCE BENCHMARK")
-    print(f"{'='*60}")
-    print(f"Sẽ tắt node '{NODE_TO_KILL}' sau {KILL_AT_OPERATION} operations")
-    print(f"Consistency Level: QUORUM (cần 2/3 nodes)")
-    print()
-    
-    latencies = []
-    failures = []
-    timestamps = []
-    error_types = []
-    node_killed = False
-    operation_count = 0
-    
-    start_time = time.time()
-    
-    tasks = []
-    for _ in range(num_ops):
-        tasks.append(worker_write_fault_tolerant(session, conversation_ids, user_ids))
-    
-    batch_size = NUM_THREADS
-    for i in range(0, len(tasks), batch_size):
-        batch = tasks[i:i+batch_size]
-        results = await asyncio.gather(*batch)
-        
-        for latency, success, error_type in results:
-            operation_count += 1
-            elapsed = time.time() - start_time
-            
-            latencies.append(latency)
-            timestamps.append(elapsed)
-            
-            if not success:
-                failures.append({
-                    'operation': operation_count,
-                    'timestamp': elapsed,
-                    'error': error_type
-                })
-                error_types.append(error_type)
-            
-            # Tắt node khi đạt số operation chỉ định
-            if operation_count == KILL_AT_OPERATION and not node_killed:
-                print(f"\n🔴 KILLING NODE: {NODE_TO_KILL} (operation {operation_count})")
-                if kill_node(NODE_TO_KILL):
-                    print(f"   ✓ Node {NODE_TO_KILL} stopped")
-                    node_killed = True
-                else:
-                    print(f"   ✗ Failed to stop node")
-        
-        if (i + batch_size) % 1000 == 0:
-            print(f"   ✓ Progress: {min(i+batch_size, num_ops):,}/{num_ops:,} "
-                  f"(Failures: {len(failures)})")
-    
-    total_time = time.time() - start_time
-    
-    # Restart node
-    if node_killed:
-        print(f"\n🟢 RESTARTING NODE: {NODE_TO_KILL}")
-        if start_node(NODE_TO_KILL):
-            print(f"   ✓ Node {NODE_TO_KILL} restarted")
-        else:
-            print(f"   ✗ Failed to restart node")
-    
-    # Calculate metrics
-    throughput = num_ops / total_time
-    p50 = statistics.median(latencies)
-    p95 = statistics.quantiles(latencies, n=20)[18] if len(latencies) > 20 else max(latencies)
-    p99 = statistics.quantiles(latencies, n=100)[98] if len(latencies) > 100 else max(latencies)
-    
-    # Metrics before/after failure
-    latencies_before = [latencies[i] for i in range(min(KILL_AT_OPERATION, len(latencies)))]
-    latencies_after = [latencies[i] for i in range(KILL_AT_OPERATION, len(latencies))]
-    
-    p95_before = statistics.quantiles(latencies_before, n=20)[18] if len(latencies_before) > 20 else 0
-    p95_after = statistics.quantiles(latencies_after, n=20)[18] if len(latencies_after) > 20 else 0
-    
-    print(f"\n📊 KẾT QUẢ TỔNG THỂ:")
-    print(f"   - Tổng operations: {num_ops:,}")
-    print(f"   - Throughput: {throughput:.2f} ops/s")
-    print(f"   - Latency p50: {p50:.2f}ms")
-    print(f"   - Latency p95: {p95:.2f}ms")
-    print(f"   - Latency p99: {p99:.2f}ms")
-    print(f"   - Total failures: {len(failures)} ({len(failures)/num_ops*100:.2f}%)")
-    
-    print(f"\n📊 SO SÁNH TRƯỚC/SAU KHI TẮT NODE:")
-    print(f"   - p95 TRƯỚC: {p95_before:.2f}ms")
-    print(f"   - p95 SAU: {p95_after:.2f}ms")
-    print(f"   - Tăng: {((p95_after/p95_before - 1) * 100) if p95_before > 0 else 0:.1f}%")
-    
-    if error_types:
-        print(f"\n❌ LOẠI LỖI:")
-        from collections import Counter
-        error_counts = Counter(error_types)
-        for error, count in error_counts.most_common():
-            print(f"   - {error}: {count} lần")
-    
-    return {
-        'latencies': latencies,
-        'timestamps': timestamps,
-        'failures': failures,
-        'kill_point': KILL_AT_OPERATION,
-        'p95_before': p95_before,
-        'p95_after': p95_after,
-        'total_time': total_time
-    }
+        self._insert.consistency_level = ConsistencyLevel.QUORUM
+
+    async def write(self):
+        """Returns: (latency ms, thành công, loại lỗi)"""
+        start = time.perf_counter()
+        try:
+            await wait_for_response(self.session.execute_async(self._insert, (
+                random.choice(self.conversation_ids), uuid.uuid1(), random.choice(self.user_ids),
+                "fault_test", "Fault tolerance test", [])))
+            return (time.perf_counter() - start) * 1000, True, 'success'
+        except Exception as e:
+            return (time.perf_counter() - start) * 1000, False, type(e).__name__
+
+async def run_load(writer, start_time, end_time, concurrency, samples):
+    """Closed-loop tới end_time; mỗi sample: (giây hoàn thành, latency, thành công, lỗi)"""
+    async def worker():
+        while time.time() < end_time:
+            latency, success, error = await writer.write()
+            samples.append((time.time() - start_time, latency, success, error))
+
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+
+def fault_timeline(scheduler):
+    """Mốc phân pha: lỗi gây gián đoạn đầu tiên và hành động phục hồi đầu tiên sau nó"""
+    fault = scheduler.first(DISRUPTIVE_ACTIONS)
+    if fault is None:
+        return {}
+    timeline = {'fault': fault['fired'], 'fault_description': fault['description']}
+    recovery = scheduler.first(RECOVERY_ACTIONS, after=fault['fired'])
+    if recovery is not None:
+        timeline.update(recovery=recovery['fired'], recovery_description=recovery['description'])
+    return timeline
+
+async def report_progress(samples, start_time, end_time):
+    reported, last = 0, time.time()
+    while time.time() < end_time:
+        await asyncio.sleep(min(10, max(0.0, end_time - time.time())))
+        now = time.time()
+        window = samples[reported:]
+        reported = len(samples)
+        failures = sum(1 for s in window if not s[2])
+        print(f"   ✓ [{now - start_time:6.1f}s] {len(window)/max(now - last, 1e-9):,.0f} ops/s, "
+              f"{failures} failures / {now - last:.0f}s qua")
+        last = now
 
 # ============================================================================
-# VISUALIZATION
+# ANALYSIS
 # ============================================================================
-def plot_fault_tolerance(result):
-    """Vẽ biểu đồ fault tolerance"""
-    fig, axes = plt.subplots(2, 2, figsize=(15, 10))
-    fig.suptitle('Fault Tolerance: Impact of Node Failure', fontsize=16, fontweight='bold')
-    
-    latencies = result['latencies']
-    timestamps = result['timestamps']
-    failures = result['failures']
-    kill_point = result['kill_point']
-    
-    # 1. Latency over time
-    ax1 = axes[0, 0]
-    ax1.scatter(timestamps, latencies, alpha=0.5, s=1, color='blue')
-    
-    # Mark failure point
-    if kill_point < len(timestamps):
-        kill_time = timestamps[kill_point-1] if kill_point > 0 else 0
-        ax1.axvline(x=kill_time, color='red', linestyle='--', linewidth=2, 
-                   label=f'Node killed at {kill_time:.1f}s')
-    
-    # Mark failures
-    if failures:
-        failure_times = [timestamps[f['operation']-1] for f in failures if f['operation']-1 < len(timestamps)]
-        failure_latencies = [latencies[f['operation']-1] for f in failures if f['operation']-1 < len(latencies)]
-        ax1.scatter(failure_times, failure_latencies, color='red', s=50, 
-                   marker='x', label='Failed operations', zorder=5)
-    
-    ax1.set_xlabel('Time (seconds)', fontweight='bold')
-    ax1.set_ylabel('Latency (ms)', fontweight='bold')
-    ax1.set_title('Latency Over Time (with Node Failure)')
-    ax1.legend()
-    ax1.grid(alpha=0.3)
-    
-    # 2. Moving average latency
-    ax2 = axes[0, 1]
-    window_size = 100
-    moving_avg = []
-    for i in range(len(latencies)):
-        start_idx = max(0, i - window_size + 1)
-        moving_avg.append(statistics.mean(latencies[start_idx:i+1]))
-    
-    ax2.plot(timestamps, moving_avg, color='blue', linewidth=2, label='Moving average (100 ops)')
-    
-    if kill_point < len(timestamps):
-        kill_time = timestamps[kill_point-1] if kill_point > 0 else 0
-        ax2.axvline(x=kill_time, color='red', linestyle='--', linewidth=2, 
-                   label=f'Node killed')
-    
-    ax2.set_xlabel('Time (seconds)', fontweight='bold')
-    ax2.set_ylabel('Avg Latency (ms)', fontweight='bold')
-    ax2.set_title('Moving Average Latency')
-    ax2.legend()
-    ax2.grid(alpha=0.3)
-    
-    # 3. Latency distribution before/after
-    ax3 = axes[1, 0]
-    latencies_before = latencies[:kill_point]
-    latencies_after = latencies[kill_point:]
-    
-    ax3.hist(latencies_before, bins=50, alpha=0.7, label='Before failure', 
-            color='green', edgecolor='black')
-    ax3.hist(latencies_after, bins=50, alpha=0.7, label='After failure', 
-            color='orange', edgecolor='black')
-    
-    ax3.set_xlabel('Latency (ms)', fontweight='bold')
-    ax3.set_ylabel('Frequency', fontweight='bold')
-    ax3.set_title('Latency Distribution: Before vs After Node Failure')
-    ax3.legend()
-    ax3.grid(alpha=0.3)
-    
-    # 4. Failure rate over time
-    ax4 = axes[1, 1]
-    
-    # Calculate failure rate per time window
-    time_windows = []
-    failure_rates = []
-    window_duration = 1.0  # 1 second windows
-    
-    max_time = max(timestamps)
-    current_time = 0
-    
-    while current_time < max_time:
-        next_time = current_time + window_duration
-        
-        # Count operations in window
-        ops_in_window = sum(1 for t in timestamps if current_time <= t < next_time)
-        
-        # Count failures in window
-        failures_in_window = sum(1 for f in failures 
-                                if f['operation']-1 < len(timestamps) and 
-                                current_time <= timestamps[f['operation']-1] < next_time)
-        
-        if ops_in_window > 0:
-            failure_rate = (failures_in_window / ops_in_window) * 100
-        else:
-            failure_rate = 0
-        
-        time_windows.append(current_time + window_duration/2)
-        failure_rates.append(failure_rate)
-        
-        current_time = next_time
-    
-    ax4.plot(time_windows, failure_rates, color='red', linewidth=2)
-    
-    if kill_point < len(timestamps):
-        kill_time = timestamps[kill_point-1] if kill_point > 0 else 0
-        ax4.axvline(x=kill_time, color='darkred', linestyle='--', linewidth=2, 
-                   label='Node killed')
-    
-    ax4.set_xlabel('Time (seconds)', fontweight='bold')
-    ax4.set_ylabel('Failure Rate (%)', fontweight='bold')
-    ax4.set_title('Failure Rate Over Time')
-    ax4.legend()
-    ax4.grid(alpha=0.3)
-    
-    plt.tight_layout()
-    plt.savefig('fault_tolerance_benchmark.png', dpi=300, bbox_inches='tight')
-    print(f"\n📊 Biểu đồ đã lưu: fault_tolerance_benchmark.png")
-    plt.show()
+def per_second_series(samples, duration, fault_events=()):
+    """Chuỗi theo giây: ops, failures, p50, p99 và các lỗi được bắn trong giây đó"""
+    import numpy as np
+    from analysis import bucket_counts, bucket_percentiles
+
+    num_seconds = int(duration) + 1
+    times = np.fromiter((s[0] for s in samples), dtype=float, count=len(samples))
+    latencies = np.fromiter((s[1] for s in samples), dtype=float, count=len(samples))
+    failed = np.fromiter((not s[2] for s in samples), dtype=float, count=len(samples))
+    ops, percentiles = bucket_percentiles(times, latencies, 1.0, num_seconds)
+    failures = bucket_counts(times, 1.0, num_seconds, weights=failed)
+
+    def value(array, second):
+        return None if np.isnan(array[second]) else float(array[second])
+
+    return [{
+        'second': second,
+        'ops': int(ops[second]),
+        'failures': int(failures[second]),
+        'p50': value(percentiles[50], second),
+        'p99': value(percentiles[99], second),
+        'faults': [e['description'] for e in fault_events if int(e['fired']) == second],
+    } for second in range(num_seconds)]
+
+def window_stats(samples, start, end):
+    from analysis import latency_summary
+
+    window = [s for s in samples if start <= s[0] < end]
+    if len(window) < 2:
+        return None
+    summary = latency_summary([s[1] for s in window])
+    failures = sum(1 for s in window if not s[2])
+    return {
+        'throughput': len(window) / (end - start),
+        'p50': summary['p50'],
+        'p99': summary['p99'] if len(window) > 100 else summary['max'],
+        'failure_rate': failures / len(window),
+    }
+
+def find_steady_state(series, baseline, start_second):
+    """Giây đầu tiên từ start_second có STEADY_WINDOW giây liên tiếp đạt ngưỡng baseline"""
+    def is_steady(point):
+        return (point['ops'] >= STEADY_THROUGHPUT * baseline['throughput'] and
+                point['failures'] == 0 and point['p99'] is not None and
+                point['p99'] <= STEADY_P99 * baseline['p99'])
+
+    run = 0
+    for point in series[int(start_second):]:
+        run = run + 1 if is_steady(point) else 0
+        if run == STEADY_WINDOW:
+            return point['second'] - STEADY_WINDOW + 1
+    return None
+
+def hints_replay_window(hint_samples, recovery):
+    """(bắt đầu, kết thúc) của giai đoạn replay hints sau khi node quay lại"""
+    peak = max((n for t, n in hint_samples if t <= recovery), default=0)
+    if not peak:
+        return None
+    drained = next((t for t, n in hint_samples if t > recovery and n == 0), None)
+    return recovery, drained
+
+def analyze(samples, series, timeline, hosts, hint_samples, end_at):
+    fault = timeline.get('fault')
+    recovery = timeline.get('recovery')
+    baseline = window_stats(samples, BASELINE_SKIP, fault if fault else end_at)
+    result = {'baseline': baseline, 'timeline': timeline, 'phases': {}}
+    if fault is None or baseline is None:
+        return result
+
+    detect = hosts.first('down', fault)
+    first_failure = next((s[0] for s in sorted(samples) if s[0] >= fault and not s[2]), None)
+    rejoin = hosts.first('up', recovery) if recovery is not None else None
+    steady = find_steady_state(series, baseline, rejoin or recovery) if recovery is not None else None
+    hints = hints_replay_window(hint_samples, recovery) if recovery is not None else None
+
+    result.update({
+        'time_to_detect': detect - fault if detect is not None else None,
+        'first_failure_after_fault': first_failure - fault if first_failure is not None else None,
+        'time_to_rejoin': rejoin - recovery if rejoin is not None else None,
+        'time_to_steady': steady - recovery if steady is not None else None,
+        'steady_at': steady,
+        'hints_window': hints,
+        'hints_peak': max((n for _, n in hint_samples), default=0),
+    })
+
+    phases = [('before', BASELINE_SKIP, fault), ('down', fault, recovery or end_at)]
+    if recovery is not None:
+        phases.append(('recovery', recovery, steady or end_at))
+        if steady is not None:
+            phases.append(('after', steady, end_at))
+    if hints and hints[1] is not None:
+        phases.append(('hints replay', hints[0], hints[1]))
+    for name, start, end in phases:
+        stats = window_stats(samples, start, end)
+        if stats:
+            result['phases'][name] = dict(stats, start=start, end=end)
+    return result
+
+def artifact_data(series, result, scheduler, hosts, hint_samples, samples):
+    """Chuỗi theo giây + thời điểm chính xác của lỗi / sự kiện driver / pending hints"""
+    return {
+        'series': series,
+        'result': result,
+        'faults': scheduler.events,
+        'host_events': [{'at': t, 'event': kind, 'host': address}
+                        for t, kind, address in hosts.events],
+        'pending_hints': [{'at': t, 'files': n} for t, n in hint_samples],
+        'errors': dict(Counter(s[3] for s in samples if not s[2])),
+        'total_ops': len(samples),
+        'steady': {'window': STEADY_WINDOW, 'throughput': STEADY_THROUGHPUT, 'p99': STEADY_P99},
+    }
+
+def summary_metrics(result, total_ops, failures):
+    summary = {'total_ops': total_ops, 'failures': failures}
+    for phase, stats in [('baseline', result['baseline'])] + list(result['phases'].items()):
+        if stats:
+            for metric in ('throughput', 'p50', 'p99', 'failure_rate'):
+                summary[f"{phase.replace(' ', '_')}.{metric}"] = stats[metric]
+    for key in ('time_to_detect', 'time_to_rejoin', 'time_to_steady'):
+        if result.get(key) is not None:
+            summary[key] = result[key]
+    return summary
 
 # ============================================================================
 # MAIN
 # ============================================================================
+def fault_step(text):
+    try:
+        return parse_step(text)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
 async def main():
+    parser = argparse.ArgumentParser(description='Fault tolerance: kill -> restart -> recovery')
+    parser.add_argument('--node', default=NODE_TO_KILL)
+    parser.add_argument('--kill-at', type=float, default=KILL_AT, help='t1 (giây)')
+    parser.add_argument('--restart-at', type=float, default=RESTART_AT, help='t2 (giây)')
+    parser.add_argument('--end-at', type=float, default=END_AT, help='t3 (giây)')
+    parser.add_argument('--hard-kill', action='store_true',
+                        help='docker kill (SIGKILL, như crash) thay vì docker stop')
+    parser.add_argument('--fault', action='append', type=fault_step,
+                        help='Bước lỗi "giây:hành động:đích[:tham số]" (lặp lại được), thay cho '
+                             'timeline kill/restart mặc định. Ví dụ: 30:pause:cassandra-3 '
+                             '35:unpause:cassandra-3 50:proxy:2:latency_ms=200')
+    parser.add_argument('--proxy', action='store_true',
+                        help='Driver đi qua fault_proxy (cần cho các hành động proxy)')
+    parser.add_argument('--concurrency', type=int, default=NUM_THREADS)
+    add_results_arguments(parser, 'fault_tolerance')
+    args = parser.parse_args()
+    steps = args.fault or kill_restart_steps(args.node, args.kill_at, args.restart_at,
+                                             args.hard_kill)
+    if not args.fault and not args.kill_at < args.restart_at < args.end_at:
+        parser.error('Cần kill-at < restart-at < end-at')
+    if any(step['at'] >= args.end_at for step in steps):
+        parser.error('Mọi bước lỗi phải trước end-at')
+
     print("\n" + "="*60)
     print("🛡️ FAULT TOLERANCE BENCHMARK")
     print("="*60)
     print("⚠️  Lưu ý: Script này sẽ TẮT và KHỞI ĐỘNG LẠI node Cassandra")
+    print("Lịch lỗi:")
+    for step in steps:
+        print(f"   - {step['at']:6.1f}s: {describe(step)}")
+    print(f"   - {args.end_at:6.1f}s: kết thúc tải")
+    print(f"Consistency Level: QUORUM (cần 2/3 nodes)")
     print("="*60)
-    
-    session, cluster = connect_to_cassandra()
-    
+
+    proxy = None
+    if args.proxy:
+        from fault_proxy import FaultProxy, discover_nodes
+        proxy = FaultProxy(discover_nodes())
+        await proxy.start()
+
+    session, cluster = connect_to_cassandra(proxy.cluster_kwargs() if proxy else None)
+    scheduler = FaultScheduler(steps, proxy=proxy)
     try:
         user_ids, conversation_ids = get_sample_data(session)
-        
-        result = await benchmark_fault_tolerance(
-            session, conversation_ids, user_ids, NUM_OPERATIONS
+        writer = FaultTolerantWriter(session, conversation_ids, user_ids)
+
+        start_time = time.time()
+        end_time = start_time + args.end_at
+        scheduler.start_time = start_time
+        hosts = HostEventRecorder(start_time)
+        cluster.register_listener(hosts)
+        samples, hint_samples = [], []
+        survivors = [n for n in NODES if n not in scheduler.docker_targets]
+
+        await asyncio.gather(
+            run_load(writer, start_time, end_time, args.concurrency, samples),
+            scheduler.run(),
+            poll_pending_hints(survivors, start_time, end_time, hint_samples),
+            report_progress(samples, start_time, end_time),
         )
-        
-        plot_fault_tolerance(result)
-        
+
+        series = per_second_series(samples, args.end_at, scheduler.events)
+        result = analyze(samples, series, fault_timeline(scheduler), hosts, hint_samples,
+                         args.end_at)
+        data = artifact_data(series, result, scheduler, hosts, hint_samples, samples)
+        print_fault_tolerance_report(data)
+        failures = sum(data['errors'].values())
+        save_results(args.results, 'fault_tolerance', summary_metrics(result, len(samples), failures),
+                     data, args)
+        render_after_run(args.results, args.no_report)
+
         print(f"\n✅ Test hoàn thành!")
-        print(f"📊 Kết luận: Cassandra tiếp tục hoạt động với {result['failures'].__len__()} lỗi "
+        print(f"📊 Kết luận: Cassandra tiếp tục hoạt động với {failures} lỗi / {len(samples):,} ops "
               f"khi 1/3 nodes down (QUORUM)")
-        
+
     finally:
+        # Bị ngắt giữa chừng: không để node nằm im / bị pause
+        await scheduler.restore()
         cluster.shutdown()
+        if proxy:
+            await proxy.stop()
 
 if __name__ == "__main__":
     asyncio.run(main())
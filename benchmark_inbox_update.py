@@ -0,0 +1,257 @@
+"""
+Inbox Update Benchmark - Chi phí đưa conversation lên đầu inbox
+So sánh trên CÙNG chuỗi tin nhắn:
+- delete+insert: conversations_by_user (DELETE row cũ + INSERT row mới mỗi member)
+- state+recency: conversation_state_by_user + inbox_recency_by_user (schema_alternatives.cql)
+
+Chạy nhiều vòng; sau mỗi vòng đo:
+- Write throughput, requests / rows / tombstones ghi cho mỗi tin nhắn (write amplification)
+- Latency đọc inbox (p50/p99) của các user
+- Số live rows và tombstone cells mỗi lần đọc (query tracing)
+
+Yêu cầu: đã chạy schema.cql và schema_alternatives.cql.
+"""
+
+import argparse
+import asyncio
+import random
+import re
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from faker import Faker
+
+from benchmark import connect_to_cassandra, run_closed_loop
+from data_generator import create_fake_conversation, create_fake_user
+from inbox_models import DeleteInsertInbox, StateRecencyInbox
+from report import print_inbox_round
+from results_io import add_results_arguments, save_results, render_after_run
+
+# Dataset parameters
+NUM_USERS = 1000              # User mới, chỉ dùng cho benchmark này
+NUM_CONVERSATIONS = 3000
+GROUP_RATIO = 0.3
+POPULARITY_ALPHA = 1.2        # Pareto: vài conversation nhận phần lớn tin nhắn
+
+# Benchmark parameters
+ROUNDS = 8
+MESSAGES_PER_ROUND = 5000
+WRITE_CONCURRENCY = 64
+READ_CONCURRENCY = 16
+INBOX_READS = 1000            # Số lần đọc inbox mỗi vòng, mỗi mô hình
+INBOX_SIZE = 20               # Số conversation hiển thị trên màn hình inbox
+TRACE_SAMPLES = 20            # Số lần đọc có tracing mỗi vòng, mỗi mô hình
+
+TRACE_READ_PATTERN = re.compile(r'Read (\d+) live rows and (\d+) tombstone cells')
+
+# ============================================================================
+# DATASET & EVENTS
+# ============================================================================
+def generate_conversations(num_users, num_conversations):
+    fake = Faker()
+    users = [create_fake_user(fake) for _ in range(num_users)]
+    conversations = []
+    for _ in range(num_conversations):
+        convo = create_fake_conversation(users, fake, random.random() < GROUP_RATIO)
+        # Giờ ms chính xác như cột timestamp của Cassandra để so sánh/xóa đúng key
+        convo['created_at'] = convo['created_at'].replace(
+            microsecond=convo['created_at'].microsecond // 1000 * 1000)
+        conversations.append(convo)
+    return users, conversations
+
+class EventStream:
+    """
+    Sinh chuỗi tin nhắn mới (Pareto theo conversation) kèm trạng thái trước/sau
+    để cả 2 mô hình nhận đúng cùng tham số. Timestamp tăng ngặt >= 1ms mỗi event.
+    """
+
+    def __init__(self, conversations):
+        self.conversations = conversations
+        self.weights = [random.paretovariate(POPULARITY_ALPHA) for _ in conversations]
+        self.last_timestamp = {c['conversation_id']: c['created_at'] for c in conversations}
+        self.unread = {c['conversation_id']: {m['user_id']: 0 for m in c['members']}
+                       for c in conversations}
+        self.clock = datetime.now().replace(microsecond=0)
+        self.fake = Faker()
+
+    def next_events(self, count):
+        events = []
+        for convo in random.choices(self.conversations, weights=self.weights, k=count):
+            self.clock = max(self.clock + timedelta(milliseconds=1),
+                             datetime.now().replace(microsecond=0))
+            sender = random.choice(convo['members'])
+            unread = self.unread[convo['conversation_id']]
+            for user_id in unread:
+                unread[user_id] = 0 if user_id == sender['user_id'] else unread[user_id] + 1
+
+            events.append({
+                'conversation': convo,
+                'old_timestamp': self.last_timestamp[convo['conversation_id']],
+                'timestamp': self.clock,
+                'text': self.fake.sentence(nb_words=8),
+                'sender': sender,
+                'unread': dict(unread),
+            })
+            self.last_timestamp[convo['conversation_id']] = self.clock
+        return events
+
+# ============================================================================
+# MEASUREMENTS
+# ============================================================================
+def percentiles(latencies):
+    return statistics.median(latencies), statistics.quantiles(latencies, n=100)[98]
+
+async def initialize_model(model, conversations, concurrency):
+    stream = iter(conversations)
+
+    async def init_one():
+        await model.initialize(next(stream))
+        return 0.0
+
+    await run_closed_loop(init_one, len(conversations), concurrency)
+
+async def measure_writes(model, events, concurrency):
+    """Áp dụng events; trả về throughput và write amplification của vòng này"""
+    stream = iter(events)
+    before = (model.requests, model.rows_written, model.tombstones_written)
+
+    async def apply_one():
+        event = next(stream)
+        start = time.perf_counter()
+        await model.apply(event)
+        return (time.perf_counter() - start) * 1000
+
+    latencies, total_time = await run_closed_loop(apply_one, len(events), concurrency)
+    p50, p99 = percentiles(latencies)
+    num = len(events)
+    return {
+        'write_throughput': num / total_time,
+        'write_p50': p50,
+        'write_p99': p99,
+        'requests_per_msg': (model.requests - before[0]) / num,
+        'rows_per_msg': (model.rows_written - before[1]) / num,
+        'tombstones_per_msg': (model.tombstones_written - before[2]) / num,
+    }
+
+async def measure_reads(model, user_ids, concurrency):
+    stream = iter(user_ids)
+
+    async def read_one():
+        user_id = next(stream)
+        start = time.perf_counter()
+        await model.read(user_id, INBOX_SIZE)
+        return (time.perf_counter() - start) * 1000
+
+    latencies, _ = await run_closed_loop(read_one, len(user_ids), concurrency)
+    p50, p99 = percentiles(latencies)
+    return {'read_p50': p50, 'read_p99': p99}
+
+def trace_reads(session, model, user_ids):
+    """
+    Đọc có tracing (đồng bộ, không tính vào latency) và cộng số live rows /
+    tombstone cells mà các replica đã quét.
+    """
+    live_rows, tombstones, traced = [], [], 0
+    for user_id in user_ids:
+        live = dead = 0
+        for statement, params in model.read_statements(user_id, INBOX_SIZE):
+            try:
+                trace = session.execute(statement, params, trace=True).get_query_trace(max_wait=5)
+            except Exception as e:
+                print(f"   ⚠️  Không lấy được trace: {e}")
+                continue
+            for event in trace.events:
+                match = TRACE_READ_PATTERN.search(event.description)
+                if match:
+                    live += int(match.group(1))
+                    dead += int(match.group(2))
+            traced += 1
+        live_rows.append(live)
+        tombstones.append(dead)
+    if not traced:
+        return {'live_rows_per_read': None, 'tombstones_per_read': None}
+    return {
+        'live_rows_per_read': statistics.mean(live_rows),
+        'tombstones_per_read': statistics.mean(tombstones),
+    }
+
+def active_users(events, count):
+    """Chọn user đọc inbox: thành viên các conversation vừa có tin nhắn"""
+    members = [m['user_id'] for e in events for m in e['conversation']['members']]
+    return random.choices(members, k=count)
+
+# ============================================================================
+# ARTIFACT
+# ============================================================================
+def summary_metrics(history):
+    """Vòng cuối của mỗi mô hình: {model}.write.throughput / read_p99 / tombstones_per_read"""
+    summary = {}
+    for name, rounds in history.items():
+        last = rounds[-1]
+        summary[f"{name}.write.throughput"] = last['write_throughput']
+        summary[f"{name}.read_p99"] = last['read_p99']
+        summary[f"{name}.requests_per_msg"] = last['requests_per_msg']
+        if last['tombstones_per_read'] is not None:
+            summary[f"{name}.tombstones_per_read"] = last['tombstones_per_read']
+    return summary
+
+# ============================================================================
+# MAIN
+# ============================================================================
+async def main():
+    parser = argparse.ArgumentParser(description='Chi phí cập nhật inbox: delete+insert vs state+recency')
+    parser.add_argument('--rounds', type=int, default=ROUNDS)
+    parser.add_argument('--messages-per-round', type=int, default=MESSAGES_PER_ROUND)
+    parser.add_argument('--users', type=int, default=NUM_USERS)
+    parser.add_argument('--conversations', type=int, default=NUM_CONVERSATIONS)
+    parser.add_argument('--concurrency', type=int, default=WRITE_CONCURRENCY)
+    parser.add_argument('--trace-samples', type=int, default=TRACE_SAMPLES,
+                        help='Số lần đọc có tracing mỗi vòng (0 = tắt)')
+    add_results_arguments(parser, 'inbox_update')
+    args = parser.parse_args()
+
+    print("\n" + "="*60)
+    print("📬 INBOX UPDATE BENCHMARK")
+    print("="*60)
+
+    session, cluster = connect_to_cassandra()
+    try:
+        users, conversations = generate_conversations(args.users, args.conversations)
+        models = [DeleteInsertInbox(session), StateRecencyInbox(session)]
+
+        print(f"\n🏗️  Khởi tạo {len(conversations):,} conversations cho cả 2 mô hình...")
+        for model in models:
+            await initialize_model(model, conversations, args.concurrency)
+
+        events = EventStream(conversations)
+        history = {model.name: [] for model in models}
+        total_messages = 0
+
+        for round_no in range(1, args.rounds + 1):
+            round_events = events.next_events(args.messages_per_round)
+            total_messages += len(round_events)
+            readers = active_users(round_events, INBOX_READS)
+            traced = readers[:args.trace_samples]
+            print(f"\n🔄 Vòng {round_no}/{args.rounds}: {total_messages:,} tin nhắn")
+
+            results = {}
+            for model in models:
+                result = await measure_writes(model, round_events, args.concurrency)
+                result.update(await measure_reads(model, readers, READ_CONCURRENCY))
+                result.update(trace_reads(session, model, traced) if traced
+                              else {'live_rows_per_read': None, 'tombstones_per_read': None})
+                result['messages'] = total_messages
+                results[model.name] = result
+                history[model.name].append(result)
+            print_inbox_round(results)
+
+        # Artifact + visualization (report.py)
+        save_results(args.results, 'inbox_update', summary_metrics(history),
+                     {'history': history}, args)
+        render_after_run(args.results, args.no_report)
+    finally:
+        cluster.shutdown()
+
+if __name__ == "__main__":
+    asyncio.run(main())
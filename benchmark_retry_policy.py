@@ -0,0 +1,442 @@
+"""
+Retry Policy Benchmark - So sánh retry policy & idempotence khi 1 replica chết
+Chạy cùng kịch bản lỗi của benchmark_fault_tolerance (tắt node tại t1, bật lại tại t2)
+với nhiều cấu hình ghi chạy SONG SONG, nên mọi cấu hình chịu cùng một lỗi cùng lúc:
+
+Retry policy:
+- default:          RetryPolicy của driver (retry next host khi lỗi kết nối / Unavailable)
+- downgrading:      DowngradingConsistencyRetryPolicy (hạ CL / bỏ qua write timeout)
+- bounded-backoff:  driver không retry (FallthroughRetryPolicy); ứng dụng tự retry tối đa
+                    MAX_RETRIES lần với exponential backoff + jitter, chỉ với statement
+                    idempotent (Unavailable luôn an toàn vì coordinator chưa ghi)
+
+Statement:
+- idempotent:       message_id sinh ở client, is_idempotent = True (ghi lại = ghi đè)
+- non-idempotent:   message_id = now() ở server, is_idempotent = False (ghi lại = dòng mới)
+
+Đo: tỷ lệ thành công, throughput khi node down, số lần retry (driver + ứng dụng),
+latency tăng thêm, số ghi bị hạ CL / bỏ qua, và rủi ro ghi trùng: retry statement
+không idempotent sau lỗi mơ hồ + đọc lại (CL ALL) đếm dòng trùng / mất.
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import threading
+import time
+import uuid
+from collections import Counter
+
+from cassandra import OperationTimedOut, ReadTimeout, Unavailable, WriteTimeout
+from cassandra.cluster import Cluster, ExecutionProfile, EXEC_PROFILE_DEFAULT, NoHostAvailable
+from cassandra.connection import ConnectionException
+from cassandra.policies import (
+    DCAwareRoundRobinPolicy, DowngradingConsistencyRetryPolicy, FallthroughRetryPolicy,
+    RetryPolicy, TokenAwarePolicy
+)
+from cassandra.query import ConsistencyLevel
+
+from benchmark_consistency import CL_NAMES, parse_level
+from benchmark_fault_tolerance import (
+    BASELINE_SKIP, fault_step, fault_timeline, per_second_series, report_progress, window_stats
+)
+from concurrency_control import fetch_all_rows, wait_for_response
+from fault_scheduler import FaultScheduler, describe, kill_restart_steps
+from report import print_retry_policy_report
+from results_io import add_results_arguments, save_results, render_after_run
+from workload_manifest import get_sample_data as sample_ids
+
+# Configuration
+CONTACT_POINTS = ['127.0.0.1']
+PORT = 9042
+KEYSPACE = 'realtime_chat_app'
+REQUEST_TIMEOUT = 10.0
+
+# Test parameters
+POLICIES = ['default', 'downgrading', 'bounded-backoff']
+MODES = ['idempotent', 'non-idempotent']
+NODE_TO_KILL = 'cassandra-2'
+KILL_AT = 20.0
+RESTART_AT = 60.0
+END_AT = 120.0
+WORKERS_PER_CONFIG = 8        # Worker closed-loop cho mỗi cấu hình (policy x statement)
+PARTITIONS_PER_CONFIG = 50    # Conversation mới cho mỗi cấu hình -> đọc lại được toàn bộ
+CONSISTENCY = ConsistencyLevel.QUORUM
+
+# Bounded retry (ứng dụng)
+MAX_RETRIES = 3
+BACKOFF_BASE_MS = 50
+BACKOFF_CAP_MS = 1000
+
+TEST_MARKER = 'retry_test'
+
+def config_name(policy, mode):
+    return f'{policy}/{mode}'
+
+def driver_policy(policy):
+    if policy == 'default':
+        return RetryPolicy()
+    if policy == 'downgrading':
+        return DowngradingConsistencyRetryPolicy()
+    return FallthroughRetryPolicy()
+
+def connect_with_policies(configs, cluster_kwargs=None):
+    """1 execution profile cho mỗi cấu hình, retry policy được bọc bởi CountingRetryPolicy"""
+    def make_profile(retry_policy=None):
+        kwargs = {'retry_policy': retry_policy} if retry_policy else {}
+        return ExecutionProfile(
+            load_balancing_policy=TokenAwarePolicy(DCAwareRoundRobinPolicy()),
+            request_timeout=REQUEST_TIMEOUT, **kwargs)
+
+    counters = {}
+    profiles = {EXEC_PROFILE_DEFAULT: make_profile()}
+    for policy, mode in configs:
+        name = config_name(policy, mode)
+        counters[name] = CountingRetryPolicy(driver_policy(policy))
+        profiles[name] = make_profile(counters[name])
+
+    kwargs = cluster_kwargs or {'contact_points': CONTACT_POINTS, 'port': PORT}
+    cluster = Cluster(execution_profiles=profiles, **kwargs)
+    session = cluster.connect(KEYSPACE)
+    print(f"✅ Kết nối thành công đến {KEYSPACE} ({len(profiles)} execution profiles)")
+    return session, cluster, counters
+
+# ============================================================================
+# RETRY ACCOUNTING
+# ============================================================================
+class CountingRetryPolicy(RetryPolicy):
+    """
+    Bọc 1 retry policy của driver, ghi lại mọi quyết định theo loại lỗi và theo statement.
+    Được gọi từ thread I/O của driver nên cập nhật dưới lock.
+    """
+
+    DECISIONS = {RetryPolicy.RETRY: 'retry', RetryPolicy.RETRY_NEXT_HOST: 'retry_next_host',
+                 RetryPolicy.IGNORE: 'ignore', RetryPolicy.RETHROW: 'rethrow'}
+
+    def __init__(self, policy):
+        self.policy = policy
+        self.decisions = Counter()
+        self._by_statement = {}
+        self._lock = threading.Lock()
+
+    def _record(self, kind, query, args, kwargs, decision):
+        consistency = kwargs.get('consistency', args[0] if args else None)
+        name = self.DECISIONS.get(decision[0], str(decision[0]))
+        if name == 'retry' and decision[1] is not None and decision[1] != consistency:
+            name = 'downgrade'
+        with self._lock:
+            self.decisions[(kind, name)] += 1
+            if query is not None:
+                self._by_statement.setdefault(id(query), []).append((kind, name))
+        return decision
+
+    def on_read_timeout(self, query, *args, **kwargs):
+        return self._record('read_timeout', query, args, kwargs,
+                            self.policy.on_read_timeout(query, *args, **kwargs))
+
+    def on_write_timeout(self, query, *args, **kwargs):
+        return self._record('write_timeout', query, args, kwargs,
+                            self.policy.on_write_timeout(query, *args, **kwargs))
+
+    def on_unavailable(self, query, *args, **kwargs):
+        return self._record('unavailable', query, args, kwargs,
+                            self.policy.on_unavailable(query, *args, **kwargs))
+
+    def on_request_error(self, query, *args, **kwargs):
+        return self._record('request_error', query, args, kwargs,
+                            self.policy.on_request_error(query, *args, **kwargs))
+
+    def pop(self, statement):
+        """Các quyết định [(loại lỗi, quyết định)] driver đã đưa ra cho statement này"""
+        with self._lock:
+            return self._by_statement.pop(id(statement), [])
+
+# ============================================================================
+# WORKLOAD
+# ============================================================================
+class PolicyWriter:
+    """
+    Ghi tin nhắn vào các conversation riêng của cấu hình. Mỗi lần ghi logic mang
+    1 token trong text_content (giữ nguyên qua các lần retry) để đọc lại đếm trùng / mất.
+    """
+
+    def __init__(self, session, policy, mode, consistency, user_ids, retry_counter):
+        self.session = session
+        self.policy = policy
+        self.mode = mode
+        self.name = config_name(policy, mode)
+        self.user_ids = user_ids
+        self.retry_counter = retry_counter
+        self.conversation_ids = [uuid.uuid4() for _ in range(PARTITIONS_PER_CONFIG)]
+        self.idempotent = mode == 'idempotent'
+        message_id = '?' if self.idempotent else 'now()'
+        self._insert = session.prepare(
+            "INSERT INTO messages_by_conversation "
+            "(conversation_id, message_id, sender_id, sender_username, text_content, attachments) "
+            f"VALUES (?, {message_id}, ?, ?, ?, ?)"
+        )
+        self._insert.consistency_level = consistency
+        self._insert.is_idempotent = self.idempotent
+
+        self.samples = []           # (giây, latency ms, thành công, lỗi, số lần retry)
+        self.acknowledged = set()   # token ghi thành công
+        self.failed = set()         # token ghi thất bại (có thể vẫn đã được ghi)
+        self.driver_retries = 0
+        self.app_retries = 0
+        self.weakened = 0           # thành công nhờ hạ CL / bỏ qua write timeout
+        self.risky_retries = 0      # retry statement không idempotent sau lỗi mơ hồ
+
+    def _bind(self, token):
+        values = [random.choice(self.conversation_ids)]
+        if self.idempotent:
+            values.append(uuid.uuid1())
+        values += [random.choice(self.user_ids), self.policy, f"{TEST_MARKER} {token}", []]
+        return values
+
+    def _retryable(self, error):
+        """Bounded retry của ứng dụng: Unavailable luôn an toàn; lỗi mơ hồ chỉ khi idempotent"""
+        if isinstance(error, Unavailable):
+            return True
+        return self.idempotent and isinstance(
+            error, (WriteTimeout, OperationTimedOut, ConnectionException, NoHostAvailable))
+
+    async def _execute(self, values):
+        statement = self._insert.bind(values)
+        try:
+            await wait_for_response(self.session.execute_async(statement, execution_profile=self.name))
+        finally:
+            decisions = self.retry_counter.pop(statement)
+            retries = [(kind, d) for kind, d in decisions
+                       if d in ('retry', 'retry_next_host', 'downgrade')]
+            self.driver_retries += len(retries)
+            if any(d in ('ignore', 'downgrade') for _, d in decisions):
+                self.weakened += 1
+            if not self.idempotent:
+                self.risky_retries += sum(1 for kind, _ in retries
+                                          if kind in ('write_timeout', 'request_error'))
+        return len(retries)
+
+    async def write(self, start_time):
+        token = uuid.uuid4().hex
+        values = self._bind(token)
+        start = time.perf_counter()
+        retries, app_retries = 0, 0
+        while True:
+            try:
+                retries += await self._execute(values)
+                ok, error = True, 'success'
+                break
+            except Exception as e:
+                if (self.policy != 'bounded-backoff' or app_retries >= MAX_RETRIES
+                        or not self._retryable(e)):
+                    ok, error = False, type(e).__name__
+                    break
+            # Exponential backoff với full jitter
+            backoff_ms = min(BACKOFF_CAP_MS, BACKOFF_BASE_MS * 2 ** app_retries)
+            await asyncio.sleep(random.uniform(0, backoff_ms) / 1000)
+            app_retries += 1
+            self.app_retries += 1
+        retries += app_retries
+
+        latency = (time.perf_counter() - start) * 1000
+        (self.acknowledged if ok else self.failed).add(token)
+        sample = (time.time() - start_time, latency, ok, error, retries)
+        self.samples.append(sample)
+        return sample
+
+    async def verify(self):
+        """
+        Đọc lại toàn bộ conversation của cấu hình (CL ALL, node còn down thì QUORUM).
+        Returns: (CL đã dùng, số token bị ghi trùng, số token thành công nhưng mất,
+                  số token báo lỗi nhưng thực ra đã được ghi)
+        """
+        for consistency in (ConsistencyLevel.ALL, ConsistencyLevel.QUORUM):
+            select = self.session.prepare(
+                "SELECT text_content FROM messages_by_conversation WHERE conversation_id = ?")
+            select.consistency_level = consistency
+            try:
+                copies = Counter()
+                for conversation_id in self.conversation_ids:
+                    rows = await fetch_all_rows(self.session.execute_async(select, (conversation_id,)))
+                    copies.update(row.text_content.split()[-1] for row in rows)
+                break
+            except (Unavailable, ReadTimeout, NoHostAvailable):
+                continue
+        else:
+            return None
+
+        duplicates = sum(1 for count in copies.values() if count > 1)
+        lost = sum(1 for token in self.acknowledged if token not in copies)
+        written_anyway = sum(1 for token in self.failed if token in copies)
+        return CL_NAMES[consistency], duplicates, lost, written_anyway
+
+    async def cleanup(self):
+        delete = self.session.prepare("DELETE FROM messages_by_conversation WHERE conversation_id = ?")
+        await asyncio.gather(*[wait_for_response(self.session.execute_async(delete, (cid,)))
+                               for cid in self.conversation_ids])
+
+async def run_load(writers, start_time, end_time, workers_per_config, samples):
+    """Closed-loop tới end_time; samples gộp mọi cấu hình (cho report_progress)"""
+    async def worker(writer):
+        while time.time() < end_time:
+            samples.append(await writer.write(start_time))
+
+    await asyncio.gather(*[worker(w) for w in writers for _ in range(workers_per_config)])
+
+# ============================================================================
+# ANALYSIS
+# ============================================================================
+def analyze(writer, timeline, end_at, verification):
+    samples = writer.samples
+    fault = timeline.get('fault', end_at)
+    recovery = timeline.get('recovery', end_at)
+    baseline = window_stats(samples, BASELINE_SKIP, fault)
+    down = window_stats(samples, fault, recovery)
+
+    def good_rate(start, end):
+        return sum(1 for s in samples if start <= s[0] < end and s[2]) / max(end - start, 1e-9)
+
+    retried = [s for s in samples if s[4] and s[2]]
+    clean = [s[1] for s in samples if not s[4] and s[2]]
+    ok = sum(1 for s in samples if s[2])
+    result = {
+        'ops': len(samples),
+        'success_rate': ok / len(samples) if samples else 0.0,
+        'down_success_rate': (1 - down['failure_rate']) if down else None,
+        'baseline_goodput': good_rate(BASELINE_SKIP, fault),
+        'down_goodput': good_rate(fault, recovery) if fault < recovery else None,
+        'retried_ops': len(retried),
+        'driver_retries': writer.driver_retries,
+        'app_retries': writer.app_retries,
+        'added_p99': down['p99'] - baseline['p99'] if down and baseline else None,
+        'retry_extra_latency': (statistics.mean(s[1] for s in retried) - statistics.mean(clean)
+                                if retried and clean else None),
+        'weakened': writer.weakened,
+        'risky_retries': writer.risky_retries,
+        'errors': Counter(s[3] for s in samples if not s[2]),
+        'decisions': writer.retry_counter.decisions,
+        'idempotent': writer.idempotent,
+    }
+    if verification:
+        result.update(zip(('verified_at', 'duplicates', 'lost', 'written_anyway'), verification))
+    return result
+
+# ============================================================================
+# ARTIFACT
+# ============================================================================
+def artifact_data(results, writers, timeline, fault_events, end_at):
+    """
+    Kết quả JSON được: errors / decisions thành dict tên -> số lần, mẫu thô gom thành
+    chuỗi theo giây cho từng cấu hình (như benchmark_fault_tolerance)
+    """
+    return {
+        'timeline': timeline,
+        'end_at': end_at,
+        'faults': fault_events,
+        'results': {name: dict(r, errors=dict(r['errors']),
+                               decisions={f"{kind}:{decision}": count
+                                          for (kind, decision), count in r['decisions'].items()})
+                    for name, r in results.items()},
+        'series': {writer.name: per_second_series(writer.samples, end_at) for writer in writers},
+    }
+
+def summary_metrics(results):
+    """{config}.success_rate / down_goodput / duplicates / lost"""
+    summary = {}
+    for name, r in results.items():
+        summary[f"{name}.success_rate"] = r['success_rate']
+        for key in ('down_goodput', 'duplicates', 'lost'):
+            if r.get(key) is not None:
+                summary[f"{name}.{key}"] = r[key]
+    return summary
+
+# ============================================================================
+# MAIN
+# ============================================================================
+async def main():
+    parser = argparse.ArgumentParser(description='Retry policy & idempotence dưới node failure')
+    parser.add_argument('--policies', nargs='+', choices=POLICIES, default=POLICIES)
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=MODES)
+    parser.add_argument('--consistency', type=parse_level, default=CONSISTENCY,
+                        help=f"CL ghi (mặc định {CL_NAMES[CONSISTENCY]}; ALL để thấy rõ downgrading)")
+    parser.add_argument('--node', default=NODE_TO_KILL)
+    parser.add_argument('--kill-at', type=float, default=KILL_AT)
+    parser.add_argument('--restart-at', type=float, default=RESTART_AT)
+    parser.add_argument('--end-at', type=float, default=END_AT)
+    parser.add_argument('--hard-kill', action='store_true')
+    parser.add_argument('--fault', action='append', type=fault_step,
+                        help='Bước lỗi "giây:hành động:đích[:tham số]" như benchmark_fault_tolerance')
+    parser.add_argument('--proxy', action='store_true', help='Driver đi qua fault_proxy')
+    parser.add_argument('--concurrency', type=int, default=WORKERS_PER_CONFIG,
+                        help='Worker cho mỗi cấu hình')
+    add_results_arguments(parser, 'retry_policy')
+    args = parser.parse_args()
+    steps = args.fault or kill_restart_steps(args.node, args.kill_at, args.restart_at,
+                                             args.hard_kill)
+    if not args.fault and not args.kill_at < args.restart_at < args.end_at:
+        parser.error('Cần kill-at < restart-at < end-at')
+    if any(step['at'] >= args.end_at for step in steps):
+        parser.error('Mọi bước lỗi phải trước end-at')
+    configs = [(policy, mode) for policy in args.policies for mode in args.modes]
+
+    print("\n" + "="*60)
+    print("🔁 RETRY POLICY & IDEMPOTENCE BENCHMARK")
+    print("="*60)
+    print(f"Cấu hình: {', '.join(config_name(p, m) for p, m in configs)}")
+    print(f"Consistency: {CL_NAMES[args.consistency]}, {args.concurrency} workers / cấu hình")
+    print(f"Bounded retry: tối đa {MAX_RETRIES} lần, backoff {BACKOFF_BASE_MS}ms x2^n (trần {BACKOFF_CAP_MS}ms)")
+    print("Lịch lỗi:")
+    for step in steps:
+        print(f"   - {step['at']:6.1f}s: {describe(step)}")
+    print("="*60)
+
+    proxy = None
+    if args.proxy:
+        from fault_proxy import FaultProxy, discover_nodes
+        proxy = FaultProxy(discover_nodes())
+        await proxy.start()
+
+    session, cluster, counters = connect_with_policies(configs, proxy.cluster_kwargs() if proxy else None)
+    scheduler = FaultScheduler(steps, proxy=proxy)
+    try:
+        user_ids, _ = sample_ids(session, num_users=100, num_conversations=1, keyspace=KEYSPACE)
+        writers = [PolicyWriter(session, policy, mode, args.consistency, user_ids,
+                                counters[config_name(policy, mode)]) for policy, mode in configs]
+
+        start_time = time.time()
+        end_time = start_time + args.end_at
+        scheduler.start_time = start_time
+        samples = []
+        await asyncio.gather(
+            run_load(writers, start_time, end_time, args.concurrency, samples),
+            scheduler.run(),
+            report_progress(samples, start_time, end_time),
+        )
+        # Node được bật lại trước khi đọc lại để đọc ở CL ALL
+        await scheduler.restore()
+
+        print(f"\n🔍 Đọc lại {PARTITIONS_PER_CONFIG} conversations / cấu hình để đếm ghi trùng...")
+        timeline = fault_timeline(scheduler)
+        results = {}
+        for writer in writers:
+            verification = await writer.verify()
+            results[writer.name] = analyze(writer, timeline, args.end_at, verification)
+            await writer.cleanup()
+
+        data = artifact_data(results, writers, timeline, scheduler.events, args.end_at)
+        print_retry_policy_report(data)
+
+        # Artifact + visualization (report.py)
+        save_results(args.results, 'retry_policy', summary_metrics(results), data, args)
+        render_after_run(args.results, args.no_report)
+        print(f"\n✅ Test hoàn thành!")
+
+    finally:
+        await scheduler.restore()
+        cluster.shutdown()
+        if proxy:
+            await proxy.stop()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,28 +1,93 @@
 #!/usr/bin/env python3
 """
 Master Benchmark Runner - Chạy tất cả các benchmark và tạo báo cáo tổng hợp
+Mỗi benchmark ghi artifact JSON (--results, xem results_io.py) vào thư mục kết quả;
+runner gom metric summary của chúng vào results_summary.json và so sánh với 1
+baseline (--baseline, cùng định dạng) theo ngưỡng cho phép:
+- throughput giảm quá --max-throughput-drop %
+- p99 tăng quá --max-p99-increase %
+Regression được đánh dấu trong SUMMARY_REPORT.md và exit code (2), để dùng làm
+cổng kiểm tra khi đổi cấu hình cluster.
+
+Usage:
+    python3 benchmark_runner.py --save-baseline baseline.json
+    python3 benchmark_runner.py --yes --baseline baseline.json --max-throughput-drop 5
 """
 
+import argparse
 import asyncio
+import json
 import subprocess
 import sys
 import time
 from datetime import datetime
 import os
+from results_io import git_commit, load_results
+
+# Ngưỡng regression mặc định (%)
+MAX_THROUGHPUT_DROP = 10.0
+MAX_P99_INCREASE = 20.0
+
+EXIT_FAILED = 1       # Có benchmark chạy lỗi
+EXIT_REGRESSION = 2   # Mọi benchmark chạy xong nhưng có metric vượt ngưỡng
+
+def metric_kind(metric):
+    """'throughput' (cao hơn là tốt), 'p99' (thấp hơn là tốt) hoặc None (chỉ báo cáo)"""
+    name = metric.rsplit('.', 1)[-1]
+    if name == 'throughput':
+        return 'throughput'
+    if name == 'p99' or name.endswith('_p99'):
+        return 'p99'
+    return None
+
+def compare_summary(baseline, current, max_throughput_drop, max_p99_increase):
+    """
+    So sánh metric summary của 1 benchmark với baseline.
+    Metric throughput/p99 có trong baseline nhưng thiếu ở lần chạy này (vd. benchmark.py
+    đổi giữa chạy 1 mức và --sweep) là regression: không có số liệu thì không qua cổng.
+    Returns: [{'metric', 'baseline', 'current', 'change' (%), 'regression'}];
+    current / change là None với metric bị thiếu
+    """
+    rows = []
+    for metric, base in baseline.items():
+        value = current.get(metric)
+        kind = metric_kind(metric)
+        if value is None:
+            if kind is not None:
+                rows.append({'metric': metric, 'baseline': base, 'current': None, 'change': None,
+                             'regression': True})
+            continue
+        if not base:
+            continue
+        change = (value - base) / base * 100
+        regression = ((kind == 'throughput' and -change > max_throughput_drop) or
+                      (kind == 'p99' and change > max_p99_increase))
+        rows.append({'metric': metric, 'baseline': base, 'current': value, 'change': change,
+                     'regression': regression})
+    return rows
+
+def load_baseline(path):
+    """Baseline = results_summary.json của 1 lần chạy trước: {'benchmarks': {slug: summary}}"""
+    with open(path) as f:
+        return json.load(f)['benchmarks']
 
 class BenchmarkRunner:
-    def __init__(self):
+    def __init__(self, baseline=None, max_throughput_drop=MAX_THROUGHPUT_DROP,
+                 max_p99_increase=MAX_P99_INCREASE):
         self.results = {}
         self.start_time = None
         self.output_dir = f"benchmark_results_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        self.baseline = baseline or {}
+        self.max_throughput_drop = max_throughput_drop
+        self.max_p99_increase = max_p99_increase
         
     def create_output_dir(self):
         """Tạo thư mục lưu kết quả"""
         os.makedirs(self.output_dir, exist_ok=True)
         print(f"📁 Tạo thư mục kết quả: {self.output_dir}")
         
-    def run_benchmark(self, name, script, description):
-        """Chạy 1 benchmark script"""
+    def run_benchmark(self, name, script, description, args=()):
+        """Chạy 1 benchmark script (args: tham số CLI thêm cho script)"""
         print(f"\n{'='*70}")
         print(f"🚀 RUNNING: {name}")
         print(f"{'='*70}")
@@ -31,10 +96,12 @@ class BenchmarkRunner:
         print(f"{'='*70}\n")
         
         start = time.time()
+        slug = name.lower().replace(' ', '_')
+        results_file = os.path.join(self.output_dir, f"{slug}_results.json")
         
         try:
             result = subprocess.run(
-                [sys.executable, script],
+                [sys.executable, script, *args, '--results', results_file],
                 capture_output=True,
                 text=True,
                 timeout=3600  # 1 hour timeout
@@ -43,7 +110,7 @@ class BenchmarkRunner:
             duration = time.time() - start
             
             # Save output
-            output_file = os.path.join(self.output_dir, f"{name.lower().replace(' ', '_')}.log")
+            output_file = os.path.join(self.output_dir, f"{slug}.log")
             with open(output_file, 'w') as f:
                 f.write(f"=== STDOUT ===\n{result.stdout}\n")
                 f.write(f"\n=== STDERR ===\n{result.stderr}\n")
@@ -51,14 +118,19 @@ class BenchmarkRunner:
             success = result.returncode == 0
             
             self.results[name] = {
+                'slug': slug,
                 'success': success,
                 'duration': duration,
                 'output_file': output_file,
                 'returncode': result.returncode
             }
+            if success:
+                success = self.collect_results(name, results_file)
             
             if success:
                 print(f"\n✅ {name} completed successfully in {duration:.1f}s")
+            elif result.returncode == 0:
+                print(f"\n❌ {name} exited 0 but {self.results[name]['error']}")
             else:
                 print(f"\n❌ {name} failed with return code {result.returncode}")
                 print(f"Error output: {result.stderr[:500]}")
@@ -95,6 +167,64 @@ class BenchmarkRunner:
             }
             return False
     
+    def collect_results(self, name, results_file):
+        """
+        Đọc summary từ artifact của benchmark và so sánh với baseline (nếu có).
+        Thiếu / hỏng artifact thì run bị tính là thất bại (cổng không được qua khi không có số liệu).
+        Returns: False nếu không đọc được artifact
+        """
+        result = self.results[name]
+        try:
+            artifact = load_results(results_file)
+        except (OSError, ValueError, KeyError) as e:
+            result['success'] = False
+            result['error'] = f"wrote no readable results artifact ({e})"
+            return False
+        result['results_file'] = results_file
+        result['summary'] = artifact['summary']
+        
+        if result['slug'] not in self.baseline:
+            return True
+        rows = compare_summary(self.baseline[result['slug']], artifact['summary'],
+                               self.max_throughput_drop, self.max_p99_increase)
+        result['comparison'] = rows
+        regressions = [row for row in rows if row['regression']]
+        result['regressions'] = len(regressions)
+        for row in regressions:
+            if row['current'] is None:
+                print(f"🐢 REGRESSION {name}: {row['metric']} thiếu trong lần chạy này "
+                      f"(baseline {row['baseline']:.2f})")
+            else:
+                print(f"🐢 REGRESSION {name}: {row['metric']} {row['baseline']:.2f} -> "
+                      f"{row['current']:.2f} ({row['change']:+.1f}%)")
+        if not regressions:
+            print(f"✓ {name}: không có regression so với baseline ({len(rows)} metrics)")
+        return True
+    
+    def save_results_summary(self):
+        """results_summary.json: summary của mọi benchmark chạy thành công (dùng làm --baseline)"""
+        summary_file = os.path.join(self.output_dir, "results_summary.json")
+        with open(summary_file, 'w') as f:
+            json.dump({
+                'created_at': datetime.now().isoformat(timespec='seconds'),
+                'git_commit': git_commit(),
+                'benchmarks': {r['slug']: r['summary'] for r in self.results.values()
+                               if 'summary' in r},
+            }, f, indent=1)
+        print(f"\n💾 Metric summary saved: {summary_file}")
+        return summary_file
+    
+    @property
+    def total_regressions(self):
+        return sum(r.get('regressions', 0) for r in self.results.values())
+    
+    def exit_code(self):
+        if not all(r['success'] for r in self.results.values()):
+            return EXIT_FAILED
+        if self.total_regressions:
+            return EXIT_REGRESSION
+        return 0
+    
     def generate_summary_report(self):
         """Tạo báo cáo tổng kết"""
         report_file = os.path.join(self.output_dir, "SUMMARY_REPORT.md")
@@ -105,8 +235,8 @@ class BenchmarkRunner:
             f.write(f"**Total Duration:** {time.time() - self.start_time:.1f} seconds\n\n")
             
             f.write("## Results Overview\n\n")
-            f.write("| Benchmark | Status | Duration | Output |\n")
-            f.write("|-----------|--------|----------|--------|\n")
+            f.write("| Benchmark | Status | Duration | Regressions | Output |\n")
+            f.write("|-----------|--------|----------|-------------|--------|\n")
             
             total_success = 0
             total_failed = 0
@@ -121,9 +251,18 @@ class BenchmarkRunner:
                 else:
                     total_failed += 1
                 
-                f.write(f"| {name} | {status} | {duration} | {output} |\n")
+                if 'comparison' in result:
+                    regressions = f"🐢 {result['regressions']}" if result['regressions'] else "✅ 0"
+                else:
+                    regressions = "-"
+                
+                f.write(f"| {name} | {status} | {duration} | {regressions} | {output} |\n")
             
             f.write(f"\n**Total:** {total_success} passed, {total_failed} failed\n\n")
+            if self.baseline:
+                f.write(f"**Regressions:** {self.total_regressions} "
+                        f"(throughput drop > {self.max_throughput_drop:g}%, "
+                        f"p99 increase > {self.max_p99_increase:g}%)\n\n")
             
             f.write("## Benchmark Details\n\n")
             
@@ -137,6 +276,24 @@ class BenchmarkRunner:
                     f.write(f"- **Error:** {result['error']}\n")
                 
                 f.write("\n")
+                if 'comparison' in result:
+                    f.write("| Metric | Baseline | Current | Change | Status |\n")
+                    f.write("|--------|----------|---------|--------|--------|\n")
+                    for row in result['comparison']:
+                        status = "🐢 REGRESSION" if row['regression'] else "✅"
+                        if row['current'] is None:
+                            current, change, status = "missing", "-", "🐢 MISSING"
+                        else:
+                            current, change = f"{row['current']:.2f}", f"{row['change']:+.1f}%"
+                        f.write(f"| {row['metric']} | {row['baseline']:.2f} | {current} "
+                                f"| {change} | {status} |\n")
+                    f.write("\n")
+                elif 'summary' in result:
+                    f.write("| Metric | Value |\n")
+                    f.write("|--------|-------|\n")
+                    for metric, value in result['summary'].items():
+                        f.write(f"| {metric} | {value:.2f} |\n")
+                    f.write("\n")
             
             f.write("## Files Generated\n\n")
             files = os.listdir(self.output_dir)
@@ -166,11 +323,28 @@ class BenchmarkRunner:
         
         for name, result in self.results.items():
             status = "✅" if result['success'] else "❌"
-            print(f"   {status} {name}: {result['duration']:.1f}s")
+            regressions = (f", {result['regressions']} regressions" if result.get('regressions')
+                           else '')
+            print(f"   {status} {name}: {result['duration']:.1f}s{regressions}")
+        if self.baseline:
+            print(f"\n🐢 Regressions vs baseline: {self.total_regressions}")
         
         print(f"\n{'='*70}\n")
 
 def main():
+    parser = argparse.ArgumentParser(description='Chạy tất cả benchmark, so sánh với baseline')
+    parser.add_argument('--yes', action='store_true', help='Bỏ qua bước xác nhận')
+    parser.add_argument('--baseline', metavar='PATH',
+                        help='results_summary.json của 1 lần chạy trước để phát hiện regression')
+    parser.add_argument('--save-baseline', metavar='PATH',
+                        help='Ghi metric summary của lần chạy này thành baseline mới')
+    parser.add_argument('--max-throughput-drop', type=float, default=MAX_THROUGHPUT_DROP,
+                        metavar='PCT', help='Throughput giảm quá PCT%% so với baseline là regression')
+    parser.add_argument('--max-p99-increase', type=float, default=MAX_P99_INCREASE,
+                        metavar='PCT', help='p99 tăng quá PCT%% so với baseline là regression')
+    args = parser.parse_args()
+    baseline = load_baseline(args.baseline) if args.baseline else None
+    
     print("""
 ╔═══════════════════════════════════════════════════════════════════╗
 ║                                                                   ║
@@ -190,12 +364,13 @@ def main():
 ╚═══════════════════════════════════════════════════════════════════╝
 """)
     
-    response = input("\n⚡ Do you want to continue? (yes/no): ")
-    if response.lower() != 'yes':
-        print("❌ Cancelled")
-        return
+    if not args.yes:
+        response = input("\n⚡ Do you want to continue? (yes/no): ")
+        if response.lower() != 'yes':
+            print("❌ Cancelled")
+            return 0
     
-    runner = BenchmarkRunner()
+    runner = BenchmarkRunner(baseline, args.max_throughput_drop, args.max_p99_increase)
     runner.create_output_dir()
     runner.start_time = time.time()
     
@@ -219,7 +394,8 @@ def main():
         {
             'name': 'Extreme Load Test',
             'script': 'benchmark_extreme_load.py',
-            'description': '1 million messages spike test (takes 10-30 min)'
+            'description': '1 million messages spike test (takes 10-30 min)',
+            'args': ['--yes']  # Đã xác nhận ở đầu runner, không hỏi lại
         }
     ]
     
@@ -232,7 +408,8 @@ def main():
         runner.run_benchmark(
             benchmark['name'],
             benchmark['script'],
-            benchmark['description']
+            benchmark['description'],
+            benchmark.get('args', ())
         )
         
         # Pause between tests
@@ -240,6 +417,13 @@ def main():
             print(f"\n⏸️  Pausing 10 seconds before next test...")
             time.sleep(10)
     
+    # Collected metrics (+ baseline mới nếu được yêu cầu)
+    summary_file = runner.save_results_summary()
+    if args.save_baseline:
+        with open(summary_file) as src, open(args.save_baseline, 'w') as dst:
+            dst.write(src.read())
+        print(f"📌 Baseline saved: {args.save_baseline}")
+    
     # Generate report
     runner.generate_summary_report()
     
@@ -247,10 +431,11 @@ def main():
     runner.print_final_summary()
     
     print(f"✅ All done! Check {runner.output_dir}/ for detailed results.\n")
+    return runner.exit_code()
 
 if __name__ == "__main__":
     try:
-        main()
+        sys.exit(main())
     except KeyboardInterrupt:
         print("\n\n❌ Interrupted by user")
         sys.exit(1)
@@ -0,0 +1,222 @@
+"""
+Saturation Search - Tìm throughput tối đa bền vững với p99 < SLO
+Dùng workload ghi của benchmark_extreme_load.py, chạy các bước ngắn với rate
+cố định (open-loop) rồi tìm nhị phân rate mà tại đó SLO bị vi phạm.
+
+Kết quả: "max sustained msgs/s với p99 < X ms" + đường cong throughput-latency.
+"""
+
+import argparse
+import asyncio
+import time
+import statistics
+
+from benchmark_extreme_load import (
+    connect_to_cassandra, get_sample_data, prepare_write_statement, worker_extreme_write
+)
+from report import print_saturation_report
+from results_io import add_results_arguments, save_results, render_after_run
+
+# Search parameters
+SLO_P99_MS = 50.0          # p99 tối đa cho phép
+MAX_ERROR_RATE = 0.01      # Tỷ lệ lỗi tối đa cho phép trong 1 bước
+MIN_DELIVERY_RATIO = 0.95  # Throughput đạt được phải >= 95% rate đặt ra
+STEP_DURATION = 20         # Giây mỗi bước
+WARMUP_DURATION = 10       # Giây warmup trước khi tìm kiếm
+COOLDOWN = 3               # Nghỉ giữa các bước
+START_RATE = 500           # msgs/s bước đầu tiên
+MAX_RATE = 200_000         # Trần tìm kiếm
+TOLERANCE = 0.05           # Dừng khi (hi - lo) / lo <= 5%
+MAX_IN_FLIGHT = 10_000     # Chặn client: vượt quá coi như request bị loại
+TICK_SECONDS = 0.005       # Độ phân giải lịch gửi
+
+# ============================================================================
+# FIXED-RATE STEP
+# ============================================================================
+async def run_fixed_rate_step(session, conversation_ids, user_ids, prepared_stmt,
+                              rate, duration):
+    """
+    Gửi request với rate cố định trong `duration` giây (open-loop).
+    Latency được tính từ thời điểm lẽ ra phải gửi (tránh coordinated omission):
+    khi client hoặc cluster bị dồn, độ trễ xếp hàng vẫn được tính vào p99.
+    """
+    interval = 1.0 / rate
+    total = int(rate * duration)
+    latencies = []
+    failures = 0
+    dropped = 0
+    in_flight = 0
+    pending = set()
+
+    async def send(scheduled):
+        nonlocal failures, in_flight
+        try:
+            _, success = await worker_extreme_write(
+                session, conversation_ids, user_ids, prepared_stmt
+            )
+        finally:
+            in_flight -= 1
+        latencies.append((time.perf_counter() - scheduled) * 1000)
+        if not success:
+            failures += 1
+
+    start = time.perf_counter()
+    sent = 0
+    while sent < total:
+        now = time.perf_counter()
+        # Gửi tất cả request đã tới lịch
+        due = min(total, int((now - start) / interval) + 1)
+        while sent < due:
+            scheduled = start + sent * interval
+            sent += 1
+            if in_flight >= MAX_IN_FLIGHT:
+                dropped += 1
+                continue
+            in_flight += 1
+            task = asyncio.ensure_future(send(scheduled))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+        await asyncio.sleep(TICK_SECONDS)
+
+    if pending:
+        await asyncio.gather(*list(pending), return_exceptions=True)
+    elapsed = time.perf_counter() - start
+
+    completed = len(latencies) - failures
+    errors = failures + dropped
+    if len(latencies) >= 100:
+        p50 = statistics.median(latencies)
+        p99 = statistics.quantiles(latencies, n=100)[98]
+    else:
+        p50 = statistics.median(latencies) if latencies else float('inf')
+        p99 = max(latencies) if latencies else float('inf')
+
+    return {
+        'offered_rate': rate,
+        'throughput': completed / elapsed,
+        'p50': p50,
+        'p99': p99,
+        'error_rate': errors / total if total else 0.0,
+        'failures': failures,
+        'dropped': dropped,
+        'requests': total
+    }
+
+def step_passes(step, slo_p99_ms):
+    """Bước đạt SLO: p99 trong ngưỡng, ít lỗi và cluster theo kịp rate đặt ra"""
+    return (step['p99'] <= slo_p99_ms
+            and step['error_rate'] <= MAX_ERROR_RATE
+            and step['throughput'] >= MIN_DELIVERY_RATIO * step['offered_rate'])
+
+# ============================================================================
+# SEARCH
+# ============================================================================
+async def saturation_search(session, conversation_ids, user_ids, slo_p99_ms,
+                            start_rate, max_rate, step_duration):
+    """
+    1. Tăng rate gấp đôi tới khi SLO vỡ (hoặc chạm max_rate)
+    2. Tìm nhị phân giữa rate đạt cuối cùng và rate vỡ đầu tiên
+    Returns: (danh sách các bước đã chạy, bước đạt SLO có rate cao nhất hoặc None)
+    """
+    prepared_stmt = prepare_write_statement(session)
+    steps = []
+
+    async def run_step(rate):
+        print(f"\n   ▶️  Step @ {rate:,.0f} msgs/s ({step_duration}s)...")
+        step = await run_fixed_rate_step(
+            session, conversation_ids, user_ids, prepared_stmt, rate, step_duration
+        )
+        step['passed'] = step_passes(step, slo_p99_ms)
+        steps.append(step)
+        status = "✅ PASS" if step['passed'] else "❌ FAIL"
+        print(f"      {status}: {step['throughput']:,.0f} msgs/s | p50 {step['p50']:.1f}ms | "
+              f"p99 {step['p99']:.1f}ms | errors {step['error_rate']*100:.2f}%")
+        await asyncio.sleep(COOLDOWN)
+        return step
+
+    print(f"\n🔥 Warmup {WARMUP_DURATION}s @ {start_rate:,.0f} msgs/s...")
+    await run_fixed_rate_step(
+        session, conversation_ids, user_ids, prepared_stmt, start_rate, WARMUP_DURATION
+    )
+
+    # Phase 1: exponential ramp
+    best = None
+    lo, hi = 0.0, None
+    rate = float(start_rate)
+    while rate <= max_rate:
+        step = await run_step(rate)
+        if not step['passed']:
+            hi = rate
+            break
+        best, lo = step, rate
+        rate *= 2
+
+    if hi is None:
+        print(f"\n⚠️  Chưa vỡ SLO tới MAX_RATE={max_rate:,} msgs/s")
+        return steps, best
+
+    # Phase 2: binary search
+    while lo == 0 or (hi - lo) / lo > TOLERANCE:
+        mid = (lo + hi) / 2 if lo > 0 else hi / 2
+        if mid < 1:
+            break
+        step = await run_step(mid)
+        if step['passed']:
+            best, lo = step, mid
+        else:
+            hi = mid
+
+    return steps, best
+
+# ============================================================================
+# ARTIFACT
+# ============================================================================
+def summary_metrics(steps, best):
+    """capacity.throughput (rate cao nhất đạt SLO) và số bước đã chạy"""
+    summary = {'steps': len(steps)}
+    if best:
+        summary['capacity.throughput'] = best['throughput']
+        summary['capacity.offered_rate'] = best['offered_rate']
+    return summary
+
+# ============================================================================
+# MAIN
+# ============================================================================
+async def main():
+    parser = argparse.ArgumentParser(description='Saturation search: max throughput under p99 SLO')
+    parser.add_argument('--slo-p99', type=float, default=SLO_P99_MS, help='SLO p99 (ms)')
+    parser.add_argument('--start-rate', type=float, default=START_RATE, help='Rate bắt đầu (msgs/s)')
+    parser.add_argument('--max-rate', type=float, default=MAX_RATE, help='Rate tối đa (msgs/s)')
+    parser.add_argument('--step-duration', type=int, default=STEP_DURATION, help='Giây mỗi bước')
+    add_results_arguments(parser, 'saturation')
+    args = parser.parse_args()
+
+    print("\n" + "="*60)
+    print("📈 SATURATION SEARCH - MAX THROUGHPUT UNDER p99 SLO")
+    print("="*60)
+    print(f"SLO: p99 < {args.slo_p99:.0f}ms, errors <= {MAX_ERROR_RATE*100:.0f}%")
+    print(f"Step: {args.step_duration}s, rate {args.start_rate:,.0f} → {args.max_rate:,.0f} msgs/s")
+
+    session, cluster = connect_to_cassandra()
+
+    try:
+        user_ids, conversation_ids = get_sample_data(session)
+
+        steps, best = await saturation_search(
+            session, conversation_ids, user_ids, args.slo_p99,
+            args.start_rate, args.max_rate, args.step_duration
+        )
+
+        data = {'slo_p99_ms': args.slo_p99, 'max_error_rate': MAX_ERROR_RATE,
+                'steps': steps, 'best': best}
+        print_saturation_report(data)
+
+        # Artifact + visualization (report.py)
+        save_results(args.results, 'saturation', summary_metrics(steps, best), data, args)
+        render_after_run(args.results, args.no_report)
+
+    finally:
+        cluster.shutdown()
+
+if __name__ == "__main__":
+    asyncio.run(main())
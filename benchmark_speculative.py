@@ -0,0 +1,292 @@
+"""
+Speculative Execution Benchmark - Giảm tail latency bằng hedged requests
+So sánh: không speculation vs ConstantSpeculativeExecutionPolicy với nhiều delay,
+cho read và write idempotent (INSERT với message_id sinh ở client).
+
+Mỗi chế độ chạy 2 kịch bản:
+1. healthy: cluster bình thường -> chi phí của speculation (request thừa)
+2. stalled: 1 node bị `docker pause` định kỳ (mô phỏng GC pause / compaction)
+   -> lợi ích với p99 / p99.9
+
+Request load thêm đo bằng ResponseFuture.attempted_hosts (mỗi host đã gửi request).
+"""
+
+import argparse
+import asyncio
+import random
+import time
+import uuid
+
+from cassandra.cluster import Cluster, ExecutionProfile, EXEC_PROFILE_DEFAULT
+from cassandra.policies import (
+    ConstantSpeculativeExecutionPolicy, DCAwareRoundRobinPolicy, TokenAwarePolicy
+)
+from cassandra.query import ConsistencyLevel
+
+from benchmark_consistency import CL_NAMES, parse_level
+from concurrency_control import wait_for_response
+from workload_manifest import get_sample_data as sample_ids
+from report import print_speculative_report
+from results_io import add_results_arguments, save_results, render_after_run
+
+# Configuration
+CONTACT_POINTS = ['127.0.0.1']
+PORT = 9042
+KEYSPACE = 'realtime_chat_app'
+REQUEST_TIMEOUT = 10.0
+
+# Test parameters
+SPECULATIVE_DELAYS_MS = [2, 5, 10, 25, 50]   # Delay trước khi gửi request dự phòng
+MAX_SPECULATIVE = 1          # Số request dự phòng tối đa mỗi query
+NUM_OPERATIONS = 20000       # Đủ lớn để p99.9 có ~20 mẫu
+WARMUP_OPERATIONS = 1000
+CONCURRENCY = 32
+READ_LIMIT = 20
+CONSISTENCY = ConsistencyLevel.ONE
+
+# Slow node (docker pause định kỳ)
+STALL_NODE = 'cassandra-2'
+STALL_MS = 200               # Thời gian pause mỗi lần
+STALL_EVERY = 2.0            # Giây giữa 2 lần pause
+
+def profile_name(delay_ms):
+    return 'no speculation' if delay_ms is None else f'speculate@{delay_ms}ms'
+
+def connect_with_profiles(delays_ms):
+    """1 execution profile cho mỗi delay (+ profile mặc định không speculation)"""
+    def make_profile(policy=None):
+        kwargs = {'speculative_execution_policy': policy} if policy else {}
+        return ExecutionProfile(
+            load_balancing_policy=TokenAwarePolicy(DCAwareRoundRobinPolicy()),
+            request_timeout=REQUEST_TIMEOUT, **kwargs)
+
+    profiles = {EXEC_PROFILE_DEFAULT: make_profile()}
+    for delay_ms in delays_ms:
+        profiles[profile_name(delay_ms)] = make_profile(
+            ConstantSpeculativeExecutionPolicy(delay_ms / 1000, MAX_SPECULATIVE))
+
+    cluster = Cluster(CONTACT_POINTS, port=PORT, execution_profiles=profiles)
+    session = cluster.connect(KEYSPACE)
+    print(f"✅ Kết nối thành công đến {KEYSPACE} ({len(profiles)} execution profiles)")
+    return session, cluster
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile trên list đã sắp xếp"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(p / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+# ============================================================================
+# SLOW NODE
+# ============================================================================
+class NodeStaller:
+    """docker pause / unpause 1 node định kỳ trong task nền (không chặn event loop)"""
+
+    def __init__(self, node, stall_ms, every):
+        self.node = node
+        self.stall_ms = stall_ms
+        self.every = every
+        self.stalls = 0
+        self._task = None
+
+    async def _docker(self, action, quiet=False):
+        process = await asyncio.create_subprocess_exec(
+            'docker', action, self.node,
+            stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.PIPE)
+        _, stderr = await process.communicate()
+        if process.returncode != 0 and not quiet:
+            print(f"   ⚠️  docker {action} {self.node}: {stderr.decode().strip()}")
+        return process.returncode == 0
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.every * random.uniform(0.5, 1.5))
+            try:
+                if await self._docker('pause'):
+                    await asyncio.sleep(self.stall_ms / 1000)
+                    self.stalls += 1
+            finally:
+                # Unpause kể cả khi task bị cancel giữa chừng
+                await asyncio.shield(self._docker('unpause', quiet=True))
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            await self._docker('unpause', quiet=True)   # Phòng khi cancel lúc đang pause
+
+# ============================================================================
+# WORKLOAD
+# ============================================================================
+class HedgedWorkload:
+    """Read/write idempotent; ghi lại latency và số host đã thử mỗi request"""
+
+    def __init__(self, session, conversation_ids, user_ids, consistency_level):
+        self.session = session
+        self.conversation_ids = conversation_ids
+        self.user_ids = user_ids
+        self.consistency_level = consistency_level
+        self._insert = session.prepare(
+            "INSERT INTO messages_by_conversation "
+            "(conversation_id, message_id, sender_id, sender_username, text_content, attachments) "
+            "VALUES (?, ?, ?, ?, ?, ?)"
+        )
+        self._select = session.prepare(
+            "SELECT message_id, sender_id, text_content FROM messages_by_conversation "
+            "WHERE conversation_id = ? LIMIT ?"
+        )
+
+    def _statement(self, op):
+        if op == 'read':
+            statement = self._select.bind((random.choice(self.conversation_ids), READ_LIMIT))
+        else:
+            # message_id sinh ở client nên INSERT lặp lại cho cùng kết quả
+            statement = self._insert.bind((
+                random.choice(self.conversation_ids), uuid.uuid1(), random.choice(self.user_ids),
+                'speculative_test', 'Speculative execution test', []))
+        statement.consistency_level = self.consistency_level
+        # Driver chỉ gửi speculative execution cho statement idempotent
+        statement.is_idempotent = True
+        return statement
+
+    async def execute(self, op, profile):
+        """Returns: (latency ms, số host đã thử, thành công)"""
+        statement = self._statement(op)
+        start = time.perf_counter()
+        future = self.session.execute_async(statement, execution_profile=profile)
+        try:
+            await wait_for_response(future)
+            success = True
+        except Exception:
+            success = False
+        return (time.perf_counter() - start) * 1000, max(1, len(future.attempted_hosts)), success
+
+async def run_mode(workload, op, profile, num_ops, concurrency):
+    latencies, attempts = [], []
+    failures = 0
+    remaining = num_ops
+
+    async def worker():
+        nonlocal remaining, failures
+        while remaining > 0:
+            remaining -= 1
+            latency, hosts, success = await workload.execute(op, profile)
+            latencies.append(latency)
+            attempts.append(hosts)
+            if not success:
+                failures += 1
+
+    start_time = time.time()
+    await asyncio.gather(*[worker() for _ in range(min(concurrency, num_ops))])
+    total_time = time.time() - start_time
+
+    latencies.sort()
+    return {
+        'throughput': num_ops / total_time,
+        'p50': percentile(latencies, 50),
+        'p99': percentile(latencies, 99),
+        'p999': percentile(latencies, 99.9),
+        'max': latencies[-1],
+        'extra_load': (sum(attempts) - num_ops) / num_ops,
+        'failures': failures,
+    }
+
+# ============================================================================
+# ARTIFACT
+# ============================================================================
+def artifact_data(results, scenarios, modes):
+    """{(scenario, op, mode): kết quả} -> các dòng JSON (chế độ đầu tiên là baseline)"""
+    return {
+        'scenarios': scenarios,
+        'modes': modes,
+        'results': [{'scenario': scenario, 'op': op, 'mode': mode, **r}
+                    for (scenario, op, mode), r in results.items()],
+    }
+
+def summary_metrics(results):
+    """{scenario}.{op}.{mode}.throughput / p99 / p999 / extra_load"""
+    summary = {}
+    for (scenario, op, mode), r in results.items():
+        prefix = f"{scenario}.{op}.{mode.replace(' ', '_')}"
+        for metric in ('throughput', 'p99', 'p999', 'extra_load'):
+            summary[f"{prefix}.{metric}"] = r[metric]
+    return summary
+
+# ============================================================================
+# MAIN
+# ============================================================================
+async def main():
+    parser = argparse.ArgumentParser(description='So sánh speculative execution policy')
+    parser.add_argument('--delays', nargs='+', type=int, default=SPECULATIVE_DELAYS_MS,
+                        help='Các delay speculative (ms)')
+    parser.add_argument('--ops', type=int, default=NUM_OPERATIONS)
+    parser.add_argument('--warmup', type=int, default=WARMUP_OPERATIONS)
+    parser.add_argument('--concurrency', type=int, default=CONCURRENCY)
+    parser.add_argument('--consistency', type=parse_level, default=CONSISTENCY)
+    parser.add_argument('--op', nargs='+', choices=['read', 'write'], default=['read', 'write'])
+    parser.add_argument('--stall-node', default=STALL_NODE,
+                        help='Container bị pause định kỳ ở kịch bản stalled')
+    parser.add_argument('--stall-ms', type=int, default=STALL_MS)
+    parser.add_argument('--stall-every', type=float, default=STALL_EVERY)
+    parser.add_argument('--no-stall', action='store_true', help='Chỉ chạy kịch bản healthy')
+    add_results_arguments(parser, 'speculative')
+    args = parser.parse_args()
+
+    delays = sorted(set(args.delays))
+    modes = [profile_name(None)] + [profile_name(d) for d in delays]
+    scenarios = ['healthy'] if args.no_stall else ['healthy', 'stalled']
+
+    print("\n" + "="*60)
+    print("🎯 SPECULATIVE EXECUTION BENCHMARK")
+    print("="*60)
+    print(f"CL {CL_NAMES[args.consistency]}, modes: {', '.join(modes)}")
+    if not args.no_stall:
+        print(f"Stall: pause {args.stall_node} {args.stall_ms}ms mỗi ~{args.stall_every}s")
+
+    session, cluster = connect_with_profiles(delays)
+    staller = NodeStaller(args.stall_node, args.stall_ms, args.stall_every)
+    try:
+        user_ids, conversation_ids = sample_ids(session, num_users=100, num_conversations=100,
+                                                keyspace=KEYSPACE)
+        workload = HedgedWorkload(session, conversation_ids, user_ids, args.consistency)
+
+        results = {}
+        for scenario in scenarios:
+            print(f"\n{'='*60}")
+            print(f"🔍 Kịch bản: {scenario}")
+            print(f"{'='*60}")
+            if scenario == 'stalled':
+                staller.start()
+            for op in args.op:
+                for mode in modes:
+                    profile = EXEC_PROFILE_DEFAULT if mode == profile_name(None) else mode
+                    if args.warmup:
+                        await run_mode(workload, op, profile, args.warmup, args.concurrency)
+                    r = await run_mode(workload, op, profile, args.ops, args.concurrency)
+                    results[(scenario, op, mode)] = r
+                    print(f"   - {op:<5} {mode:<18} p50 {r['p50']:.2f}ms | p99 {r['p99']:.2f}ms | "
+                          f"p99.9 {r['p999']:.2f}ms | +{r['extra_load']*100:.1f}% request")
+            await staller.stop()
+            if scenario == 'stalled':
+                print(f"   ⏸️  {staller.stalls} lần pause {args.stall_node}")
+
+        data = artifact_data(results, scenarios, modes)
+        print_speculative_report(data)
+
+        # Artifact + visualization (report.py)
+        save_results(args.results, 'speculative', summary_metrics(results), data, args)
+        render_after_run(args.results, args.no_report)
+    finally:
+        await staller.stop()
+        cluster.shutdown()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,231 @@
+"""
+Staleness Benchmark (PBS - Probabilistically Bounded Staleness)
+Đo xác suất đọc dữ liệu cũ với consistency level yếu:
+1. Ghi 1 tin nhắn mới với CL = W qua coordinator A
+2. Chờ delay t sau khi write được ack (0-500ms)
+3. Đọc lại đúng tin nhắn đó với CL = R qua coordinator B khác A
+4. Stale nếu tin nhắn chưa xuất hiện
+
+Kết quả: P(stale) theo delay cho từng cặp (W, R), kèm khoảng tin cậy 95% (Wilson).
+Chạy cùng lúc với 1 benchmark tải khác (hoặc --background) để thấy độ trễ
+replication khi cluster bận.
+"""
+
+import argparse
+import asyncio
+import math
+import random
+import time
+import uuid
+
+from cassandra.query import ConsistencyLevel
+
+from benchmark import connect_to_cassandra
+from benchmark_consistency import CL_NAMES, parse_pair, pair_label, replicas_required, REPLICATION_FACTOR
+from concurrency_control import wait_for_response
+from report import print_staleness_report
+from results_io import add_results_arguments, save_results, render_after_run
+
+# Test parameters
+DELAYS_MS = [0, 1, 5, 10, 25, 50, 100, 250, 500]
+PROBES_PER_POINT = 500        # Số lần ghi/đọc mỗi (cặp, delay)
+PROBE_CONCURRENCY = 32
+BACKGROUND_CONCURRENCY = 0    # Số worker ghi nền tạo tải (0 = tắt)
+
+CL_PAIRS = [
+    (ConsistencyLevel.ONE, ConsistencyLevel.ONE),
+    (ConsistencyLevel.ONE, ConsistencyLevel.QUORUM),
+    (ConsistencyLevel.QUORUM, ConsistencyLevel.ONE),
+    (ConsistencyLevel.QUORUM, ConsistencyLevel.QUORUM),
+]
+
+def wilson_interval(stale, total, z=1.96):
+    """Khoảng tin cậy 95% cho tỷ lệ (đúng cả khi stale = 0)"""
+    if total == 0:
+        return 0.0, 0.0
+    p = stale / total
+    denominator = 1 + z * z / total
+    center = (p + z * z / (2 * total)) / denominator
+    margin = z * math.sqrt(p * (1 - p) / total + z * z / (4 * total * total)) / denominator
+    return max(0.0, center - margin), min(1.0, center + margin)
+
+# ============================================================================
+# PROBE
+# ============================================================================
+class StalenessProbe:
+    """Ghi qua 1 coordinator, đọc lại qua coordinator khác sau delay"""
+
+    def __init__(self, session, hosts):
+        self.session = session
+        self.hosts = hosts
+        self._insert = session.prepare(
+            "INSERT INTO messages_by_conversation "
+            "(conversation_id, message_id, sender_id, sender_username, text_content, attachments) "
+            "VALUES (?, ?, ?, ?, ?, ?)"
+        )
+        self._select = session.prepare(
+            "SELECT message_id FROM messages_by_conversation "
+            "WHERE conversation_id = ? AND message_id = ?"
+        )
+
+    def _coordinators(self):
+        write_host = random.choice(self.hosts)
+        others = [h for h in self.hosts if h is not write_host]
+        return write_host, random.choice(others) if others else write_host
+
+    async def probe(self, write_cl, read_cl, delay_ms):
+        """
+        Returns: (stale, delay thực tế ms) hoặc None nếu write/read lỗi
+        (lỗi không tính là stale hay fresh)
+        """
+        conversation_id, message_id = uuid.uuid4(), uuid.uuid1()
+        write_host, read_host = self._coordinators()
+
+        write = self._insert.bind((conversation_id, message_id, uuid.uuid4(),
+                                   'staleness_probe', 'PBS probe', []))
+        write.consistency_level = write_cl
+        read = self._select.bind((conversation_id, message_id))
+        read.consistency_level = read_cl
+
+        try:
+            await wait_for_response(self.session.execute_async(write, host=write_host))
+            acked = time.perf_counter()
+            if delay_ms:
+                await asyncio.sleep(delay_ms / 1000)
+            actual_delay = (time.perf_counter() - acked) * 1000
+            rows = await wait_for_response(self.session.execute_async(read, host=read_host))
+        except Exception:
+            return None
+        return len(rows) == 0, actual_delay
+
+async def measure_point(probe, write_cl, read_cl, delay_ms, num_probes, concurrency):
+    """P(stale) cho 1 (cặp, delay)"""
+    stale = fresh = errors = 0
+    actual_delays = []
+    remaining = num_probes
+
+    async def worker():
+        nonlocal remaining, stale, fresh, errors
+        while remaining > 0:
+            remaining -= 1
+            result = await probe.probe(write_cl, read_cl, delay_ms)
+            if result is None:
+                errors += 1
+                continue
+            is_stale, actual_delay = result
+            actual_delays.append(actual_delay)
+            if is_stale:
+                stale += 1
+            else:
+                fresh += 1
+
+    await asyncio.gather(*[worker() for _ in range(min(concurrency, num_probes))])
+    total = stale + fresh
+    low, high = wilson_interval(stale, total)
+    return {
+        'delay_ms': delay_ms,
+        'actual_delay_ms': sum(actual_delays) / len(actual_delays) if actual_delays else None,
+        'stale': stale,
+        'total': total,
+        'errors': errors,
+        'p_stale': stale / total if total else 0.0,
+        'ci_low': low,
+        'ci_high': high,
+    }
+
+async def background_writes(session, stop_event, concurrency):
+    """Tải ghi nền vào partition riêng để replica bận (và lệch nhau) như khi chạy thật"""
+    insert = session.prepare(
+        "INSERT INTO messages_by_conversation "
+        "(conversation_id, message_id, sender_id, sender_username, text_content, attachments) "
+        "VALUES (?, ?, ?, ?, ?, ?)"
+    )
+    conversation_ids = [uuid.uuid4() for _ in range(1000)]
+
+    async def worker():
+        while not stop_event.is_set():
+            try:
+                await wait_for_response(session.execute_async(insert, (
+                    random.choice(conversation_ids), uuid.uuid1(), uuid.uuid4(),
+                    'background', 'x' * 200, [])))
+            except Exception:
+                await asyncio.sleep(0.01)
+
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+
+# ============================================================================
+# ARTIFACT
+# ============================================================================
+def summary_metrics(results):
+    """{W/R}.{delay}ms.p_stale"""
+    return {f"{label}.{p['delay_ms']}ms.p_stale": p['p_stale']
+            for label, points in results.items() for p in points}
+
+# ============================================================================
+# MAIN
+# ============================================================================
+async def main():
+    parser = argparse.ArgumentParser(description='Đo xác suất đọc dữ liệu cũ (PBS) theo cặp CL')
+    parser.add_argument('--pairs', nargs='+', type=parse_pair, default=CL_PAIRS,
+                        help='Các cặp W/R, ví dụ ONE/ONE QUORUM/ONE')
+    parser.add_argument('--delays', nargs='+', type=int, default=DELAYS_MS,
+                        help='Các delay (ms) giữa write ack và read')
+    parser.add_argument('--probes', type=int, default=PROBES_PER_POINT,
+                        help='Số probe mỗi (cặp, delay)')
+    parser.add_argument('--concurrency', type=int, default=PROBE_CONCURRENCY)
+    parser.add_argument('--background', type=int, default=BACKGROUND_CONCURRENCY,
+                        help='Số worker ghi nền tạo tải trong lúc đo (0 = tắt)')
+    add_results_arguments(parser, 'staleness')
+    args = parser.parse_args()
+    delays = sorted(args.delays)
+
+    print("\n" + "="*60)
+    print("⏱️  STALENESS (PBS) BENCHMARK")
+    print("="*60)
+
+    session, cluster = connect_to_cassandra()
+    stop_event = asyncio.Event()
+    background = None
+    try:
+        hosts = [h for h in cluster.metadata.all_hosts() if h.is_up]
+        print(f"🖥️  Coordinators: {', '.join(str(h.address) for h in hosts)}")
+        if len(hosts) < 2:
+            print("⚠️  Chỉ có 1 node: không thể đọc qua coordinator khác")
+
+        if args.background:
+            print(f"🏋️  Tải ghi nền: {args.background} workers")
+            background = asyncio.create_task(
+                background_writes(session, stop_event, args.background))
+
+        probe = StalenessProbe(session, hosts)
+        results = {}
+        for write_cl, read_cl in args.pairs:
+            label = f"{CL_NAMES[write_cl]}/{CL_NAMES[read_cl]}"
+            overlap = replicas_required(write_cl) + replicas_required(read_cl) > REPLICATION_FACTOR
+            print(f"\n🔍 {pair_label(write_cl, read_cl)} "
+                  f"({'R + W > RF' if overlap else 'R + W ≤ RF'})")
+            points = []
+            for delay_ms in delays:
+                point = await measure_point(probe, write_cl, read_cl, delay_ms,
+                                            args.probes, args.concurrency)
+                points.append(point)
+                actual = (f", delay thực tế {point['actual_delay_ms']:.1f}ms"
+                          if point['actual_delay_ms'] is not None else '')
+                print(f"   {delay_ms:>4}ms: {point['stale']}/{point['total']} stale "
+                      f"({point['p_stale']*100:.2f}%{actual})")
+            results[label] = points
+
+        data = {'delays': delays, 'results': results}
+        print_staleness_report(data)
+
+        # Artifact + visualization (report.py)
+        save_results(args.results, 'staleness', summary_metrics(results), data, args)
+        render_after_run(args.results, args.no_report)
+    finally:
+        stop_event.set()
+        if background:
+            await background
+        cluster.shutdown()
+
+if __name__ == "__main__":
+    asyncio.run(main())
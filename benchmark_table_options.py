@@ -0,0 +1,384 @@
+"""
+Table Options Benchmark - Ma trận compaction x compression
+Tạo lại bảng (mặc định messages_by_conversation) trong keyspace riêng với từng
+cấu hình STCS/LCS/TWCS x LZ4/Zstd/Deflate x chunk size, nạp CÙNG dữ liệu đã seed
+(copy từ realtime_chat_app) và đo cho mỗi cấu hình:
+- Write throughput / p99
+- Compaction backlog ngay sau khi nạp và thời gian để compaction lắng xuống
+- Dung lượng trên đĩa (tổng các node, nodetool tablestats) và tỷ lệ nén
+- Read p99 (đọc trang đầu của partition sau khi flush)
+
+Rows được nạp lại với write timestamp gốc (USING TIMESTAMP): thời điểm trong
+clustering key timeuuid/timestamp (vd. thời gian gửi tin), hoặc WRITETIME của bảng nguồn, và
+theo thứ tự thời gian như tải thật. Nếu không, mọi cell mang thời điểm nạp và
+rơi vào cùng 1 cửa sổ TWCS, cột TWCS không đo được gì đặc thù của TWCS.
+
+Kết quả: bảng so sánh + artifact table_options_results.json (report.py vẽ)
+"""
+
+import argparse
+import asyncio
+import calendar
+import math
+import random
+import re
+import statistics
+import time
+
+from cassandra.util import unix_time_from_uuid1
+
+from benchmark import connect_to_cassandra, run_closed_loop
+from concurrency_control import wait_for_response
+from fault_scheduler import docker
+from report import print_table_options_report
+from results_io import add_results_arguments, save_results, render_after_run
+from schema_utils import load_tables, token_expression
+from token_ranges import scan_token_ranges
+
+# Configuration
+SOURCE_KEYSPACE = 'realtime_chat_app'
+BENCH_KEYSPACE = 'table_options_bench'   # Keyspace riêng, bảng bị DROP/CREATE mỗi cấu hình
+NODES = ['cassandra-1', 'cassandra-2', 'cassandra-3']
+
+# Matrix
+COMPACTION_STRATEGIES = {
+    'STCS': {'class': 'SizeTieredCompactionStrategy'},
+    'LCS': {'class': 'LeveledCompactionStrategy'},
+    'TWCS': {'class': 'TimeWindowCompactionStrategy',
+             'compaction_window_unit': 'DAYS', 'compaction_window_size': '1'},
+}
+COMPRESSORS = {
+    'LZ4': 'LZ4Compressor',
+    'Zstd': 'ZstdCompressor',
+    'Deflate': 'DeflateCompressor',
+}
+CHUNK_SIZES_KB = [16, 64]
+
+# Benchmark parameters
+MAX_ROWS = 200_000          # Số rows copy từ dữ liệu đã seed (lấy đều trên ring)
+WRITE_CONCURRENCY = 64
+READ_CONCURRENCY = 16
+READ_OPERATIONS = 2000
+READ_LIMIT = 50             # Rows mỗi lần đọc (1 trang)
+SETTLE_TIMEOUT = 300        # Giây tối đa chờ compaction hết pending
+SETTLE_POLL = 5
+NODETOOL_TIMEOUT = 120
+
+# ============================================================================
+# NODETOOL
+# ============================================================================
+async def nodetool(node, *args):
+    """Chạy nodetool trong container (không chặn event loop); trả về stdout hoặc None nếu lỗi"""
+    try:
+        ok, output = await asyncio.wait_for(docker('exec', node, 'nodetool', *args),
+                                            NODETOOL_TIMEOUT)
+    except (asyncio.TimeoutError, OSError) as e:
+        ok, output = False, f"{type(e).__name__}: {e}"
+    if not ok:
+        print(f"   ⚠️  nodetool {' '.join(args)} trên {node} lỗi: {output}")
+        return None
+    return output
+
+async def flush_table(nodes, table_name):
+    await asyncio.gather(*(nodetool(node, 'flush', BENCH_KEYSPACE, table_name) for node in nodes))
+
+async def pending_compactions(nodes):
+    """Tổng 'pending tasks' của compactionstats trên các node (None nếu không đọc được)"""
+    total, found = 0, False
+    for output in await asyncio.gather(*(nodetool(node, 'compactionstats') for node in nodes)):
+        match = re.search(r'pending tasks:\s*(\d+)', output or '')
+        if match:
+            total += int(match.group(1))
+            found = True
+    return total if found else None
+
+async def wait_for_compactions(nodes, timeout=SETTLE_TIMEOUT):
+    """Chờ compaction backlog về 0; trả về số giây đã chờ (None nếu hết timeout)"""
+    start = time.time()
+    while time.time() - start < timeout:
+        pending = await pending_compactions(nodes)
+        if pending is None:
+            return None
+        if pending == 0:
+            return time.time() - start
+        await asyncio.sleep(SETTLE_POLL)
+    return None
+
+async def table_disk_stats(nodes, table_name):
+    """Space used (live), số SSTable và tỷ lệ nén trung bình trên các node"""
+    space, sstables, ratios = 0, 0, []
+    outputs = await asyncio.gather(*(nodetool(node, 'tablestats', f'{BENCH_KEYSPACE}.{table_name}')
+                                     for node in nodes))
+    for output in outputs:
+        output = output or ''
+        match = re.search(r'Space used \(live\):\s*(\d+)', output)
+        if match:
+            space += int(match.group(1))
+        match = re.search(r'SSTable count:\s*(\d+)', output)
+        if match:
+            sstables += int(match.group(1))
+        match = re.search(r'SSTable Compression Ratio:\s*([\d.]+)', output)
+        if match and float(match.group(1)) > 0:
+            ratios.append(float(match.group(1)))
+    return {
+        'disk_mb': space / 1024 / 1024,
+        'sstables': sstables,
+        'compression_ratio': statistics.mean(ratios) if ratios else None,
+    }
+
+# ============================================================================
+# TABLE DEFINITIONS
+# ============================================================================
+def cql_map(options):
+    return '{' + ', '.join(f"'{k}': '{v}'" for k, v in options.items()) + '}'
+
+def build_matrix(compactions, compressors, chunk_sizes):
+    return [
+        {'name': f'{compaction}/{compressor}/{chunk}KB', 'compaction': compaction,
+         'compressor': compressor, 'chunk_kb': chunk}
+        for compaction in compactions
+        for compressor in compressors
+        for chunk in chunk_sizes
+    ]
+
+def create_table_cql(table, config):
+    """CREATE TABLE trong BENCH_KEYSPACE với cùng cột/khóa như schema.cql và option của config"""
+    columns = ',\n    '.join(f'{name} {ctype}' for name, ctype in table['columns'].items())
+    partition = ', '.join(table['partition_key'])
+    primary_key = ', '.join([f'({partition})'] + table['clustering_key'])
+
+    options = [
+        f"compaction = {cql_map(COMPACTION_STRATEGIES[config['compaction']])}",
+        f"compression = {cql_map({'class': COMPRESSORS[config['compressor']], 'chunk_length_in_kb': config['chunk_kb']})}",
+    ]
+    clustering = re.search(r'CLUSTERING\s+ORDER\s+BY\s*\([^)]*\)', table['options'], re.IGNORECASE)
+    if clustering:
+        options.insert(0, clustering.group(0))
+
+    return (f"CREATE TABLE {BENCH_KEYSPACE}.{table['name']} (\n    {columns},\n"
+            f"    PRIMARY KEY ({primary_key})\n) WITH " + '\n  AND '.join(options))
+
+def ensure_keyspace(session):
+    session.execute(
+        f"CREATE KEYSPACE IF NOT EXISTS {BENCH_KEYSPACE} WITH REPLICATION = "
+        "{'class': 'SimpleStrategy', 'replication_factor': 3}"
+    )
+
+# ============================================================================
+# DATA
+# ============================================================================
+def write_time_source(table):
+    """
+    Nguồn write timestamp cho 1 row: ('timeuuid' | 'timestamp', cột) nếu clustering key
+    là thời điểm (vd. thời gian gửi tin), nếu không ('writetime', cột thường đầu tiên không
+    phải collection). None nếu bảng chỉ có cột khóa / collection (không đọc được WRITETIME).
+    """
+    for column in table['clustering_key']:
+        if table['columns'][column] in ('timeuuid', 'timestamp'):
+            return table['columns'][column], column
+    keys = set(table['partition_key']) | set(table['clustering_key'])
+    for column, ctype in table['columns'].items():
+        if column not in keys and not re.match(r'(frozen<)?(list|set|map)<', ctype):
+            return 'writetime', column
+    return None
+
+async def load_source_rows(session, table, max_rows, num_ranges=256):
+    """
+    Copy tối đa max_rows rows của bảng đã seed, lấy đều trên token ring.
+    Returns: [(values, write timestamp µs | None)], sắp theo thời gian
+    """
+    columns = list(table['columns'])
+    source = write_time_source(table)
+    selected = ', '.join(columns)
+    if source and source[0] == 'writetime':
+        selected += f', WRITETIME({source[1]})'
+    token = token_expression(table)
+    per_range = max(1, math.ceil(max_rows / num_ranges))
+    statement = session.prepare(
+        f"SELECT {selected} FROM {SOURCE_KEYSPACE}.{table['name']} "
+        f"WHERE {token} > ? AND {token} <= ? LIMIT {per_range}"
+    )
+    rows = []
+
+    def timestamp(row):
+        if source is None:
+            return None
+        if source[0] == 'writetime':
+            return row[-1]
+        value = row[columns.index(source[1])]
+        if source[0] == 'timestamp':
+            # Driver trả datetime UTC không có tzinfo
+            return calendar.timegm(value.timetuple()) * 1_000_000 + value.microsecond
+        return int(unix_time_from_uuid1(value) * 1_000_000)
+
+    def collect(start, end, result):
+        rows.extend((tuple(row[:len(columns)]), timestamp(row)) for row in result)
+        return len(result)
+
+    await scan_token_ranges(session, statement, collect, num_ranges=num_ranges,
+                            label=table['name'])
+    random.shuffle(rows)
+    rows = rows[:max_rows]
+    # Nạp theo thứ tự thời gian như tải thật, để SSTable flush ra gần khớp cửa sổ TWCS
+    if source is not None:
+        rows.sort(key=lambda row: row[1])
+    return rows
+
+def latency_summary(latencies, total_time):
+    return {
+        'throughput': len(latencies) / total_time,
+        'p50': statistics.median(latencies),
+        'p99': statistics.quantiles(latencies, n=100)[98],
+    }
+
+async def write_rows(session, table, rows, concurrency):
+    """Ghi rows (values, timestamp); giữ write timestamp gốc bằng USING TIMESTAMP"""
+    columns = list(table['columns'])
+    keep_timestamp = rows[0][1] is not None
+    statement = session.prepare(
+        f"INSERT INTO {BENCH_KEYSPACE}.{table['name']} ({', '.join(columns)}) "
+        f"VALUES ({', '.join('?' for _ in columns)})"
+        + (" USING TIMESTAMP ?" if keep_timestamp else "")
+    )
+    stream = iter(rows)
+
+    async def write_one():
+        values, timestamp = next(stream)
+        params = values + (timestamp,) if keep_timestamp else values
+        start = time.perf_counter()
+        await wait_for_response(session.execute_async(statement, params))
+        return (time.perf_counter() - start) * 1000
+
+    latencies, total_time = await run_closed_loop(write_one, len(rows), concurrency)
+    return latency_summary(latencies, total_time)
+
+async def read_partitions(session, table, partition_keys, num_ops, concurrency):
+    where = ' AND '.join(f'{column} = ?' for column in table['partition_key'])
+    statement = session.prepare(
+        f"SELECT * FROM {BENCH_KEYSPACE}.{table['name']} WHERE {where} LIMIT {READ_LIMIT}"
+    )
+
+    async def read_one():
+        key = random.choice(partition_keys)
+        start = time.perf_counter()
+        await wait_for_response(session.execute_async(statement, key))
+        return (time.perf_counter() - start) * 1000
+
+    latencies, total_time = await run_closed_loop(read_one, num_ops, concurrency)
+    return latency_summary(latencies, total_time)
+
+# ============================================================================
+# MATRIX RUN
+# ============================================================================
+async def run_config(session, table, config, rows, partition_keys, args):
+    """DROP/CREATE bảng với config, nạp rows rồi đo write, backlog, dung lượng, read"""
+    print(f"\n⚙️  {table['name']} [{config['name']}]")
+    session.execute(f"DROP TABLE IF EXISTS {BENCH_KEYSPACE}.{table['name']}")
+    session.execute(create_table_cql(table, config))
+
+    write = await write_rows(session, table, rows, args.concurrency)
+    print(f"   📝 {write['throughput']:,.0f} rows/s | p99 {write['p99']:.2f}ms")
+
+    await flush_table(args.nodes, table['name'])
+    pending = await pending_compactions(args.nodes)
+    settle = await wait_for_compactions(args.nodes, args.settle_timeout)
+    disk = await table_disk_stats(args.nodes, table['name'])
+    print(f"   💽 {disk['disk_mb']:.1f} MB, {disk['sstables']} SSTables | "
+          f"pending sau nạp: {pending if pending is not None else '-'} | "
+          f"lắng sau: {f'{settle:.0f}s' if settle is not None else 'timeout/không rõ'}")
+
+    read = await read_partitions(session, table, partition_keys, args.read_ops, READ_CONCURRENCY)
+    print(f"   📖 p50 {read['p50']:.2f}ms | p99 {read['p99']:.2f}ms")
+
+    return {
+        'table': table['name'],
+        'config': config['name'],
+        'compaction': config['compaction'],
+        'compressor': config['compressor'],
+        'chunk_kb': config['chunk_kb'],
+        'rows': len(rows),
+        'write_throughput': write['throughput'],
+        'write_p99': write['p99'],
+        'read_p50': read['p50'],
+        'read_p99': read['p99'],
+        'pending_compactions': pending,
+        'settle_seconds': settle,
+        **disk,
+    }
+
+def summary_metrics(results):
+    """{bảng}.{cấu hình}.throughput (write) / write_p99 / read_p99 / disk_mb"""
+    summary = {}
+    for r in results:
+        name = f"{r['table']}.{r['config']}"
+        summary.update({
+            f"{name}.throughput": r['write_throughput'],
+            f"{name}.write_p99": r['write_p99'],
+            f"{name}.read_p99": r['read_p99'],
+            f"{name}.disk_mb": r['disk_mb'],
+        })
+    return summary
+
+# ============================================================================
+# MAIN
+# ============================================================================
+async def main():
+    schema_tables = {t['name']: t for t in load_tables()}
+
+    parser = argparse.ArgumentParser(description='Ma trận compaction x compression cho bảng chat')
+    parser.add_argument('--tables', nargs='+', default=['messages_by_conversation'],
+                        choices=sorted(schema_tables),
+                        help='Bảng cần đo (mặc định messages_by_conversation)')
+    parser.add_argument('--compaction', nargs='+', default=list(COMPACTION_STRATEGIES),
+                        choices=list(COMPACTION_STRATEGIES))
+    parser.add_argument('--compression', nargs='+', default=list(COMPRESSORS),
+                        choices=list(COMPRESSORS))
+    parser.add_argument('--chunk-kb', nargs='+', type=int, default=CHUNK_SIZES_KB)
+    parser.add_argument('--max-rows', type=int, default=MAX_ROWS,
+                        help=f'Số rows copy từ {SOURCE_KEYSPACE} (mặc định {MAX_ROWS:,})')
+    parser.add_argument('--concurrency', type=int, default=WRITE_CONCURRENCY)
+    parser.add_argument('--read-ops', type=int, default=READ_OPERATIONS)
+    parser.add_argument('--settle-timeout', type=int, default=SETTLE_TIMEOUT,
+                        help='Giây tối đa chờ compaction lắng (mặc định 300)')
+    parser.add_argument('--nodes', nargs='+', default=NODES, help='Tên container để chạy nodetool')
+    add_results_arguments(parser, 'table_options')
+    args = parser.parse_args()
+
+    matrix = build_matrix(args.compaction, args.compression, args.chunk_kb)
+
+    print("\n" + "="*60)
+    print("🗜️  COMPACTION x COMPRESSION BENCHMARK")
+    print("="*60)
+    print(f"Bảng: {', '.join(args.tables)} | {len(matrix)} cấu hình | keyspace {BENCH_KEYSPACE}")
+
+    session, cluster = connect_to_cassandra()
+    try:
+        ensure_keyspace(session)
+        results = []
+        for table_name in args.tables:
+            table = schema_tables[table_name]
+            print(f"\n📥 Copy tối đa {args.max_rows:,} rows từ {SOURCE_KEYSPACE}.{table_name}...")
+            rows = await load_source_rows(session, table, args.max_rows)
+            if not rows:
+                print(f"❌ {table_name} không có dữ liệu, chạy data_generator.py trước")
+                continue
+
+            if rows[0][1] is None:
+                print(f"   ⚠️  {table_name} không có cột lấy được write timestamp: "
+                      f"nạp với thời điểm hiện tại (TWCS không có ý nghĩa)")
+            key_indexes = [list(table['columns']).index(c) for c in table['partition_key']]
+            partition_keys = list({tuple(values[i] for i in key_indexes) for values, _ in rows})
+
+            for config in matrix:
+                results.append(await run_config(session, table, config, rows, partition_keys, args))
+
+        if results:
+            print_table_options_report(results)
+            save_results(args.results, 'table_options', summary_metrics(results),
+                         {'results': results}, args)
+            render_after_run(args.results, args.no_report)
+    finally:
+        cluster.shutdown()
+
+if __name__ == "__main__":
+    asyncio.run(main())
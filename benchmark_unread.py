@@ -0,0 +1,191 @@
+"""
+Unread Tracking Benchmark - read-modify-write int vs counter vs last-read watermark
+Với từng kích thước group (fan-out), mỗi mô hình chạy:
+1. Accuracy: chỉ gửi tin (1 người gửi / conversation, concurrency cao) rồi so sánh
+   số chưa đọc của các member khác với số tin thực tế -> đo cập nhật bị mất
+2. Mixed: send (tăng unread cho mọi member) / open (reset) / badge (đọc số chưa đọc)
+   theo tỷ lệ MIX, báo cáo throughput, latency p50/p99 theo từng loại và requests
+
+Yêu cầu: đã chạy schema.cql và schema_alternatives.cql.
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+import uuid
+
+from cassandra.util import uuid_from_time
+
+from benchmark import connect_to_cassandra, run_closed_loop
+from unread_models import UNREAD_CAP, CounterUnread, ReadModifyWriteUnread, WatermarkUnread
+from report import print_unread_report
+from results_io import add_results_arguments, save_results, render_after_run
+
+# Benchmark parameters
+FANOUT_SIZES = [2, 10, 50]    # Số member mỗi conversation
+NUM_CONVERSATIONS = 100       # Conversation mới cho mỗi (mô hình, fan-out)
+ACCURACY_SENDS = 2000
+MIXED_OPERATIONS = 5000
+MIX = {'send': 0.3, 'open': 0.2, 'badge': 0.5}
+CONCURRENCY = 64
+
+# ============================================================================
+# WORKLOAD
+# ============================================================================
+def make_conversations(num_conversations, fanout):
+    conversations = []
+    for _ in range(num_conversations):
+        members = [{'user_id': uuid.uuid4(), 'username': f'user_{random.randint(1, 10**6)}'}
+                   for _ in range(fanout)]
+        conversations.append({'conversation_id': uuid.uuid4(), 'members': members,
+                              'latest_message_id': None})
+    return conversations
+
+def new_message_id():
+    return uuid_from_time(time.time())
+
+async def run_accuracy(model, conversations, num_sends, concurrency):
+    """
+    Chỉ gửi tin: mỗi conversation có 1 người gửi cố định, các member khác không mở
+    nên unread đúng phải bằng số tin đã gửi (watermark: tối đa UNREAD_CAP).
+    Returns: (tỷ lệ badge sai, tổng số lần tăng bị mất, số request mỗi lần gửi)
+    """
+    sent = {c['conversation_id']: 0 for c in conversations}
+    requests_before = model.requests
+
+    async def send_one():
+        convo = random.choice(conversations)
+        sent[convo['conversation_id']] += 1
+        message_id = new_message_id()
+        convo['latest_message_id'] = message_id
+        start = time.perf_counter()
+        await model.on_send(convo, convo['members'][0], message_id, 'hello')
+        return (time.perf_counter() - start) * 1000
+
+    await run_closed_loop(send_one, num_sends, concurrency)
+    requests_per_send = (model.requests - requests_before) / num_sends
+
+    checks, wrong, lost = 0, 0, 0
+    for convo in conversations:
+        expected = sent[convo['conversation_id']]
+        if isinstance(model, WatermarkUnread):
+            expected = min(expected, UNREAD_CAP)
+        for member in convo['members'][1:]:
+            actual = await model.badge(member['user_id'], convo)
+            checks += 1
+            if actual != expected:
+                wrong += 1
+                lost += max(0, expected - actual)
+    return (wrong / checks if checks else 0.0), lost, requests_per_send
+
+async def run_mixed(model, conversations, num_ops, concurrency):
+    """Workload trộn send/open/badge; latency theo từng loại operation"""
+    latencies = {op: [] for op in MIX}
+    requests_before = model.requests
+    ops = random.choices(list(MIX), weights=list(MIX.values()), k=num_ops)
+    stream = iter(ops)
+
+    async def run_one():
+        op = next(stream)
+        convo = random.choice(conversations)
+        member = random.choice(convo['members'])
+        start = time.perf_counter()
+        if op == 'send':
+            message_id = new_message_id()
+            convo['latest_message_id'] = message_id
+            await model.on_send(convo, member, message_id, 'hello')
+        elif op == 'open':
+            await model.on_open(member['user_id'], convo, convo['latest_message_id'])
+        else:
+            await model.badge(member['user_id'], convo)
+        latency = (time.perf_counter() - start) * 1000
+        latencies[op].append(latency)
+        return latency
+
+    all_latencies, total_time = await run_closed_loop(run_one, num_ops, concurrency)
+    result = {
+        'throughput': len(all_latencies) / total_time,
+        'requests_per_op': (model.requests - requests_before) / num_ops,
+    }
+    for op, values in latencies.items():
+        if len(values) >= 2:
+            result[op] = {
+                'p50': statistics.median(values),
+                'p99': statistics.quantiles(values, n=100)[98],
+            }
+    return result
+
+# ============================================================================
+# ARTIFACT
+# ============================================================================
+def artifact_data(results, fanouts):
+    """{(fanout, model): kết quả} -> các dòng JSON"""
+    return {
+        'fanouts': fanouts,
+        'results': [{'fanout': fanout, 'model': name, **r} for (fanout, name), r in results.items()],
+    }
+
+def summary_metrics(results):
+    """fanout{N}.{model}.throughput / {op}_p99 / wrong_rate"""
+    summary = {}
+    for (fanout, name), r in results.items():
+        prefix = f"fanout{fanout}.{name.replace(' ', '_')}"
+        summary[f"{prefix}.throughput"] = r['throughput']
+        for op in MIX:
+            if op in r:
+                summary[f"{prefix}.{op}_p99"] = r[op]['p99']
+        summary[f"{prefix}.wrong_rate"] = r['wrong_rate']
+    return summary
+
+# ============================================================================
+# MAIN
+# ============================================================================
+async def main():
+    parser = argparse.ArgumentParser(description='So sánh cách theo dõi tin chưa đọc')
+    parser.add_argument('--fanout', nargs='+', type=int, default=FANOUT_SIZES,
+                        help='Số member mỗi conversation (mặc định 2 10 50)')
+    parser.add_argument('--conversations', type=int, default=NUM_CONVERSATIONS)
+    parser.add_argument('--accuracy-sends', type=int, default=ACCURACY_SENDS)
+    parser.add_argument('--ops', type=int, default=MIXED_OPERATIONS)
+    parser.add_argument('--concurrency', type=int, default=CONCURRENCY)
+    add_results_arguments(parser, 'unread')
+    args = parser.parse_args()
+
+    print("\n" + "="*60)
+    print("🔔 UNREAD TRACKING BENCHMARK")
+    print("="*60)
+    print("Mix: " + ', '.join(f'{op} {ratio:.0%}' for op, ratio in MIX.items()))
+
+    session, cluster = connect_to_cassandra()
+    try:
+        models = [ReadModifyWriteUnread(session), CounterUnread(session), WatermarkUnread(session)]
+        results = {}
+        for fanout in args.fanout:
+            for model in models:
+                print(f"\n👥 Fan-out {fanout} [{model.name}]")
+                conversations = make_conversations(args.conversations, fanout)
+
+                wrong_rate, lost, requests_per_send = await run_accuracy(
+                    model, conversations, args.accuracy_sends, args.concurrency)
+                print(f"   🎯 Send-only: {wrong_rate*100:.1f}% badge sai, {lost:,} lần tăng bị mất")
+
+                result = await run_mixed(model, conversations, args.ops, args.concurrency)
+                result.update({'wrong_rate': wrong_rate, 'lost': lost,
+                               'requests_per_send': requests_per_send})
+                results[(fanout, model.name)] = result
+                print(f"   ⚡ Mixed: {result['throughput']:,.0f} ops/s | " + ' | '.join(
+                    f"{op} p99 {result[op]['p99']:.2f}ms" for op in MIX if op in result))
+
+        data = artifact_data(results, args.fanout)
+        print_unread_report(data)
+
+        # Artifact + visualization (report.py)
+        save_results(args.results, 'unread', summary_metrics(results), data, args)
+        render_after_run(args.results, args.no_report)
+    finally:
+        cluster.shutdown()
+
+if __name__ == "__main__":
+    asyncio.run(main())
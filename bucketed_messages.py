@@ -0,0 +1,201 @@
+"""
+Bucketed Messages - Đường ghi/đọc tin nhắn cho 2 thiết kế bảng
+- MessageStore: messages_by_conversation (1 partition / conversation)
+- BucketedMessageStore: messages_by_conversation_bucketed (schema_alternatives.cql),
+  1 partition / (conversation, bucket thời gian); đọc trang đi lùi qua các bucket
+
+Cả hai dùng cursor keyset (message_id cuối trang trước) để phân trang, nên có thể
+so sánh trực tiếp độ trễ trang mới nhất và trang sâu.
+"""
+
+import asyncio
+
+from cassandra.util import unix_time_from_uuid1
+from concurrency_control import wait_for_response
+
+BUCKET_SECONDS = {
+    'day': 24 * 3600,
+    'week': 7 * 24 * 3600,
+}
+DEFAULT_BUCKET = 'day'
+BUCKET_LOOKAHEAD = 16   # Số bucket lấy từ bảng index mỗi lần khi đọc lùi
+MAX_BUCKET = 2**31 - 1  # Cận trên cho trang đầu (bucket mới nhất, kể cả lệch giờ)
+
+PAGE_COLUMNS = "message_id, sender_username, text_content, attachments"
+CLEANUP_CONCURRENCY = 256  # Số DELETE in-flight khi dọn dữ liệu benchmark
+
+def bucket_of(message_id, bucket_seconds=BUCKET_SECONDS[DEFAULT_BUCKET]):
+    """Bucket chứa message (tính từ thời gian trong timeuuid)"""
+    return int(unix_time_from_uuid1(message_id) // bucket_seconds)
+
+async def delete_partitions(session, statement, keys):
+    """DELETE theo từng partition key, tối đa CLEANUP_CONCURRENCY request in-flight"""
+    keys = list(keys)
+    for i in range(0, len(keys), CLEANUP_CONCURRENCY):
+        await asyncio.gather(*[wait_for_response(session.execute_async(statement, key))
+                               for key in keys[i:i + CLEANUP_CONCURRENCY]])
+    return len(keys)
+
+# ============================================================================
+# SINGLE PARTITION PER CONVERSATION
+# ============================================================================
+class MessageStore:
+    """messages_by_conversation: PRIMARY KEY ((conversation_id), message_id)"""
+
+    name = 'single partition'
+
+    def __init__(self, session):
+        self.session = session
+        self.queries = 0
+        self._insert = session.prepare(
+            "INSERT INTO messages_by_conversation "
+            "(conversation_id, message_id, sender_id, sender_username, text_content, attachments) "
+            "VALUES (?, ?, ?, ?, ?, ?)"
+        )
+        self._latest = session.prepare(
+            f"SELECT {PAGE_COLUMNS} FROM messages_by_conversation "
+            "WHERE conversation_id = ? LIMIT ?"
+        )
+        self._before = session.prepare(
+            f"SELECT {PAGE_COLUMNS} FROM messages_by_conversation "
+            "WHERE conversation_id = ? AND message_id < ? LIMIT ?"
+        )
+
+    async def write(self, msg):
+        """Ghi 1 message (dict của data_generator.create_fake_message)"""
+        self.queries += 1
+        await wait_for_response(self.session.execute_async(self._insert, (
+            msg['conversation_id'], msg['message_id'], msg['sender_id'],
+            msg['sender_username'], msg['text_content'], msg['attachments']
+        )))
+
+    def cursor_before(self, message_id):
+        """Cursor để trang tiếp theo bắt đầu ngay sau (cũ hơn) message_id"""
+        return message_id
+
+    async def read_page(self, conversation_id, page_size, cursor=None):
+        """Returns: (rows mới nhất trước, cursor trang tiếp theo hoặc None nếu hết)"""
+        self.queries += 1
+        if cursor is None:
+            future = self.session.execute_async(self._latest, (conversation_id, page_size))
+        else:
+            future = self.session.execute_async(self._before, (conversation_id, cursor, page_size))
+        rows = list(await wait_for_response(future))
+
+        if len(rows) < page_size:
+            return rows, None
+        return rows, self.cursor_before(rows[-1].message_id)
+
+    async def cleanup(self, timelines):
+        """Xóa partition của các conversation đã ghi ({conversation_id: [message_id]})"""
+        delete = self.session.prepare("DELETE FROM messages_by_conversation WHERE conversation_id = ?")
+        return await delete_partitions(self.session, delete, [(cid,) for cid in timelines])
+
+# ============================================================================
+# TIME-BUCKETED PARTITIONS
+# ============================================================================
+class BucketedMessageStore:
+    """
+    messages_by_conversation_bucketed: PRIMARY KEY ((conversation_id, bucket), message_id)
+    Ghi thêm (conversation_id, bucket) vào message_buckets_by_conversation lần đầu
+    gặp bucket (cache phía client) để đường đọc biết bucket nào có dữ liệu.
+    """
+
+    def __init__(self, session, bucket=DEFAULT_BUCKET):
+        self.session = session
+        self.bucket_seconds = BUCKET_SECONDS[bucket]
+        self.name = f'bucketed ({bucket})'
+        self.queries = 0
+        self._known_buckets = set()
+        self._insert = session.prepare(
+            "INSERT INTO messages_by_conversation_bucketed "
+            "(conversation_id, bucket, message_id, sender_id, sender_username, text_content, attachments) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)"
+        )
+        self._insert_bucket = session.prepare(
+            "INSERT INTO message_buckets_by_conversation (conversation_id, bucket) VALUES (?, ?)"
+        )
+        self._buckets = session.prepare(
+            "SELECT bucket FROM message_buckets_by_conversation "
+            "WHERE conversation_id = ? AND bucket <= ? LIMIT ?"
+        )
+        self._latest = session.prepare(
+            f"SELECT {PAGE_COLUMNS} FROM messages_by_conversation_bucketed "
+            "WHERE conversation_id = ? AND bucket = ? LIMIT ?"
+        )
+        self._before = session.prepare(
+            f"SELECT {PAGE_COLUMNS} FROM messages_by_conversation_bucketed "
+            "WHERE conversation_id = ? AND bucket = ? AND message_id < ? LIMIT ?"
+        )
+
+    async def write(self, msg):
+        """Ghi 1 message; ghi song song bucket index nếu bucket chưa biết"""
+        bucket = bucket_of(msg['message_id'], self.bucket_seconds)
+        key = (msg['conversation_id'], bucket)
+
+        futures = [self.session.execute_async(self._insert, (
+            msg['conversation_id'], bucket, msg['message_id'], msg['sender_id'],
+            msg['sender_username'], msg['text_content'], msg['attachments']
+        ))]
+        if key not in self._known_buckets:
+            futures.append(self.session.execute_async(self._insert_bucket, key))
+
+        self.queries += len(futures)
+        await asyncio.gather(*(wait_for_response(f) for f in futures))
+        self._known_buckets.add(key)
+
+    def cursor_before(self, message_id):
+        return (bucket_of(message_id, self.bucket_seconds), message_id)
+
+    async def _bucket_list(self, conversation_id, upper):
+        self.queries += 1
+        rows = await wait_for_response(self.session.execute_async(
+            self._buckets, (conversation_id, upper, BUCKET_LOOKAHEAD)
+        ))
+        return [row.bucket for row in rows]
+
+    async def read_page(self, conversation_id, page_size, cursor=None):
+        """
+        Đọc lùi từ bucket của cursor (hoặc bucket mới nhất) qua các bucket cũ hơn
+        cho đến khi đủ page_size rows.
+        Returns: (rows mới nhất trước, cursor trang tiếp theo hoặc None nếu hết)
+        """
+        if cursor is None:
+            upper, before = MAX_BUCKET, None
+        else:
+            upper, before = cursor
+
+        rows = []
+        buckets = await self._bucket_list(conversation_id, upper)
+        while buckets:
+            for bucket in buckets:
+                need = page_size - len(rows)
+                self.queries += 1
+                if before is not None and bucket == upper:
+                    future = self.session.execute_async(
+                        self._before, (conversation_id, bucket, before, need))
+                else:
+                    future = self.session.execute_async(
+                        self._latest, (conversation_id, bucket, need))
+                rows.extend(await wait_for_response(future))
+
+                if len(rows) >= page_size:
+                    return rows, self.cursor_before(rows[-1].message_id)
+
+            if len(buckets) < BUCKET_LOOKAHEAD:
+                break
+            buckets = await self._bucket_list(conversation_id, buckets[-1] - 1)
+
+        return rows, None
+
+    async def cleanup(self, timelines):
+        """Xóa mọi partition (conversation, bucket) đã ghi và bucket index của conversation"""
+        delete = self.session.prepare(
+            "DELETE FROM messages_by_conversation_bucketed WHERE conversation_id = ? AND bucket = ?")
+        delete_index = self.session.prepare(
+            "DELETE FROM message_buckets_by_conversation WHERE conversation_id = ?")
+        keys = {(cid, bucket_of(mid, self.bucket_seconds))
+                for cid, message_ids in timelines.items() for mid in message_ids}
+        deleted = await delete_partitions(self.session, delete, keys)
+        await delete_partitions(self.session, delete_index, [(cid,) for cid in timelines])
+        return deleted
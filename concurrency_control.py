@@ -0,0 +1,407 @@
+"""
+Concurrency Control - Điều khiển số request in-flight cho seeder và benchmark
+- wait_for_response: await ResponseFuture của driver không tốn thread executor
+- AIMDIngestController: AIMD trên giới hạn in-flight (+ giới hạn rows/s tùy chọn)
+- GradientConcurrencyLimiter: chế độ "auto" cho benchmark, tìm và giữ điểm knee
+"""
+
+import asyncio
+import math
+import time
+import random
+import statistics
+
+from cassandra import WriteTimeout, ReadTimeout, Unavailable
+from cassandra.cluster import NoHostAvailable, OperationTimedOut
+from cassandra.protocol import OverloadedErrorMessage
+
+# Các lỗi cho thấy cluster (hoặc connection pool) đang quá tải
+OVERLOAD_ERRORS = (
+    WriteTimeout, ReadTimeout, Unavailable,
+    OperationTimedOut, OverloadedErrorMessage, NoHostAvailable
+)
+
+def is_overload_error(error):
+    """Lỗi có phải do quá tải/timeout (nên giảm tải và thử lại) không"""
+    return isinstance(error, OVERLOAD_ERRORS)
+
+# ============================================================================
+# ASYNC BRIDGE
+# ============================================================================
+def wait_for_response(response_future):
+    """
+    Chuyển ResponseFuture của driver thành asyncio future.
+    Khác với run_in_executor(None, future.result), cách này không chiếm 1 thread
+    cho mỗi request nên số request in-flight không bị giới hạn bởi thread pool.
+    """
+    loop = asyncio.get_running_loop()
+    aio_future = loop.create_future()
+
+    def on_success(rows):
+        if not aio_future.done():
+            aio_future.set_result(rows)
+
+    def on_error(exc):
+        if not aio_future.done():
+            aio_future.set_exception(exc)
+
+    response_future.add_callbacks(
+        lambda rows: loop.call_soon_threadsafe(on_success, rows),
+        lambda exc: loop.call_soon_threadsafe(on_error, exc)
+    )
+    return aio_future
+
+async def fetch_all_rows(response_future):
+    """Await toàn bộ các trang kết quả (wait_for_response chỉ trả trang đầu)"""
+    rows = list(await wait_for_response(response_future))
+    while response_future.has_more_pages:
+        response_future.clear_callbacks()
+        response_future.start_fetching_next_page()
+        rows.extend(await wait_for_response(response_future))
+    return rows
+
+# ============================================================================
+# IN-FLIGHT LIMITER (BASE)
+# ============================================================================
+class InFlightLimiter:
+    """
+    Cơ chế chung: submit() chờ tới khi số request in-flight < limit rồi chạy
+    request ở background; lớp con quyết định cách điều chỉnh limit qua _on_result.
+    """
+
+    def __init__(self, initial_limit):
+        self.limit = float(initial_limit)
+        self.in_flight = 0
+        self._cond = None
+        self._tasks = set()
+        self._error = None
+        self._start = time.time()
+
+    async def _acquire(self, rows):
+        if self._cond is None:
+            self._cond = asyncio.Condition()
+        async with self._cond:
+            await self._cond.wait_for(lambda: self.in_flight < max(1, int(self.limit)))
+            self.in_flight += 1
+
+    async def _release(self):
+        async with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+    def _on_result(self, latency_ms, error, rows):
+        """Hook cho lớp con: nhận latency và lỗi (None nếu thành công)"""
+
+    async def _run(self, coro_factory, rows, on_error=None):
+        start = time.perf_counter()
+        try:
+            await coro_factory()
+        except Exception as e:
+            self._on_result((time.perf_counter() - start) * 1000, e, rows)
+            if on_error is None:
+                raise
+            on_error(e)
+        else:
+            self._on_result((time.perf_counter() - start) * 1000, None, rows)
+        finally:
+            await self._release()
+
+    async def submit(self, coro_factory, rows=1, on_error=None):
+        """
+        Chờ tới khi còn slot rồi chạy coro_factory() ở background.
+        rows: số row mà request ghi (dùng cho thống kê và giới hạn rows/s).
+        Lỗi không thể retry sẽ được raise lại ở submit/drain kế tiếp; nếu có on_error
+        thì on_error(lỗi) được gọi thay vào đó (limiter vẫn thấy lỗi) và lượt chạy tiếp tục.
+        """
+        if self._error is not None:
+            raise self._error
+
+        await self._acquire(rows)
+        task = asyncio.ensure_future(self._run(coro_factory, rows, on_error))
+        self._tasks.add(task)
+        task.add_done_callback(self._on_task_done)
+
+    def _on_task_done(self, task):
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None and self._error is None:
+            self._error = task.exception()
+
+    async def drain(self):
+        """Đợi toàn bộ request đang chạy hoàn thành"""
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+# ============================================================================
+# AIMD INGEST CONTROLLER
+# ============================================================================
+class AIMDIngestController(InFlightLimiter):
+    """
+    Giới hạn số request in-flight theo AIMD:
+    - Additive increase: +1 sau mỗi "cửa sổ" (limit request thành công đúng hạn)
+    - Multiplicative decrease: x latency_backoff khi latency EWMA vượt target,
+      x overload_backoff khi gặp timeout/overload (tối đa 1 lần mỗi cửa sổ)
+    Request lỗi do quá tải được thử lại với backoff để không mất dữ liệu.
+    Nếu đặt max_rows_per_sec, tốc độ gửi còn bị chặn bởi token bucket cố định.
+    """
+
+    def __init__(self, initial_limit=64, min_limit=4, max_limit=2048,
+                 target_latency_ms=50.0, latency_backoff=0.9, overload_backoff=0.5,
+                 max_rows_per_sec=None, max_retries=8, report_interval=5.0):
+        super().__init__(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.target_latency_ms = target_latency_ms
+        self.latency_backoff = latency_backoff
+        self.overload_backoff = overload_backoff
+        self.max_rows_per_sec = max_rows_per_sec
+        self.max_retries = max_retries
+        self.report_interval = report_interval
+
+        self.latency_ewma = None
+        self.rows_done = 0
+        self.overload_errors = 0
+        self.retries = 0
+        self.history = []  # (elapsed_s, limit, rows/s, latency_ewma_ms, overload_errors)
+
+        self._since_decrease = 0
+        self._next_send = None
+        self._last_report = self._start
+        self._last_report_rows = 0
+
+    # ---------------------------------------------------------------- slots
+    async def _acquire(self, rows):
+        await super()._acquire(rows)
+
+        # Token bucket: giãn thời điểm gửi để không vượt max_rows_per_sec
+        if self.max_rows_per_sec:
+            now = time.perf_counter()
+            if self._next_send is None or self._next_send < now:
+                self._next_send = now
+            delay = self._next_send - now
+            self._next_send += rows / self.max_rows_per_sec
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+    # ------------------------------------------------------------ feedback
+    def _on_success(self, latency_ms, rows):
+        self.rows_done += rows
+        self._since_decrease += 1
+
+        if self.latency_ewma is None:
+            self.latency_ewma = latency_ms
+        else:
+            self.latency_ewma = 0.9 * self.latency_ewma + 0.1 * latency_ms
+
+        if self.latency_ewma > self.target_latency_ms:
+            self._decrease(self.latency_backoff)
+        else:
+            self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+
+        self._maybe_report()
+
+    def _on_overload(self):
+        self.overload_errors += 1
+        self._decrease(self.overload_backoff)
+
+    def _decrease(self, factor):
+        # Chỉ giảm 1 lần mỗi cửa sổ để không "sập" limit vì 1 loạt lỗi cùng lúc
+        if self._since_decrease < self.limit:
+            return
+        self.limit = max(self.min_limit, self.limit * factor)
+        self._since_decrease = 0
+
+    def _maybe_report(self):
+        now = time.time()
+        if now - self._last_report < self.report_interval:
+            return
+        rate = (self.rows_done - self._last_report_rows) / (now - self._last_report)
+        elapsed = now - self._start
+        self.history.append((elapsed, self.limit, rate, self.latency_ewma, self.overload_errors))
+        print(f"   ⚙️  [{elapsed:.0f}s] In-flight limit: {int(self.limit)} | "
+              f"{rate:,.0f} rows/s | latency EWMA: {self.latency_ewma:.1f}ms | "
+              f"timeouts/overload: {self.overload_errors}")
+        self._last_report = now
+        self._last_report_rows = self.rows_done
+
+    # ----------------------------------------------------------------- API
+    async def _run(self, coro_factory, rows, on_error=None):
+        attempt = 0
+        while True:
+            start = time.perf_counter()
+            try:
+                await coro_factory()
+            except Exception as e:
+                await self._release()
+                if not is_overload_error(e) or attempt >= self.max_retries:
+                    if on_error is None:
+                        raise
+                    on_error(e)
+                    return
+                self._on_overload()
+                self.retries += 1
+                attempt += 1
+                # Exponential backoff có jitter trước khi chiếm lại slot
+                await asyncio.sleep(random.uniform(0, min(2.0, 0.05 * 2 ** attempt)))
+                await self._acquire(rows)
+                continue
+
+            await self._release()
+            self._on_success((time.perf_counter() - start) * 1000, rows)
+            return
+
+    def print_summary(self):
+        """In tóm tắt giới hạn in-flight đã chọn theo thời gian"""
+        elapsed = time.time() - self._start
+        print(f"   ⚙️  Adaptive ingest: limit cuối {int(self.limit)}, "
+              f"{self.rows_done / elapsed if elapsed > 0 else 0:,.0f} rows/s trung bình, "
+              f"{self.overload_errors} timeouts/overload, {self.retries} retries")
+        if self.history:
+            peak = max(self.history, key=lambda h: h[2])
+            print(f"   ⚙️  Đỉnh: {peak[2]:,.0f} rows/s tại limit {int(peak[1])} ([{peak[0]:.0f}s])")
+
+# ============================================================================
+# GRADIENT CONCURRENCY LIMITER (AUTO MODE)
+# ============================================================================
+class GradientConcurrencyLimiter(InFlightLimiter):
+    """
+    Chế độ concurrency "auto" cho benchmark (kiểu Vegas/Gradient):
+    - Mỗi cửa sổ đo RTT ngắn hạn (trung bình latency) và so với RTT không tải
+      (RTT nhỏ nhất quan sát được; sau mỗi probe_interval cửa sổ, chạy 1 cửa sổ
+      với 1/4 limit để đo lại RTT không tải khi nền của cluster thay đổi)
+    - gradient = clamp(tolerance * rtt_noload / rtt_short, 0.5, 1.0)
+    - limit_mới = limit * gradient + sqrt(limit)  (sqrt(limit) là hàng đợi cho phép)
+    Khi latency chưa tăng, limit tăng dần; khi request bắt đầu xếp hàng trong
+    cluster (RTT tăng) thì limit co lại, nên limit hội tụ quanh điểm knee.
+    """
+
+    def __init__(self, initial_limit=16, min_limit=1, max_limit=2048,
+                 tolerance=1.5, smoothing=0.2, window_size=200,
+                 probe_interval=100, report_interval=5.0):
+        super().__init__(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.tolerance = tolerance
+        self.smoothing = smoothing
+        self.window_size = window_size
+        self.probe_interval = probe_interval
+        self.report_interval = report_interval
+
+        self.rtt_noload = None
+        self.history = []  # (elapsed_s, limit, ops/s, rtt_short_ms | None, rtt_noload_ms)
+
+        self._window = []
+        self._window_errors = 0
+        self._windows_since_probe = 0
+        self._probe_saved_limit = None
+        self._probe_started = None
+        self._window_start = time.time()
+        self._last_report = self._start
+
+    def _on_result(self, latency_ms, error, rows):
+        # Trong cửa sổ probe, bỏ qua request đã gửi trước khi limit được hạ xuống
+        if (self._probe_saved_limit is not None
+                and time.perf_counter() - latency_ms / 1000 < self._probe_started):
+            return
+
+        if error is not None and is_overload_error(error):
+            self._window_errors += 1
+        else:
+            self._window.append(latency_ms)
+
+        if len(self._window) + self._window_errors >= self.window_size:
+            self._update_limit()
+
+    def _update_limit(self):
+        now = time.time()
+        ops = len(self._window) + self._window_errors
+        throughput = ops / max(now - self._window_start, 1e-6)
+
+        if self._probe_saved_limit is not None and self._window:
+            # Kết thúc cửa sổ probe: lấy RTT vừa đo làm RTT không tải, trả lại limit
+            self.rtt_noload = statistics.mean(self._window)
+            self.limit = self._probe_saved_limit
+            self._probe_saved_limit = None
+            self._reset_window(now)
+            return
+
+        if self._window:
+            rtt_short = statistics.mean(self._window)
+            if self.rtt_noload is None:
+                self.rtt_noload = rtt_short
+            else:
+                self.rtt_noload = min(self.rtt_noload, rtt_short)
+
+            gradient = max(0.5, min(1.0, self.tolerance * self.rtt_noload / rtt_short))
+            new_limit = self.limit * gradient + math.sqrt(self.limit)
+        else:
+            rtt_short = None   # Cửa sổ chỉ có lỗi: không có RTT (None để history JSON được)
+            new_limit = self.limit * 0.5
+
+        # Timeout/overload: co lại mạnh như AIMD
+        if self._window_errors:
+            new_limit = min(new_limit, self.limit * 0.9)
+
+        new_limit = (1 - self.smoothing) * self.limit + self.smoothing * new_limit
+        self.limit = max(self.min_limit, min(self.max_limit, new_limit))
+
+        elapsed = now - self._start
+        self.history.append((elapsed, self.limit, throughput, rtt_short, self.rtt_noload))
+        if now - self._last_report >= self.report_interval:
+            print(f"   ⚙️  [{elapsed:.0f}s] Auto concurrency: {int(self.limit)} | "
+                  f"{throughput:,.0f} ops/s | RTT: "
+                  f"{f'{rtt_short:.1f}ms' if rtt_short is not None else '-'} "
+                  f"(no-load {self.rtt_noload or 0:.1f}ms)")
+            self._last_report = now
+
+        self._windows_since_probe += 1
+        if self._windows_since_probe >= self.probe_interval:
+            self._probe_saved_limit = self.limit
+            self._probe_started = time.perf_counter()
+            self.limit = max(self.min_limit, self.limit / 4)
+            self._windows_since_probe = 0
+
+        self._reset_window(now)
+
+    def _reset_window(self, now):
+        self._window = []
+        self._window_errors = 0
+        self._window_start = now
+
+    def converged_limit(self, tail_fraction=0.3):
+        """Concurrency hội tụ: median limit trên phần cuối của lượt chạy"""
+        if not self.history:
+            return int(self.limit)
+        tail = self.history[-max(1, int(len(self.history) * tail_fraction)):]
+        return int(round(statistics.median(h[1] for h in tail)))
+
+async def run_adaptive(op_factory, num_ops, limiter, on_result=None, on_error=None):
+    """
+    Chạy num_ops lần op_factory() với số request in-flight do limiter quyết định.
+    on_result(result) được gọi theo thứ tự hoàn thành; trả về list kết quả.
+    on_error(lỗi): op raise để limiter co lại khi quá tải, sau đó lỗi được giao cho
+    on_error thay vì dừng lượt chạy (không có on_error: lỗi đầu tiên dừng lượt chạy).
+    """
+    results = []
+
+    async def run_one():
+        result = await op_factory()
+        results.append(result)
+        if on_result is not None:
+            on_result(result)
+
+    for _ in range(num_ops):
+        await limiter.submit(run_one, on_error=on_error)
+    await limiter.drain()
+    return results
+
+def parse_concurrency(value):
+    """Giá trị --concurrency: số nguyên cố định hoặc 'auto'"""
+    if value == 'auto':
+        return value
+    concurrency = int(value)
+    if concurrency < 1:
+        raise ValueError("concurrency phải >= 1 hoặc 'auto'")
+    return concurrency
@@ -1,29 +1,76 @@
 """
 Script kiểm tra dữ liệu trong Cassandra
+Đếm chính xác số row của mọi bảng trong schema.cql bằng cách chia token ring
+thành nhiều khoảng nhỏ và COUNT(*) song song (COUNT(*) toàn bảng sẽ timeout).
 """
+import argparse
+import asyncio
+import time
+
 from cassandra.cluster import Cluster
+from schema_utils import load_tables, token_expression
+from token_ranges import scan_token_ranges
 
-def check_data():
-    """Kiểm tra số lượng dữ liệu trong từng bảng"""
-    
-    # Kết nối
-    cluster = Cluster(['127.0.0.1'], port=9042)
-    session = cluster.connect('realtime_chat_app')
-    
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+CONTACT_POINTS = ['127.0.0.1']
+PORT = 9042
+KEYSPACE = 'realtime_chat_app'
+COUNT_RANGES = 1024         # Số khoảng token mỗi bảng (càng nhiều, mỗi COUNT càng nhẹ)
+COUNT_CONCURRENCY = 32      # Số COUNT(*) in-flight tối đa
+COUNT_TIMEOUT = 30.0        # Timeout (giây) cho mỗi query đếm
+
+# ============================================================================
+# PARALLEL COUNT
+# ============================================================================
+async def count_table(session, table, num_ranges=COUNT_RANGES, concurrency=COUNT_CONCURRENCY):
+    """Đếm số row của bảng: tổng COUNT(*) trên từng khoảng token"""
+    token = token_expression(table)
+    statement = session.prepare(
+        f"SELECT COUNT(*) FROM {table['name']} WHERE {token} > ? AND {token} <= ?"
+    )
+    total = [0]
+
+    def add_count(start, end, rows):
+        count = rows[0].count
+        total[0] += count
+        return count
+
+    failed = await scan_token_ranges(session, statement, add_count, num_ranges=num_ranges,
+                                     concurrency=concurrency, label=table['name'])
+    return total[0], failed
+
+async def count_all_tables(session, num_ranges=COUNT_RANGES, concurrency=COUNT_CONCURRENCY):
+    """Đếm lần lượt từng bảng trong schema.cql (mỗi bảng quét song song)"""
+    counts = {}
+    for table in load_tables():
+        print(f"🔢 Đếm {table['name']}...")
+        start_time = time.time()
+        count, failed = await count_table(session, table, num_ranges, concurrency)
+        counts[table['name']] = (count, failed, time.time() - start_time)
+    return counts
+
+def print_counts(counts):
+    """In bảng tổng hợp số row mỗi bảng"""
     print("\n" + "="*60)
-    print("📊 KIỂM TRA DỮ LIỆU TRONG DATABASE")
+    print("📊 SỐ ROW MỖI BẢNG")
+    print("="*60)
+    print(f"{'Table':<32} {'Rows':>14} {'Time':>9}")
+    print("-"*60)
+    for name, (count, failed, elapsed) in counts.items():
+        note = f"  ⚠️  thiếu {len(failed)} khoảng" if failed else ""
+        print(f"{name:<32} {count:>14,} {elapsed:>8.1f}s{note}")
     print("="*60 + "\n")
-    
+
+# ============================================================================
+# SAMPLES
+# ============================================================================
+def print_samples(session):
+    """In vài row mẫu của các bảng chính"""
     # Kiểm tra Users
     print("👤 USERS:")
     try:
-        # Đếm users_by_id
-        count_query = "SELECT COUNT(*) FROM users_by_id"
-        result = session.execute(count_query)
-        count = result.one().count
-        print(f"   - Tổng users (users_by_id): {count:,}")
-        
-        # Lấy mẫu 5 users
         sample_query = "SELECT username, is_online, created_at FROM users_by_id LIMIT 5"
         rows = session.execute(sample_query)
         print(f"   - Mẫu 5 users:")
@@ -31,21 +78,14 @@ def check_data():
             print(f"      • {row.username} (Online: {row.is_online}) - Created: {row.created_at}")
     except Exception as e:
         print(f"   ❌ Lỗi: {e}")
-    
+
     print()
-    
+
     # Kiểm tra Conversations
     print("💬 CONVERSATIONS:")
     try:
-        # Đếm conversations_by_user
-        count_query = "SELECT COUNT(*) FROM conversations_by_user"
-        result = session.execute(count_query)
-        count = result.one().count
-        print(f"   - Tổng conversations_by_user entries: {count:,}")
-        
-        # Lấy mẫu 5 conversations
         sample_query = """
-        SELECT conversation_name, conversation_type, last_message_text 
+        SELECT conversation_name, conversation_type, last_message_text
         FROM conversations_by_user LIMIT 5
         """
         rows = session.execute(sample_query)
@@ -55,22 +95,14 @@ def check_data():
             print(f"        Last msg: {row.last_message_text}")
     except Exception as e:
         print(f"   ❌ Lỗi: {e}")
-    
+
     print()
-    
+
     # Kiểm tra Messages
     print("📨 MESSAGES:")
     try:
-        # Đếm messages (chậm với bảng lớn, nên dùng LIMIT)
-        # Lưu ý: COUNT(*) trên bảng lớn rất chậm trong Cassandra
-        sample_query = "SELECT COUNT(*) FROM messages_by_conversation LIMIT 100000"
-        result = session.execute(sample_query)
-        count = result.one().count
-        print(f"   - Số messages (mẫu 100k đầu): {count:,}")
-        
-        # Lấy mẫu messages
         sample_query = """
-        SELECT sender_username, text_content, attachments 
+        SELECT sender_username, text_content, attachments
         FROM messages_by_conversation LIMIT 10
         """
         rows = session.execute(sample_query)
@@ -81,25 +113,39 @@ def check_data():
             print(f"      • {row.sender_username}: {content}{attachments}")
     except Exception as e:
         print(f"   ❌ Lỗi: {e}")
-    
+
     print()
-    
-    # Kiểm tra Members
-    print("👥 MEMBERS:")
-    try:
-        count_query = "SELECT COUNT(*) FROM members_by_conversation LIMIT 100000"
-        result = session.execute(count_query)
-        count = result.one().count
-        print(f"   - Tổng members entries: {count:,}")
-    except Exception as e:
-        print(f"   ❌ Lỗi: {e}")
-    
+
+def check_data(num_ranges=COUNT_RANGES, concurrency=COUNT_CONCURRENCY):
+    """Kiểm tra số lượng dữ liệu trong từng bảng"""
+
+    # Kết nối
+    cluster = Cluster(CONTACT_POINTS, port=PORT)
+    session = cluster.connect(KEYSPACE)
+    session.default_timeout = COUNT_TIMEOUT
+
     print("\n" + "="*60)
+    print("📊 KIỂM TRA DỮ LIỆU TRONG DATABASE")
+    print("="*60 + "\n")
+
+    try:
+        counts = asyncio.run(count_all_tables(session, num_ranges, concurrency))
+        print_counts(counts)
+        print_samples(session)
+    finally:
+        # Đóng kết nối
+        cluster.shutdown()
+
+    print("="*60)
     print("✅ HOÀN THÀNH KIỂM TRA")
     print("="*60 + "\n")
-    
-    # Đóng kết nối
-    cluster.shutdown()
 
 if __name__ == "__main__":
-    check_data()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='Kiểm tra dữ liệu trong Cassandra')
+    parser.add_argument('--ranges', type=int, default=COUNT_RANGES,
+                        help=f'Số khoảng token mỗi bảng (mặc định {COUNT_RANGES})')
+    parser.add_argument('--concurrency', type=int, default=COUNT_CONCURRENCY,
+                        help=f'Số query đếm in-flight (mặc định {COUNT_CONCURRENCY})')
+    args = parser.parse_args()
+
+    check_data(args.ranges, args.concurrency)
@@ -7,14 +7,17 @@ Tạo dữ liệu giả cho:
 """
 
 import asyncio
+import functools
 import uuid
 import random
 from datetime import datetime, timedelta
 from cassandra.cluster import Cluster, NoHostAvailable
-from cassandra.query import SimpleStatement
+from cassandra.query import SimpleStatement, BatchStatement, BatchType
 from cassandra.util import uuid_from_time
 from faker import Faker
 import time
+from concurrency_control import AIMDIngestController, wait_for_response
+from workload_manifest import DEFAULT_MANIFEST_PATH, write_manifest
 
 # ============================================================================
 # CONFIGURATION
@@ -28,8 +31,37 @@ NUM_USERS = 1000          # Test với 1000 users trước
 NUM_CONVERSATIONS = 5000  # 5000 conversations
 NUM_MESSAGES = 50000      # 50000 messages
 
-# Kích thước batch để tránh quá tải bộ nhớ
-BATCH_SIZE = 1000
+# Adaptive ingest (AIMD): số request in-flight tự điều chỉnh theo latency và
+# lỗi timeout/overload thay vì bắn cố định từng batch
+INGEST_INITIAL_IN_FLIGHT = 64
+INGEST_MAX_IN_FLIGHT = 2048
+INGEST_TARGET_LATENCY_MS = 50
+INGEST_MAX_ROWS_PER_SEC = None  # Đặt số (vd: 20000) để giới hạn cố định rows/s
+MANIFEST_PATH = DEFAULT_MANIFEST_PATH  # IDs đã seed cho benchmark (env WORKLOAD_MANIFEST)
+
+# Phân bố số tin nhắn mỗi conversation (Pareto): đa số hội thoại nhỏ, vài hội thoại rất lớn.
+# Alpha càng nhỏ thì đuôi càng dài (partition lớn càng nhiều).
+PARTITION_SIZE_ALPHA = 1.2
+
+# Nhịp gửi tin theo "burst": sau mỗi tin, xác suất tin kế tiếp vẫn thuộc burst hiện tại
+# và khoảng cách trung bình (giây) giữa 2 tin trong cùng burst.
+# Khoảng cách giữa các burst được suy ra để timeline trải từ lúc tạo hội thoại đến hiện tại.
+BURST_CONTINUE_PROB = 0.8
+BURST_GAP_SECONDS = 20
+
+# Độ dài tin nhắn: (trọng số, số từ tối thiểu, số từ tối đa)
+MESSAGE_LENGTH_DISTRIBUTION = [
+    (0.55, 1, 6),        # Tin ngắn ("ok", "đang tới")
+    (0.35, 7, 30),       # Tin thường
+    (0.08, 31, 120),     # Đoạn văn dài
+    (0.02, 300, 1500),   # Paste log/code
+]
+
+# Số file đính kèm: {số file: trọng số}
+ATTACHMENT_COUNT_DISTRIBUTION = {0: 0.82, 1: 0.12, 2: 0.04, 3: 0.015, 10: 0.005}
+
+# Số timeline được ghi xen kẽ cùng lúc (tránh dồn toàn bộ write vào 1 partition)
+ACTIVE_TIMELINES = 64
 
 # ============================================================================
 # DATABASE CONNECTION
@@ -92,30 +124,126 @@ def create_fake_conversation(user_list, faker_instance, is_group=False):
         'created_at': datetime.now() - timedelta(days=random.randint(0, 90))
     }
 
-def create_fake_message(conversation, faker_instance):
+def sample_message_length():
+    """Chọn số từ của 1 tin nhắn theo MESSAGE_LENGTH_DISTRIBUTION"""
+    weights = [bucket[0] for bucket in MESSAGE_LENGTH_DISTRIBUTION]
+    _, min_words, max_words = random.choices(MESSAGE_LENGTH_DISTRIBUTION, weights=weights)[0]
+    return random.randint(min_words, max_words)
+
+def sample_attachment_count():
+    """Chọn số file đính kèm theo ATTACHMENT_COUNT_DISTRIBUTION"""
+    counts = list(ATTACHMENT_COUNT_DISTRIBUTION)
+    weights = list(ATTACHMENT_COUNT_DISTRIBUTION.values())
+    return random.choices(counts, weights=weights)[0]
+
+def create_fake_message(conversation, faker_instance, timestamp=None):
     """
     Tạo 1 message giả trong conversation
+    timestamp: thời điểm gửi (mặc định: ngẫu nhiên trong 1 tuần gần nhất)
     Returns: dict với message_id, conversation_id, sender, content, timestamp
     """
     sender = random.choice(conversation['members'])
-    timestamp = datetime.now() - timedelta(minutes=random.randint(0, 10080))  # Trong 1 tuần
+    if timestamp is None:
+        timestamp = datetime.now() - timedelta(minutes=random.randint(0, 10080))  # Trong 1 tuần
     
-    # Tạo attachments ngẫu nhiên (20% tin nhắn có file đính kèm)
-    attachments = []
-    if random.random() < 0.2:
-        num_attachments = random.randint(1, 3)
-        attachments = [faker_instance.image_url() for _ in range(num_attachments)]
+    attachments = [faker_instance.image_url() for _ in range(sample_attachment_count())]
+    
+    num_words = sample_message_length()
+    if num_words > 120:
+        # Paste dài: ghép từ trực tiếp, nhanh hơn nhiều so với sentence()
+        text_content = ' '.join(faker_instance.words(nb=num_words))
+    else:
+        text_content = faker_instance.sentence(nb_words=num_words, variable_nb_words=False)
     
     return {
         'message_id': uuid_from_time(timestamp),  # timeuuid based on timestamp
         'conversation_id': conversation['conversation_id'],
         'sender_id': sender['user_id'],
         'sender_username': sender['username'],
-        'text_content': faker_instance.sentence(nb_words=random.randint(3, 20)),
+        'text_content': text_content,
         'attachments': attachments,
         'timestamp': timestamp
     }
 
+def sample_partition_sizes(num_conversations, num_messages):
+    """
+    Chia num_messages cho num_conversations theo phân bố Pareto (PARTITION_SIZE_ALPHA).
+    Returns: list số tin nhắn của từng conversation, tổng đúng bằng num_messages
+    """
+    weights = [random.paretovariate(PARTITION_SIZE_ALPHA) for _ in range(num_conversations)]
+    total_weight = sum(weights)
+    sizes = [int(w / total_weight * num_messages) for w in weights]
+    
+    # Phần dư do làm tròn được chia tiếp theo cùng trọng số
+    remainder = num_messages - sum(sizes)
+    for i in random.choices(range(num_conversations), weights=weights, k=remainder):
+        sizes[i] += 1
+    
+    return sizes
+
+def generate_conversation_timeline(conversation, num_messages, faker_instance, end_time=None):
+    """
+    Sinh num_messages tin nhắn của 1 conversation với timestamp tăng dần
+    (timeuuid đơn điệu trong partition) và khoảng cách gửi tin dạng burst.
+    Timeline trải từ created_at của conversation đến end_time (mặc định: hiện tại).
+    """
+    if num_messages <= 0:
+        return
+    
+    end_time = end_time or datetime.now()
+    span = max((end_time - conversation['created_at']).total_seconds(), 1.0)
+    
+    # Khoảng nghỉ trung bình giữa các burst để tổng timeline xấp xỉ span
+    num_bursts = 1 + (num_messages - 1) * (1 - BURST_CONTINUE_PROB)
+    burst_time = (num_messages - num_bursts) * BURST_GAP_SECONDS
+    idle_gap = max(span - burst_time, span * 0.1) / num_bursts
+    
+    timestamp = conversation['created_at']
+    for i in range(num_messages):
+        if i > 0 and random.random() < BURST_CONTINUE_PROB:
+            gap = random.expovariate(1 / BURST_GAP_SECONDS)
+        else:
+            gap = random.expovariate(1 / idle_gap)
+        
+        # Tối thiểu 1ms để timeuuid tăng ngặt; không vượt quá end_time nếu còn chỗ
+        gap = max(gap, 0.001)
+        next_timestamp = timestamp + timedelta(seconds=gap)
+        if next_timestamp > end_time:
+            next_timestamp = timestamp + timedelta(milliseconds=1)
+        timestamp = next_timestamp
+        
+        yield create_fake_message(conversation, faker_instance, timestamp)
+
+def interleave_timelines(conversations, sizes, faker_instance, window=ACTIVE_TIMELINES):
+    """
+    Ghép timeline của nhiều conversation thành 1 luồng tin nhắn: tối đa `window`
+    timeline hoạt động cùng lúc, mỗi bước lấy tin kế tiếp của 1 timeline ngẫu nhiên.
+    Thứ tự trong từng conversation vẫn tăng dần theo thời gian.
+    """
+    pending = iter([
+        (convo, size) for convo, size in zip(conversations, sizes) if size > 0
+    ])
+    active = []
+    
+    while True:
+        while len(active) < window:
+            nxt = next(pending, None)
+            if nxt is None:
+                break
+            active.append(generate_conversation_timeline(nxt[0], nxt[1], faker_instance))
+        
+        if not active:
+            return
+        
+        idx = random.randrange(len(active))
+        msg = next(active[idx], None)
+        if msg is None:
+            # Timeline đã hết: thay bằng phần tử cuối để xóa O(1)
+            active[idx] = active[-1]
+            active.pop()
+            continue
+        yield msg
+
 # ============================================================================
 # ASYNC INSERT FUNCTIONS
 # ============================================================================
@@ -131,8 +259,6 @@ async def insert_user_async(session, user_data):
     VALUES (%s, %s)
     """
     
-    loop = asyncio.get_event_loop()
-    
     # Chạy song song 2 INSERTs
     futures = [
         session.execute_async(query_by_id, (
@@ -145,7 +271,7 @@ async def insert_user_async(session, user_data):
     ]
     
     for future in futures:
-        await loop.run_in_executor(None, future.result)
+        await wait_for_response(future)
 
 async def insert_conversation_async(session, convo_data):
     """
@@ -153,7 +279,6 @@ async def insert_conversation_async(session, convo_data):
     - conversations_by_user (cho mỗi member)
     - members_by_conversation
     """
-    loop = asyncio.get_event_loop()
     futures = []
     
     # INSERT vào conversations_by_user cho mỗi member
@@ -197,7 +322,7 @@ async def insert_conversation_async(session, convo_data):
     
     # Đợi tất cả hoàn thành
     for future in futures:
-        await loop.run_in_executor(None, future.result)
+        await wait_for_response(future)
 
 async def insert_message_async(session, msg_data):
     """INSERT 1 message vào messages_by_conversation"""
@@ -217,13 +342,12 @@ async def insert_message_async(session, msg_data):
         msg_data['attachments']
     ))
     
-    loop = asyncio.get_event_loop()
-    await loop.run_in_executor(None, future.result)
+    await wait_for_response(future)
 
 # ============================================================================
 # DATA SEEDING LOGIC
 # ============================================================================
-async def seed_users(session, num_users):
+async def seed_users(session, num_users, controller):
     """Tạo và INSERT users vào database"""
     print(f"\n{'='*60}")
     print(f"📝 Bắt đầu tạo {num_users:,} users...")
@@ -231,28 +355,22 @@ async def seed_users(session, num_users):
     
     fake = Faker()
     users = []
-    tasks = []
     start_time = time.time()
     
     for i in range(num_users):
         user = create_fake_user(fake)
         users.append(user)
-        tasks.append(insert_user_async(session, user))
+        # Controller chặn ở đây khi số request in-flight đạt giới hạn hiện tại
+        await controller.submit(functools.partial(insert_user_async, session, user), rows=2)
         
-        # Chạy batch để tránh quá tải bộ nhớ
-        if len(tasks) >= BATCH_SIZE:
-            await asyncio.gather(*tasks)
-            tasks = []
-            
-            # Progress update
-            if (i + 1) % 1000 == 0:
-                elapsed = time.time() - start_time
-                rate = (i + 1) / elapsed
-                print(f"   ✓ Đã tạo: {i+1:,}/{num_users:,} users ({rate:.0f} users/s)")
-    
-    # Chạy nốt phần còn lại
-    if tasks:
-        await asyncio.gather(*tasks)
+        # Progress update
+        if (i + 1) % 1000 == 0:
+            elapsed = time.time() - start_time
+            rate = (i + 1) / elapsed
+            print(f"   ✓ Đã tạo: {i+1:,}/{num_users:,} users ({rate:.0f} users/s)")
+    
+    # Đợi các request còn lại
+    await controller.drain()
     
     total_time = time.time() - start_time
     print(f"✅ Hoàn thành tạo {num_users:,} users trong {total_time:.2f}s")
@@ -260,7 +378,7 @@ async def seed_users(session, num_users):
     
     return users
 
-async def seed_conversations(session, users, num_conversations):
+async def seed_conversations(session, users, num_conversations, controller):
     """Tạo và INSERT conversations vào database"""
     print(f"\n{'='*60}")
     print(f"💬 Bắt đầu tạo {num_conversations:,} conversations...")
@@ -268,7 +386,6 @@ async def seed_conversations(session, users, num_conversations):
     
     fake = Faker()
     conversations = []
-    tasks = []
     start_time = time.time()
     
     for i in range(num_conversations):
@@ -276,22 +393,18 @@ async def seed_conversations(session, users, num_conversations):
         is_group = random.random() < 0.3
         convo = create_fake_conversation(users, fake, is_group)
         conversations.append(convo)
-        tasks.append(insert_conversation_async(session, convo))
+        # Mỗi member ghi 1 row conversations_by_user + 1 row members_by_conversation
+        await controller.submit(functools.partial(insert_conversation_async, session, convo),
+                                rows=2 * len(convo['members']))
         
-        # Chạy batch
-        if len(tasks) >= BATCH_SIZE // 5:  # Nhỏ hơn vì conversation insert phức tạp hơn
-            await asyncio.gather(*tasks)
-            tasks = []
-            
-            # Progress update
-            if (i + 1) % 500 == 0:
-                elapsed = time.time() - start_time
-                rate = (i + 1) / elapsed
-                print(f"   ✓ Đã tạo: {i+1:,}/{num_conversations:,} conversations ({rate:.0f} convos/s)")
-    
-    # Chạy nốt phần còn lại
-    if tasks:
-        await asyncio.gather(*tasks)
+        # Progress update
+        if (i + 1) % 500 == 0:
+            elapsed = time.time() - start_time
+            rate = (i + 1) / elapsed
+            print(f"   ✓ Đã tạo: {i+1:,}/{num_conversations:,} conversations ({rate:.0f} convos/s)")
+    
+    # Đợi các request còn lại
+    await controller.drain()
     
     total_time = time.time() - start_time
     print(f"✅ Hoàn thành tạo {num_conversations:,} conversations trong {total_time:.2f}s")
@@ -299,40 +412,136 @@ async def seed_conversations(session, users, num_conversations):
     
     return conversations
 
-async def seed_messages(session, conversations, num_messages):
-    """Tạo và INSERT messages vào database"""
+async def seed_messages(session, conversations, num_messages, controller):
+    """
+    Tạo và INSERT messages vào database
+    Returns: dict conversation_id -> tin nhắn mới nhất (xem track_latest_message)
+    """
     print(f"\n{'='*60}")
     print(f"📨 Bắt đầu tạo {num_messages:,} messages...")
     print(f"{'='*60}")
     
     fake = Faker()
-    tasks = []
+    latest_messages = {}
     start_time = time.time()
     
-    for i in range(num_messages):
-        # Chọn conversation ngẫu nhiên
-        convo = random.choice(conversations)
-        msg = create_fake_message(convo, fake)
-        tasks.append(insert_message_async(session, msg))
+    # Kích thước partition theo phân bố đuôi dài, lưu lại để thống kê/manifest
+    sizes = sample_partition_sizes(len(conversations), num_messages)
+    for convo, size in zip(conversations, sizes):
+        convo['message_count'] = size
+    
+    largest = sorted(sizes, reverse=True)
+    print(f"   Partition lớn nhất: {largest[0]:,} msgs, top 1%: "
+          f"{sum(largest[:max(1, len(largest)//100)]):,} msgs, "
+          f"rỗng: {sizes.count(0):,} conversations")
+    
+    for i, msg in enumerate(interleave_timelines(conversations, sizes, fake)):
+        track_latest_message(latest_messages, msg)
+        await controller.submit(functools.partial(insert_message_async, session, msg))
         
-        # Chạy batch
-        if len(tasks) >= BATCH_SIZE:
-            await asyncio.gather(*tasks)
-            tasks = []
-            
-            # Progress update
-            if (i + 1) % 5000 == 0:
-                elapsed = time.time() - start_time
-                rate = (i + 1) / elapsed
-                print(f"   ✓ Đã tạo: {i+1:,}/{num_messages:,} messages ({rate:.0f} msgs/s)")
-    
-    # Chạy nốt phần còn lại
-    if tasks:
-        await asyncio.gather(*tasks)
+        # Progress update
+        if (i + 1) % 5000 == 0:
+            elapsed = time.time() - start_time
+            rate = (i + 1) / elapsed
+            print(f"   ✓ Đã tạo: {i+1:,}/{num_messages:,} messages ({rate:.0f} msgs/s)")
+    
+    # Đợi các request còn lại
+    await controller.drain()
     
     total_time = time.time() - start_time
     print(f"✅ Hoàn thành tạo {num_messages:,} messages trong {total_time:.2f}s")
     print(f"   Tốc độ trung bình: {num_messages/total_time:.0f} msgs/s\n")
+    
+    return latest_messages
+
+def track_latest_message(latest_messages, msg):
+    """
+    Cập nhật index tin nhắn mới nhất của conversation chứa msg.
+    Mỗi entry là list gọn [timestamp, text, sender_username, unread], trong đó
+    unread = {user_id: số tin chưa đọc} chỉ giữ những user đã từng gửi tin;
+    key '*' đếm số tin cho các thành viên chưa gửi tin nào.
+    """
+    entry = latest_messages.get(msg['conversation_id'])
+    if entry is None:
+        entry = [None, None, None, {'*': 0}]
+        latest_messages[msg['conversation_id']] = entry
+    
+    # Người gửi coi như đã đọc hết hội thoại, những người khác +1 tin chưa đọc
+    unread = entry[3]
+    for user_id in unread:
+        unread[user_id] += 1
+    unread[msg['sender_id']] = 0
+    
+    if entry[0] is None or msg['timestamp'] >= entry[0]:
+        entry[0] = msg['timestamp']
+        entry[1] = msg['text_content']
+        entry[2] = msg['sender_username']
+
+async def update_conversation_summaries(session, conversations, latest_messages, controller):
+    """
+    Cập nhật last_message_* và unread_count trong conversations_by_user từ index
+    tin nhắn mới nhất. Vì last_message_timestamp là clustering key, mỗi hội thoại
+    cần DELETE row cũ + INSERT row mới; các thay đổi của một member được gom vào
+    1 batch UNLOGGED (cùng partition user_id) thay vì fan-out theo từng tin nhắn.
+    """
+    print(f"\n{'='*60}")
+    print(f"🔄 Cập nhật conversations_by_user theo tin nhắn mới nhất...")
+    print(f"{'='*60}")
+    
+    query_delete = """
+    DELETE FROM conversations_by_user
+    WHERE user_id = %s AND last_message_timestamp = %s
+    """
+    
+    query_insert = """
+    INSERT INTO conversations_by_user 
+    (user_id, last_message_timestamp, conversation_id, conversation_name, 
+     conversation_avatar, conversation_type, last_message_text, 
+     last_message_sender, unread_count)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+    """
+    
+    # Gom các hội thoại cần cập nhật theo từng member
+    updates_by_member = {}
+    for convo in conversations:
+        entry = latest_messages.get(convo['conversation_id'])
+        if entry is None:
+            continue
+        for member in convo['members']:
+            updates_by_member.setdefault(member['user_id'], []).append((convo, entry))
+    
+    async def update_member_async(user_id, updates):
+        batch = BatchStatement(batch_type=BatchType.UNLOGGED)
+        for convo, entry in updates:
+            last_timestamp, last_text, last_sender, unread = entry
+            # DELETE và INSERT cùng key trong 1 batch thì DELETE thắng, nên bỏ qua
+            if last_timestamp != convo['created_at']:
+                batch.add(SimpleStatement(query_delete), (user_id, convo['created_at']))
+            batch.add(SimpleStatement(query_insert), (
+                user_id,
+                last_timestamp,
+                convo['conversation_id'],
+                convo['conversation_name'],
+                convo['conversation_avatar'],
+                convo['conversation_type'],
+                last_text,
+                last_sender,
+                unread.get(user_id, unread['*'])
+            ))
+        
+        await wait_for_response(session.execute_async(batch))
+    
+    start_time = time.time()
+    
+    for user_id, updates in updates_by_member.items():
+        await controller.submit(functools.partial(update_member_async, user_id, updates),
+                                rows=2 * len(updates))
+    
+    await controller.drain()
+    
+    total_time = time.time() - start_time
+    print(f"✅ Đã cập nhật {len(latest_messages):,} conversations cho "
+          f"{len(updates_by_member):,} users trong {total_time:.2f}s\n")
 
 # ============================================================================
 # MAIN ORCHESTRATOR
@@ -350,14 +559,29 @@ async def main():
         return
     
     try:
+        # Controller dùng chung cho mọi bước để giữ mức in-flight đã học được
+        controller = AIMDIngestController(
+            initial_limit=INGEST_INITIAL_IN_FLIGHT,
+            max_limit=INGEST_MAX_IN_FLIGHT,
+            target_latency_ms=INGEST_TARGET_LATENCY_MS,
+            max_rows_per_sec=INGEST_MAX_ROWS_PER_SEC
+        )
+        
         # Bước 1: Tạo Users
-        users = await seed_users(session, NUM_USERS)
+        users = await seed_users(session, NUM_USERS, controller)
         
         # Bước 2: Tạo Conversations
-        conversations = await seed_conversations(session, users, NUM_CONVERSATIONS)
+        conversations = await seed_conversations(session, users, NUM_CONVERSATIONS, controller)
         
         # Bước 3: Tạo Messages
-        await seed_messages(session, conversations, NUM_MESSAGES)
+        latest_messages = await seed_messages(session, conversations, NUM_MESSAGES, controller)
+        
+        # Bước 4: Cập nhật dữ liệu phi chuẩn hóa của conversations_by_user
+        await update_conversation_summaries(session, conversations, latest_messages, controller)
+        
+        # Bước 5: Ghi workload manifest để benchmark không phải query lấy mẫu IDs
+        manifest_size = write_manifest(MANIFEST_PATH, users, conversations, KEYSPACE)
+        print(f"📋 Đã ghi workload manifest {MANIFEST_PATH} ({manifest_size / 1024 / 1024:.1f} MB)")
         
         print("\n" + "="*60)
         print("🎉 HOÀN THÀNH TẠO DỮ LIỆU!")
@@ -366,6 +590,7 @@ async def main():
         print(f"   - Users: {NUM_USERS:,}")
         print(f"   - Conversations: {NUM_CONVERSATIONS:,}")
         print(f"   - Messages: {NUM_MESSAGES:,}")
+        controller.print_summary()
         print("="*60 + "\n")
         
     except Exception as e:
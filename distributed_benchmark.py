@@ -25,6 +25,7 @@ import json
 from cassandra.cluster import Cluster
 from cassandra.query import ConsistencyLevel
 import statistics
+from workload_manifest import get_sample_data
 
 # Configuration
 COORDINATOR_PORT = 50000
@@ -241,11 +242,8 @@ class Worker:
         
         # Get sample data
         print(f"📋 Loading sample data...")
-        users = session.execute("SELECT user_id FROM users_by_id LIMIT 1000")
-        user_ids = [row.user_id for row in users]
-        
-        convos = session.execute("SELECT conversation_id FROM conversations_by_user LIMIT 2000")
-        conversation_ids = list(set([row.conversation_id for row in convos]))[:1000]
+        user_ids, conversation_ids = get_sample_data(session, num_users=1000, num_conversations=1000,
+                                                     keyspace=KEYSPACE)
         
         print(f"✅ Loaded {len(user_ids)} users, {len(conversation_ids)} conversations")
         
@@ -10,6 +10,7 @@ import uuid
 import random
 import time
 import os
+from workload_manifest import get_sample_data
 
 # Cassandra cluster IPs (thay bằng IPs thực tế)
 CASSANDRA_IPS = os.getenv('CASSANDRA_IPS', '127.0.0.1').split(',')
@@ -44,11 +45,8 @@ def on_locust_init(environment, **kwargs):
     
     # Load sample data
     print("📋 Loading sample data...")
-    users = session.execute("SELECT user_id FROM users_by_id LIMIT 1000")
-    user_ids = [row.user_id for row in users]
-    
-    convos = session.execute("SELECT conversation_id FROM conversations_by_user LIMIT 2000")
-    conversation_ids = list(set([row.conversation_id for row in convos]))[:1000]
+    user_ids, conversation_ids = get_sample_data(session, num_users=1000, num_conversations=1000,
+                                                 keyspace=KEYSPACE)
     
     print(f"✅ Worker ready: {len(user_ids)} users, {len(conversation_ids)} conversations")
 
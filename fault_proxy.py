@@ -0,0 +1,368 @@
+"""
+Fault Proxy - TCP proxy asyncio giữa driver và các Cassandra node để tiêm lỗi
+Mỗi node có 1 listener riêng (127.0.0.11, 127.0.0.12, ... cùng PROXY_PORT); driver
+kết nối qua proxy nhờ ProxyAddressTranslator (đổi rpc_address của node -> listener).
+
+Lỗi tiêm theo từng node, đổi được khi đang chạy hoặc theo lịch (schedule):
+- latency_ms / jitter_ms: trễ thêm mỗi chunk, mỗi chiều (RTT tăng ~2 lần; giữ đúng thứ tự byte)
+- bandwidth_kbps: giới hạn băng thông mỗi chiều (chung cho mọi connection của node)
+- blackhole: 'request' / 'response' / 'both' - giữ dữ liệu lại không chuyển tiếp
+  (như mạng mất gói, TCP truyền lại khi hết lỗi); chỉ 1 chiều = partition không đối xứng
+- refuse: từ chối connection mới
+- reset: abort mọi connection đang mở (driver phải kết nối lại)
+
+Chỉ traffic driver <-> node đi qua proxy; gossip/replication giữa các node vẫn
+bình thường. Vì vậy blackhole 1 phần node là partition 1 phần nhìn từ client:
+cluster thấy node vẫn UP nhưng client không nhận được phản hồi (gray failure).
+
+Chạy độc lập (ghi fault_proxy.json để benchmark khác kết nối qua proxy):
+    python3 fault_proxy.py --scenario gray-failure
+Trong code:
+    proxy = FaultProxy(discover_nodes()); await proxy.start()
+    cluster = Cluster(**proxy.cluster_kwargs())
+Yêu cầu Linux (cả dải 127.0.0.0/8 là loopback).
+"""
+
+import argparse
+import asyncio
+import ipaddress
+import json
+import random
+import time
+
+from cassandra.cluster import Cluster
+from cassandra.policies import AddressTranslator
+
+# Configuration
+CONTACT_POINTS = ['127.0.0.1']
+PORT = 9042
+PROXY_LISTEN_BASE = '127.0.0.11'   # Node thứ i nghe trên 127.0.0.(11 + i)
+PROXY_PORT = 19042                 # Khác 9042 vì docker đã bind 0.0.0.0:9042
+PROXY_STATE_PATH = 'fault_proxy.json'
+CHUNK_SIZE = 64 * 1024
+DIRECTIONS = ('request', 'response')
+
+# Lịch lỗi mẫu: mỗi bước {'at': giây, 'nodes': [số thứ tự node, từ 1] hoặc 'all',
+# 'fault': {...} | 'action': 'reset' / 'clear'}
+SCENARIOS = {
+    'slow-node': [
+        {'at': 0, 'nodes': [2], 'fault': {'latency_ms': 100, 'jitter_ms': 50}},
+        {'at': 60, 'nodes': [2], 'action': 'clear'},
+    ],
+    'gray-failure': [
+        {'at': 10, 'nodes': [2], 'fault': {'latency_ms': 20, 'jitter_ms': 200,
+                                           'bandwidth_kbps': 512}},
+        {'at': 30, 'nodes': [2], 'action': 'reset'},
+        {'at': 60, 'nodes': [2], 'action': 'clear'},
+    ],
+    'flapping': [
+        {'at': 10, 'nodes': [2], 'fault': {'blackhole': 'both'}},
+        {'at': 15, 'nodes': [2], 'action': 'clear'},
+        {'at': 25, 'nodes': [2], 'fault': {'blackhole': 'both'}},
+        {'at': 30, 'nodes': [2], 'action': 'clear'},
+        {'at': 40, 'nodes': [2], 'fault': {'blackhole': 'both'}},
+        {'at': 45, 'nodes': [2], 'action': 'clear'},
+    ],
+    'partition': [
+        # Request tới được node 2, 3 nhưng phản hồi bị giữ lại
+        {'at': 10, 'nodes': [2, 3], 'fault': {'blackhole': 'response'}},
+        {'at': 40, 'nodes': [2, 3], 'action': 'clear'},
+    ],
+}
+
+class Fault:
+    """Trạng thái lỗi hiện tại của 1 node (mặc định: không lỗi)"""
+
+    FIELDS = ('latency_ms', 'jitter_ms', 'bandwidth_kbps', 'blackhole', 'refuse')
+
+    def __init__(self, latency_ms=0, jitter_ms=0, bandwidth_kbps=None, blackhole=None,
+                 refuse=False):
+        if blackhole not in (None, 'request', 'response', 'both'):
+            raise ValueError(f"blackhole không hợp lệ: {blackhole}")
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.bandwidth_kbps = bandwidth_kbps
+        self.blackhole = blackhole
+        self.refuse = refuse
+
+    def delay(self):
+        """Trễ thêm (giây) cho 1 chunk"""
+        jitter = random.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0
+        return max(0.0, self.latency_ms + jitter) / 1000
+
+    def blocks(self, direction):
+        return self.blackhole in (direction, 'both')
+
+    def describe(self):
+        parts = [f"{name}={getattr(self, name)}" for name in self.FIELDS
+                 if getattr(self, name) not in (0, None, False)]
+        return ', '.join(parts) or 'healthy'
+
+class NodeProxy:
+    """Listener cho 1 node; mỗi connection của driver mở 1 connection tới node thật"""
+
+    def __init__(self, name, listen_host, port, upstream_host, upstream_port):
+        self.name = name
+        self.listen_host = listen_host
+        self.port = port
+        self.upstream_host = upstream_host
+        self.upstream_port = upstream_port
+        self.fault = Fault()
+        self.connections = set()
+        self.bytes = {direction: 0 for direction in DIRECTIONS}
+        self._server = None
+        self._link_free_at = {direction: 0.0 for direction in DIRECTIONS}
+        self._open = {direction: asyncio.Event() for direction in DIRECTIONS}
+        for event in self._open.values():
+            event.set()
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.listen_host, self.port)
+
+    async def stop(self):
+        self.set_fault(Fault())   # Thả dữ liệu đang bị blackhole giữ để các pipe kết thúc
+        self.reset()
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+
+    def set_fault(self, fault):
+        self.fault = fault
+        for direction, event in self._open.items():
+            if fault.blocks(direction):
+                event.clear()
+            else:
+                event.set()
+
+    def reset(self):
+        """Abort mọi connection đang mở"""
+        for client_writer, upstream_writer in list(self.connections):
+            client_writer.transport.abort()
+            upstream_writer.transport.abort()
+        self.connections.clear()
+
+    def _bandwidth_deadline(self, direction, size, now):
+        """Token bucket đơn giản: thời điểm chunk đi hết qua 'đường truyền' của node"""
+        kbps = self.fault.bandwidth_kbps
+        if not kbps:
+            return now
+        start = max(now, self._link_free_at[direction])
+        self._link_free_at[direction] = start + size * 8 / (kbps * 1000)
+        return self._link_free_at[direction]
+
+    async def _pipe(self, reader, writer, direction):
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+
+        async def forward():
+            while True:
+                item = await queue.get()
+                if item is None:
+                    return
+                deliver_at, data = item
+                wait = deliver_at - loop.time()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                await self._open[direction].wait()   # blackhole: giữ lại tới khi hết lỗi
+                writer.write(data)
+                await writer.drain()
+
+        forwarder = asyncio.create_task(forward())
+        last_deliver_at = 0.0
+        try:
+            while True:
+                data = await reader.read(CHUNK_SIZE)
+                if not data:
+                    break
+                self.bytes[direction] += len(data)
+                now = loop.time()
+                deliver_at = max(now + self.fault.delay(),
+                                 self._bandwidth_deadline(direction, len(data), now),
+                                 last_deliver_at)   # jitter không được đảo thứ tự byte
+                last_deliver_at = deliver_at
+                queue.put_nowait((deliver_at, data))
+            queue.put_nowait(None)
+            await forwarder
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            forwarder.cancel()
+            writer.close()
+
+    async def _handle(self, client_reader, client_writer):
+        if self.fault.refuse:
+            client_writer.transport.abort()
+            return
+        try:
+            upstream_reader, upstream_writer = await asyncio.open_connection(
+                self.upstream_host, self.upstream_port)
+        except OSError:
+            client_writer.transport.abort()
+            return
+
+        connection = (client_writer, upstream_writer)
+        self.connections.add(connection)
+        try:
+            await asyncio.gather(
+                self._pipe(client_reader, upstream_writer, 'request'),
+                self._pipe(upstream_reader, client_writer, 'response'),
+            )
+        finally:
+            self.connections.discard(connection)
+
+class ProxyAddressTranslator(AddressTranslator):
+    """rpc_address của node (system.peers) -> địa chỉ listener của proxy"""
+
+    def __init__(self, mapping):
+        self.mapping = mapping
+
+    def translate(self, addr):
+        return self.mapping.get(addr, addr)
+
+class FaultProxy:
+    """Tập các NodeProxy; node đánh số từ 1 theo thứ tự địa chỉ upstream"""
+
+    def __init__(self, upstreams, listen_base=PROXY_LISTEN_BASE, port=PROXY_PORT,
+                 upstream_port=PORT):
+        base = ipaddress.ip_address(listen_base)
+        self.port = port
+        self.nodes = [
+            NodeProxy(f'node{i + 1}', str(base + i), port, upstream, upstream_port)
+            for i, upstream in enumerate(upstreams)
+        ]
+        self.events = []   # (thời điểm epoch, mô tả) mỗi lần đổi lỗi
+
+    async def start(self):
+        for node in self.nodes:
+            await node.start()
+        for node in self.nodes:
+            print(f"🔀 {node.name}: {node.listen_host}:{self.port} -> "
+                  f"{node.upstream_host}:{node.upstream_port}")
+
+    async def stop(self):
+        for node in self.nodes:
+            await node.stop()
+
+    @property
+    def mapping(self):
+        return {node.upstream_host: node.listen_host for node in self.nodes}
+
+    def translator(self):
+        return ProxyAddressTranslator(self.mapping)
+
+    def cluster_kwargs(self):
+        """Tham số cho Cluster(...) để driver đi qua proxy"""
+        return {'contact_points': [self.nodes[0].listen_host], 'port': self.port,
+                'address_translator': self.translator()}
+
+    def save_state(self, path=PROXY_STATE_PATH):
+        with open(path, 'w') as f:
+            json.dump({'port': self.port, 'mapping': self.mapping}, f, indent=2)
+
+    def select(self, nodes):
+        if nodes == 'all':
+            return list(self.nodes)
+        return [self.nodes[i - 1] for i in nodes]
+
+    def _record(self, description):
+        self.events.append((time.time(), description))
+        print(f"   ⚡ [{time.strftime('%H:%M:%S')}] {description}")
+
+    def set_fault(self, nodes, **fault):
+        for node in self.select(nodes):
+            node.set_fault(Fault(**fault))
+            self._record(f"{node.name}: {node.fault.describe()}")
+
+    def clear(self, nodes='all'):
+        for node in self.select(nodes):
+            node.set_fault(Fault())
+            self._record(f"{node.name}: healthy")
+
+    def reset(self, nodes='all'):
+        for node in self.select(nodes):
+            count = len(node.connections)
+            node.reset()
+            self._record(f"{node.name}: reset {count} connections")
+
+    def apply_step(self, step):
+        nodes = step.get('nodes', 'all')
+        action = step.get('action')
+        if action == 'reset':
+            self.reset(nodes)
+        elif action == 'clear':
+            self.clear(nodes)
+        elif 'fault' in step:
+            self.set_fault(nodes, **step['fault'])
+        else:
+            raise ValueError(f"Bước không hợp lệ: {step}")
+
+    async def run_schedule(self, steps):
+        """Áp dụng các bước theo giây tính từ lúc gọi"""
+        start = time.monotonic()
+        for step in sorted(steps, key=lambda s: s['at']):
+            wait = start + step['at'] - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            self.apply_step(step)
+
+def discover_nodes(contact_points=CONTACT_POINTS, port=PORT):
+    """Địa chỉ rpc của mọi node (kết nối trực tiếp, không qua proxy)"""
+    cluster = Cluster(contact_points, port=port)
+    try:
+        cluster.connect()
+        return sorted((host.address for host in cluster.metadata.all_hosts()),
+                      key=ipaddress.ip_address)
+    finally:
+        cluster.shutdown()
+
+def load_cluster_kwargs(path=PROXY_STATE_PATH):
+    """Tham số Cluster(...) để đi qua proxy đang chạy ở process khác"""
+    with open(path) as f:
+        state = json.load(f)
+    mapping = state['mapping']
+    return {'contact_points': [sorted(mapping.values(), key=ipaddress.ip_address)[0]],
+            'port': state['port'], 'address_translator': ProxyAddressTranslator(mapping)}
+
+def load_schedule(path):
+    with open(path) as f:
+        return json.load(f)
+
+# ============================================================================
+# MAIN
+# ============================================================================
+async def main():
+    parser = argparse.ArgumentParser(description='TCP proxy tiêm lỗi giữa driver và Cassandra')
+    parser.add_argument('--scenario', choices=sorted(SCENARIOS),
+                        help='Lịch lỗi có sẵn (bỏ trống = proxy không lỗi)')
+    parser.add_argument('--schedule', help='File JSON: danh sách bước {"at", "nodes", "fault"/"action"}')
+    parser.add_argument('--upstream', nargs='+',
+                        help='Địa chỉ các node (mặc định: tự tìm qua driver)')
+    parser.add_argument('--port', type=int, default=PROXY_PORT)
+    parser.add_argument('--duration', type=float,
+                        help='Dừng sau N giây (mặc định: chạy tới khi Ctrl-C)')
+    args = parser.parse_args()
+
+    upstreams = args.upstream or discover_nodes()
+    proxy = FaultProxy(upstreams, port=args.port)
+    await proxy.start()
+    proxy.save_state()
+    print(f"💾 Mapping đã lưu: {PROXY_STATE_PATH} (dùng fault_proxy.load_cluster_kwargs())")
+
+    steps = load_schedule(args.schedule) if args.schedule else SCENARIOS.get(args.scenario, [])
+    try:
+        schedule = asyncio.create_task(proxy.run_schedule(steps))
+        if args.duration:
+            await asyncio.sleep(args.duration)
+        else:
+            await schedule
+            print("✅ Hết lịch lỗi, proxy tiếp tục chạy (Ctrl-C để dừng)")
+            await asyncio.Event().wait()
+        schedule.cancel()
+    finally:
+        await proxy.stop()
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        print("\n🛑 Dừng proxy")
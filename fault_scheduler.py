@@ -0,0 +1,159 @@
+"""
+Fault Scheduler - Bắn các hành động lỗi theo giờ (offset giây) song song với tải
+Mỗi bước chạy trong task riêng: lệnh docker chạy bằng asyncio.create_subprocess_exec
+nên không chặn event loop, và 1 bước chậm (docker stop ~10s) không làm trễ bước sau.
+Mỗi sự kiện ghi lại offset lúc lên lịch, lúc bắn và lúc hoàn thành.
+
+Hành động:
+- stop / kill / start / pause / unpause <container>     (docker)
+- proxy <nodes> <fault>, proxy-reset <nodes>, proxy-clear <nodes>   (fault_proxy.FaultProxy)
+
+Cú pháp CLI: "giây:hành động:đích[:tham số]", ví dụ
+    30:stop:cassandra-2    90:start:cassandra-2    40:pause:cassandra-3
+    50:proxy:2,3:latency_ms=100,jitter_ms=20    70:proxy-clear:all
+"""
+
+import asyncio
+import time
+
+DOCKER_ACTIONS = ('stop', 'kill', 'start', 'pause', 'unpause')
+PROXY_ACTIONS = ('proxy', 'proxy-reset', 'proxy-clear')
+DISRUPTIVE_ACTIONS = ('stop', 'kill', 'pause', 'proxy', 'proxy-reset')
+RECOVERY_ACTIONS = ('start', 'unpause', 'proxy-clear')
+
+def _parse_value(text):
+    for cast in (int, float):
+        try:
+            return cast(text)
+        except ValueError:
+            pass
+    return {'true': True, 'false': False}.get(text.lower(), text)
+
+def parse_step(text):
+    """'50:proxy:2,3:latency_ms=100' -> {'at': 50.0, 'action': 'proxy', 'target': [2, 3], 'fault': {...}}"""
+    parts = text.split(':', 3)
+    if len(parts) < 3:
+        raise ValueError(f"Bước lỗi không hợp lệ: {text} (dạng giây:hành động:đích[:tham số])")
+    at, action, target = float(parts[0]), parts[1], parts[2]
+    if action not in DOCKER_ACTIONS + PROXY_ACTIONS:
+        raise ValueError(f"Hành động không hợp lệ: {action}")
+
+    step = {'at': at, 'action': action, 'target': target}
+    if action in PROXY_ACTIONS:
+        step['target'] = 'all' if target == 'all' else [int(n) for n in target.split(',')]
+    if action == 'proxy':
+        if len(parts) < 4:
+            raise ValueError(f"proxy cần tham số lỗi, ví dụ 50:proxy:2:latency_ms=100 ({text})")
+        step['fault'] = {key: _parse_value(value) for key, value in
+                         (item.split('=', 1) for item in parts[3].split(','))}
+    return step
+
+def kill_restart_steps(node, kill_at, restart_at, hard_kill=False):
+    """Timeline mặc định: tắt node tại kill_at, khởi động lại tại restart_at"""
+    return [
+        {'at': kill_at, 'action': 'kill' if hard_kill else 'stop', 'target': node},
+        {'at': restart_at, 'action': 'start', 'target': node},
+    ]
+
+def describe(step):
+    target = step['target']
+    if isinstance(target, list):
+        target = 'node ' + ','.join(str(n) for n in target)
+    detail = ''
+    if 'fault' in step:
+        detail = ' ' + ','.join(f'{k}={v}' for k, v in step['fault'].items())
+    return f"{step['action']} {target}{detail}"
+
+async def docker(*args):
+    """Chạy lệnh docker không chặn event loop. Returns: (thành công, stdout hoặc stderr)"""
+    process = await asyncio.create_subprocess_exec(
+        'docker', *args, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
+    stdout, stderr = await process.communicate()
+    if process.returncode != 0:
+        return False, stderr.decode().strip()
+    return True, stdout.decode()
+
+class FaultScheduler:
+    """
+    Chạy danh sách bước {'at', 'action', 'target'[, 'fault']} theo offset tính từ
+    start_time. events: mỗi bước 1 dict với scheduled / fired / completed (giây).
+    """
+
+    def __init__(self, steps, start_time=None, proxy=None):
+        self.steps = sorted(steps, key=lambda s: s['at'])
+        self.start_time = start_time
+        self.proxy = proxy
+        self.events = []
+        self._tasks = []
+        self._stopped = set()
+        self._paused = set()
+        if proxy is None and any(s['action'] in PROXY_ACTIONS for s in self.steps):
+            raise ValueError("Lịch có hành động proxy nhưng không chạy qua fault proxy")
+
+    @property
+    def docker_targets(self):
+        return {s['target'] for s in self.steps if s['action'] in DOCKER_ACTIONS}
+
+    def _elapsed(self):
+        return time.time() - self.start_time
+
+    async def _execute(self, step):
+        action, target = step['action'], step['target']
+        if action in DOCKER_ACTIONS:
+            ok, detail = await docker(action, target)
+            if ok:
+                if action in ('stop', 'kill'):
+                    self._stopped.add(target)
+                elif action == 'start':
+                    self._stopped.discard(target)
+                elif action == 'pause':
+                    self._paused.add(target)
+                elif action == 'unpause':
+                    self._paused.discard(target)
+            return ok, '' if ok else detail
+        if action == 'proxy':
+            self.proxy.set_fault(target, **step['fault'])
+        elif action == 'proxy-reset':
+            self.proxy.reset(target)
+        else:
+            self.proxy.clear(target)
+        return True, ''
+
+    async def _fire(self, step):
+        event = {'action': step['action'], 'target': step['target'], 'description': describe(step),
+                 'scheduled': step['at'], 'fired': self._elapsed()}
+        self.events.append(event)
+        print(f"\n⚡ [{event['fired']:6.1f}s] {event['description']}")
+        try:
+            ok, detail = await self._execute(step)
+        except Exception as e:
+            ok, detail = False, f"{type(e).__name__}: {e}"
+        event.update(completed=self._elapsed(), ok=ok, detail=detail)
+        print(f"   {'✓' if ok else '✗'} [{event['completed']:6.1f}s] {event['description']}"
+              f"{'' if ok else f' thất bại: {detail}'}")
+
+    async def run(self):
+        """Chờ tới từng offset rồi bắn bước trong task riêng; chờ mọi bước hoàn thành"""
+        if self.start_time is None:
+            self.start_time = time.time()
+        for step in self.steps:
+            await asyncio.sleep(max(0.0, self.start_time + step['at'] - time.time()))
+            self._tasks.append(asyncio.create_task(self._fire(step)))
+        if self._tasks:
+            await asyncio.gather(*self._tasks)
+
+    async def restore(self):
+        """Hoàn tác lỗi còn lại (bị ngắt giữa chừng): start/unpause container, xóa lỗi proxy"""
+        for task in self._tasks:
+            if not task.done():
+                task.cancel()
+        for node in list(self._paused):
+            await docker('unpause', node)
+        for node in list(self._stopped):
+            await docker('start', node)
+        if self.proxy is not None:
+            self.proxy.clear()
+
+    def first(self, actions, after=0.0):
+        """Sự kiện đầu tiên (đã bắn) có action thuộc actions, sau offset after"""
+        return next((e for e in self.events if e['action'] in actions and e['fired'] >= after), None)
@@ -0,0 +1,187 @@
+"""
+Inbox Models - Cập nhật inbox khi có tin nhắn mới theo 2 mô hình
+- DeleteInsertInbox: conversations_by_user (schema.cql). last_message_timestamp là
+  clustering key nên đưa conversation lên đầu = DELETE row cũ + INSERT row mới
+  cho mỗi member (mỗi lần sinh 1 row tombstone).
+- StateRecencyInbox: conversation_state_by_user (ghi đè theo conversation_id)
+  + inbox_recency_by_user (chỉ INSERT, TTL) trong schema_alternatives.cql.
+
+Event (tin nhắn mới) là dict: conversation, old_timestamp, timestamp, text,
+sender (member dict), unread ({user_id: unread_count} sau tin nhắn).
+"""
+
+import asyncio
+
+from cassandra.query import BatchStatement, BatchType
+from concurrency_control import wait_for_response
+
+RECENCY_OVERFETCH = 3   # Đọc limit x 3 entry recency rồi dedupe theo conversation
+
+class DeleteInsertInbox:
+    """Mô hình hiện tại: DELETE + INSERT trong 1 batch UNLOGGED mỗi member"""
+
+    name = 'delete+insert'
+
+    def __init__(self, session):
+        self.session = session
+        self.requests = 0
+        self.rows_written = 0
+        self.tombstones_written = 0
+        self._insert = session.prepare(
+            "INSERT INTO conversations_by_user "
+            "(user_id, last_message_timestamp, conversation_id, conversation_name, "
+            "conversation_avatar, conversation_type, last_message_text, "
+            "last_message_sender, unread_count) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+        )
+        self._delete = session.prepare(
+            "DELETE FROM conversations_by_user WHERE user_id = ? AND last_message_timestamp = ?"
+        )
+        self._read = session.prepare(
+            "SELECT conversation_id, conversation_name, last_message_timestamp, "
+            "last_message_text, last_message_sender, unread_count "
+            "FROM conversations_by_user WHERE user_id = ? LIMIT ?"
+        )
+
+    def _insert_params(self, user_id, convo, timestamp, text, sender, unread):
+        return (user_id, timestamp, convo['conversation_id'], convo['conversation_name'],
+                convo['conversation_avatar'], convo['conversation_type'], text, sender, unread)
+
+    async def initialize(self, convo):
+        """Row ban đầu (chưa có tin nhắn) cho mỗi member"""
+        futures = [
+            self.session.execute_async(self._insert, self._insert_params(
+                member['user_id'], convo, convo['created_at'], 'No messages yet', None, 0))
+            for member in convo['members']
+        ]
+        await asyncio.gather(*(wait_for_response(f) for f in futures))
+
+    async def apply(self, event):
+        convo = event['conversation']
+        futures = []
+        for member in convo['members']:
+            batch = BatchStatement(batch_type=BatchType.UNLOGGED)
+            # DELETE và INSERT cùng key trong 1 batch thì DELETE thắng, nên bỏ qua
+            if event['old_timestamp'] != event['timestamp']:
+                batch.add(self._delete, (member['user_id'], event['old_timestamp']))
+                self.tombstones_written += 1
+            batch.add(self._insert, self._insert_params(
+                member['user_id'], convo, event['timestamp'], event['text'],
+                event['sender']['username'], event['unread'][member['user_id']]))
+            self.rows_written += 1
+            futures.append(self.session.execute_async(batch))
+
+        self.requests += len(futures)
+        await asyncio.gather(*(wait_for_response(f) for f in futures))
+
+    def read_statements(self, user_id, limit):
+        """Các (statement, params) của 1 lần đọc inbox (dùng cho tracing)"""
+        return [(self._read, (user_id, limit))]
+
+    async def read(self, user_id, limit):
+        """limit conversation mới nhất của user"""
+        rows = await wait_for_response(self.session.execute_async(self._read, (user_id, limit)))
+        return list(rows)
+
+class StateRecencyInbox:
+    """
+    Mô hình thay thế: ghi đè state theo conversation_id + thêm entry recency.
+    Đọc: lấy entry recency mới nhất, dedupe (entry đầu tiên của mỗi conversation
+    là mới nhất), rồi đọc state bằng IN. Nếu recency không đủ (entry đã hết TTL)
+    thì bù bằng cách đọc toàn bộ partition state.
+    """
+
+    name = 'state+recency'
+
+    def __init__(self, session):
+        self.session = session
+        self.requests = 0
+        self.rows_written = 0
+        self.tombstones_written = 0
+        self._upsert_state = session.prepare(
+            "INSERT INTO conversation_state_by_user "
+            "(user_id, conversation_id, conversation_name, conversation_avatar, "
+            "conversation_type, last_message_timestamp, last_message_text, "
+            "last_message_sender, unread_count) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+        )
+        self._insert_recency = session.prepare(
+            "INSERT INTO inbox_recency_by_user (user_id, last_message_timestamp, conversation_id) "
+            "VALUES (?, ?, ?)"
+        )
+        self._read_recency = session.prepare(
+            "SELECT last_message_timestamp, conversation_id FROM inbox_recency_by_user "
+            "WHERE user_id = ? LIMIT ?"
+        )
+        self._read_recency_before = session.prepare(
+            "SELECT last_message_timestamp, conversation_id FROM inbox_recency_by_user "
+            "WHERE user_id = ? AND last_message_timestamp < ? LIMIT ?"
+        )
+        state_columns = ("conversation_id, conversation_name, last_message_timestamp, "
+                         "last_message_text, last_message_sender, unread_count")
+        self._read_states = session.prepare(
+            f"SELECT {state_columns} FROM conversation_state_by_user "
+            "WHERE user_id = ? AND conversation_id IN ?"
+        )
+        self._read_all_states = session.prepare(
+            f"SELECT {state_columns} FROM conversation_state_by_user WHERE user_id = ?"
+        )
+
+    async def _write(self, user_id, convo, timestamp, text, sender, unread):
+        futures = [
+            self.session.execute_async(self._upsert_state, (
+                user_id, convo['conversation_id'], convo['conversation_name'],
+                convo['conversation_avatar'], convo['conversation_type'],
+                timestamp, text, sender, unread)),
+            self.session.execute_async(self._insert_recency,
+                                       (user_id, timestamp, convo['conversation_id'])),
+        ]
+        self.requests += len(futures)
+        self.rows_written += len(futures)
+        await asyncio.gather(*(wait_for_response(f) for f in futures))
+
+    async def initialize(self, convo):
+        await asyncio.gather(*(
+            self._write(member['user_id'], convo, convo['created_at'], 'No messages yet', None, 0)
+            for member in convo['members']
+        ))
+
+    async def apply(self, event):
+        convo = event['conversation']
+        await asyncio.gather(*(
+            self._write(member['user_id'], convo, event['timestamp'], event['text'],
+                        event['sender']['username'], event['unread'][member['user_id']])
+            for member in convo['members']
+        ))
+
+    def read_statements(self, user_id, limit):
+        # Tracing chỉ cần truy vấn recency chính; state IN đọc ≤ limit rows, không có tombstone
+        return [(self._read_recency, (user_id, limit * RECENCY_OVERFETCH))]
+
+    async def read(self, user_id, limit):
+        conversation_ids = []
+        seen = set()
+        before = None
+        while len(conversation_ids) < limit:
+            fetch = limit * RECENCY_OVERFETCH
+            if before is None:
+                future = self.session.execute_async(self._read_recency, (user_id, fetch))
+            else:
+                future = self.session.execute_async(self._read_recency_before,
+                                                    (user_id, before, fetch))
+            rows = list(await wait_for_response(future))
+            for row in rows:
+                if row.conversation_id not in seen:
+                    seen.add(row.conversation_id)
+                    conversation_ids.append(row.conversation_id)
+            if len(rows) < fetch:
+                break
+            before = rows[-1].last_message_timestamp
+
+        if len(conversation_ids) < limit:
+            # Recency đã hết hạn với conversation cũ: đọc toàn bộ state rồi sắp xếp
+            states = await wait_for_response(
+                self.session.execute_async(self._read_all_states, (user_id,)))
+        else:
+            states = await wait_for_response(self.session.execute_async(
+                self._read_states, (user_id, conversation_ids[:limit])))
+
+        return sorted(states, key=lambda row: row.last_message_timestamp, reverse=True)[:limit]
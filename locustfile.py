@@ -10,6 +10,7 @@ from cassandra.query import SimpleStatement
 import uuid
 import random
 import time
+from workload_manifest import get_sample_data
 
 # Global connection pool
 cluster = None
@@ -29,11 +30,8 @@ def on_locust_init(environment, **kwargs):
     session.default_timeout = 30.0
     
     # Load sample data
-    users = session.execute("SELECT user_id FROM users_by_id LIMIT 100")
-    user_ids = [row.user_id for row in users]
-    
-    convos = session.execute("SELECT conversation_id FROM conversations_by_user LIMIT 500")
-    conversation_ids = list(set([row.conversation_id for row in convos]))[:100]
+    user_ids, conversation_ids = get_sample_data(session, num_users=100, num_conversations=100,
+                                                 keyspace='realtime_chat_app')
     
     print(f"✅ Loaded {len(user_ids)} users, {len(conversation_ids)} conversations")
 
@@ -0,0 +1,274 @@
+"""
+Partition Profiler - Phân bố kích thước partition của từng bảng
+- Quét song song theo token range: SELECT pk, COUNT(*) ... GROUP BY pk
+- Ước lượng bytes/partition từ system.size_estimates (hoặc từ mẫu rows)
+- Histogram log2 số rows/partition và cảnh báo partition vượt ngưỡng
+  (vd: conversation nhóm sống lâu trong messages_by_conversation)
+"""
+
+import argparse
+import asyncio
+import heapq
+import subprocess
+import time
+import uuid
+from array import array
+from datetime import datetime
+
+from cassandra.cluster import Cluster
+from schema_utils import load_tables, token_expression
+from token_ranges import scan_token_ranges
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+CONTACT_POINTS = ['127.0.0.1']
+PORT = 9042
+KEYSPACE = 'realtime_chat_app'
+PROFILE_RANGES = 1024           # Số khoảng token mỗi bảng
+PROFILE_CONCURRENCY = 16        # Số query GROUP BY in-flight tối đa
+PROFILE_TIMEOUT = 60.0          # Timeout (giây) mỗi query
+WIDE_ROWS_THRESHOLD = 100_000   # Cảnh báo partition có nhiều rows hơn
+WIDE_BYTES_THRESHOLD = 100 * 1024 * 1024  # Cảnh báo partition ước lượng > 100 MB
+TOP_PARTITIONS = 10             # Số partition lớn nhất in ra mỗi bảng
+TRACKED_PARTITIONS = 1000       # Số partition lớn nhất giữ lại key để cảnh báo
+SAMPLE_ROWS = 200               # Số rows mẫu khi không có size_estimates
+NODETOOL_NODE = 'cassandra-1'   # Container dùng cho --nodetool
+
+# ============================================================================
+# SCAN
+# ============================================================================
+async def profile_table(session, table, num_ranges=PROFILE_RANGES,
+                        concurrency=PROFILE_CONCURRENCY):
+    """
+    Đếm rows của mọi partition trong bảng.
+    Trả về (counts, largest): counts là array số rows mỗi partition,
+    largest là TRACKED_PARTITIONS partition lớn nhất dạng (rows, key).
+    """
+    key_columns = ', '.join(table['partition_key'])
+    token = token_expression(table)
+    statement = session.prepare(
+        f"SELECT {key_columns}, COUNT(*) AS row_count FROM {table['name']} "
+        f"WHERE {token} > ? AND {token} <= ? GROUP BY {key_columns}"
+    )
+
+    counts = array('Q')
+    largest = []
+
+    def add_partitions(start, end, rows):
+        total = 0
+        for row in rows:
+            key = tuple(getattr(row, column) for column in table['partition_key'])
+            counts.append(row.row_count)
+            total += row.row_count
+            if len(largest) < TRACKED_PARTITIONS:
+                heapq.heappush(largest, (row.row_count, key))
+            elif row.row_count > largest[0][0]:
+                heapq.heapreplace(largest, (row.row_count, key))
+        return total
+
+    failed = await scan_token_ranges(session, statement, add_partitions, num_ranges=num_ranges,
+                                     concurrency=concurrency, label=table['name'])
+    if failed:
+        print(f"   ⚠️  {len(failed)} khoảng token lỗi, kết quả {table['name']} thiếu dữ liệu")
+    return counts, sorted(largest, reverse=True)
+
+# ============================================================================
+# BYTES ESTIMATE
+# ============================================================================
+def value_size(value):
+    """Kích thước xấp xỉ (bytes) của 1 giá trị khi lưu trên đĩa"""
+    if value is None:
+        return 0
+    if isinstance(value, bool):
+        return 1
+    if isinstance(value, int):
+        return 8
+    if isinstance(value, float):
+        return 8
+    if isinstance(value, uuid.UUID):
+        return 16
+    if isinstance(value, datetime):
+        return 8
+    if isinstance(value, str):
+        return len(value.encode('utf-8'))
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if isinstance(value, (list, set, tuple)):
+        return sum(value_size(v) for v in value)
+    if isinstance(value, dict):
+        return sum(value_size(k) + value_size(v) for k, v in value.items())
+    return len(str(value))
+
+def size_estimates_bytes_per_partition(session, keyspace, table_name):
+    """
+    Kích thước partition trung bình (bytes) theo system.size_estimates của node
+    đang kết nối. None nếu chưa có số liệu (bảng mới được ghi, chưa refresh).
+    """
+    rows = session.execute(
+        "SELECT mean_partition_size, partitions_count FROM system.size_estimates "
+        "WHERE keyspace_name = %s AND table_name = %s",
+        (keyspace, table_name)
+    )
+    total_bytes = total_partitions = 0
+    for row in rows:
+        total_bytes += row.mean_partition_size * row.partitions_count
+        total_partitions += row.partitions_count
+    if total_partitions == 0:
+        return None
+    return total_bytes / total_partitions
+
+def sampled_bytes_per_row(session, table_name, sample_rows=SAMPLE_ROWS):
+    """Bytes/row trung bình tính từ sample_rows rows đầu tiên của bảng"""
+    rows = list(session.execute(f"SELECT * FROM {table_name} LIMIT {sample_rows}"))
+    if not rows:
+        return 0.0
+    return sum(sum(value_size(v) for v in row) for row in rows) / len(rows)
+
+def estimate_bytes_per_row(session, keyspace, table, counts):
+    """Bytes/row: ưu tiên size_estimates (chia cho rows/partition trung bình), fallback lấy mẫu"""
+    mean_partition_bytes = size_estimates_bytes_per_partition(session, keyspace, table['name'])
+    if mean_partition_bytes is not None and counts:
+        mean_rows = sum(counts) / len(counts)
+        return mean_partition_bytes / mean_rows, 'system.size_estimates'
+    return sampled_bytes_per_row(session, table['name']), f'mẫu {SAMPLE_ROWS} rows'
+
+def nodetool_histograms(keyspace, table_name, node=NODETOOL_NODE):
+    """Output của `nodetool tablehistograms` (percentile partition size/cell count)"""
+    try:
+        result = subprocess.run(
+            ['docker', 'exec', node, 'nodetool', 'tablehistograms', keyspace, table_name],
+            check=True, capture_output=True, text=True, timeout=60
+        )
+        return result.stdout
+    except (subprocess.CalledProcessError, subprocess.TimeoutExpired, FileNotFoundError) as e:
+        return f"❌ Không chạy được nodetool trên {node}: {e}"
+
+# ============================================================================
+# REPORT
+# ============================================================================
+def format_bytes(num_bytes):
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if num_bytes < 1024:
+            return f"{num_bytes:.1f} {unit}"
+        num_bytes /= 1024
+    return f"{num_bytes:.1f} TB"
+
+def log2_histogram(counts):
+    """Bucket b chứa các partition có số rows trong [2^b, 2^(b+1))"""
+    buckets = {}
+    for count in counts:
+        bucket = max(count, 1).bit_length() - 1
+        buckets[bucket] = buckets.get(bucket, 0) + 1
+    return dict(sorted(buckets.items()))
+
+def percentile(sorted_counts, p):
+    index = min(len(sorted_counts) - 1, int(len(sorted_counts) * p / 100))
+    return sorted_counts[index]
+
+def print_table_profile(table, counts, largest, bytes_per_row, bytes_source,
+                        rows_threshold=WIDE_ROWS_THRESHOLD, bytes_threshold=WIDE_BYTES_THRESHOLD):
+    """In thống kê, histogram và các partition vượt ngưỡng của 1 bảng"""
+    print("\n" + "="*70)
+    print(f"📦 {table['name']}  (partition key: {', '.join(table['partition_key'])})")
+    print("="*70)
+
+    if not counts:
+        print("   (bảng rỗng)")
+        return
+
+    sorted_counts = sorted(counts)
+    total_rows = sum(sorted_counts)
+    print(f"   Partitions: {len(sorted_counts):,} | Rows: {total_rows:,} | "
+          f"Bytes/row ≈ {bytes_per_row:.0f} ({bytes_source})")
+    print(f"   Rows/partition: p50={percentile(sorted_counts, 50):,} "
+          f"p90={percentile(sorted_counts, 90):,} p99={percentile(sorted_counts, 99):,} "
+          f"max={sorted_counts[-1]:,}")
+
+    # Histogram log2
+    histogram = log2_histogram(sorted_counts)
+    widest = max(histogram.values())
+    print(f"\n   {'Rows/partition':>20} {'Est. bytes':>22} {'Partitions':>11}")
+    for bucket, num_partitions in histogram.items():
+        low, high = 2 ** bucket, 2 ** (bucket + 1) - 1
+        rows_label = f"{low:,}-{high:,}" if high > low else f"{low:,}"
+        bytes_label = f"{format_bytes(low * bytes_per_row)}-{format_bytes(high * bytes_per_row)}"
+        bar = '█' * max(1, round(40 * num_partitions / widest))
+        print(f"   {rows_label:>20} {bytes_label:>22} {num_partitions:>11,} {bar}")
+
+    # Partition lớn nhất
+    print(f"\n   Top {min(TOP_PARTITIONS, len(largest))} partitions:")
+    for rows, key in largest[:TOP_PARTITIONS]:
+        key_label = ', '.join(str(k) for k in key)
+        print(f"      {key_label:<40} {rows:>12,} rows  ≈ {format_bytes(rows * bytes_per_row)}")
+
+    # Cảnh báo vượt ngưỡng
+    flagged = [(rows, key) for rows, key in largest
+               if rows > rows_threshold or rows * bytes_per_row > bytes_threshold]
+    over_limit = sum(1 for count in sorted_counts
+                     if count > rows_threshold or count * bytes_per_row > bytes_threshold)
+    if over_limit:
+        print(f"\n   ⚠️  {over_limit:,} partitions vượt ngưỡng "
+              f"({rows_threshold:,} rows hoặc {format_bytes(bytes_threshold)})")
+        for rows, key in flagged[:TOP_PARTITIONS]:
+            print(f"      🔥 {', '.join(str(k) for k in key)}: {rows:,} rows "
+                  f"≈ {format_bytes(rows * bytes_per_row)}")
+        if over_limit > len(flagged):
+            print(f"      (chỉ giữ key của {len(flagged):,} partitions lớn nhất)")
+    else:
+        print(f"\n   ✅ Không có partition vượt ngưỡng")
+
+# ============================================================================
+# MAIN
+# ============================================================================
+async def run_profiler(session, tables, args):
+    for table in tables:
+        print(f"\n🔍 Quét {table['name']}...")
+        start_time = time.time()
+        counts, largest = await profile_table(session, table, args.ranges, args.concurrency)
+        bytes_per_row, bytes_source = estimate_bytes_per_row(session, KEYSPACE, table, counts)
+        print(f"   Quét xong trong {time.time() - start_time:.1f}s")
+
+        print_table_profile(table, counts, largest, bytes_per_row, bytes_source,
+                            args.max_rows, args.max_mb * 1024 * 1024)
+        if args.nodetool:
+            print(f"\n   📋 nodetool tablehistograms ({args.nodetool}):")
+            print(nodetool_histograms(KEYSPACE, table['name'], args.nodetool))
+
+def main():
+    parser = argparse.ArgumentParser(description='Phân bố kích thước partition và cảnh báo partition lớn')
+    parser.add_argument('--table', action='append',
+                        help='Bảng cần profile (lặp lại được; mặc định mọi bảng trong schema.cql)')
+    parser.add_argument('--ranges', type=int, default=PROFILE_RANGES,
+                        help=f'Số khoảng token mỗi bảng (mặc định {PROFILE_RANGES})')
+    parser.add_argument('--concurrency', type=int, default=PROFILE_CONCURRENCY,
+                        help=f'Số query in-flight (mặc định {PROFILE_CONCURRENCY})')
+    parser.add_argument('--max-rows', type=int, default=WIDE_ROWS_THRESHOLD,
+                        help=f'Ngưỡng rows/partition (mặc định {WIDE_ROWS_THRESHOLD:,})')
+    parser.add_argument('--max-mb', type=float, default=WIDE_BYTES_THRESHOLD / 1024 / 1024,
+                        help='Ngưỡng MB/partition ước lượng (mặc định 100)')
+    parser.add_argument('--nodetool', nargs='?', const=NODETOOL_NODE, default=None,
+                        help=f'In thêm nodetool tablehistograms từ container (mặc định {NODETOOL_NODE})')
+    args = parser.parse_args()
+
+    tables = load_tables()
+    if args.table:
+        unknown = set(args.table) - {t['name'] for t in tables}
+        if unknown:
+            parser.error(f"Không có bảng trong schema.cql: {', '.join(sorted(unknown))}")
+        tables = [t for t in tables if t['name'] in args.table]
+
+    print("\n" + "="*70)
+    print("📊 PARTITION PROFILER")
+    print("="*70)
+
+    cluster = Cluster(CONTACT_POINTS, port=PORT)
+    session = cluster.connect(KEYSPACE)
+    session.default_timeout = PROFILE_TIMEOUT
+    try:
+        asyncio.run(run_profiler(session, tables, args))
+    finally:
+        cluster.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,1127 @@
+"""
+Report - Dựng bảng và biểu đồ từ artifact JSON của benchmark (results_io.py)
+Benchmark chỉ ghi artifact; report.py vẽ lại mà không cần chạy lại cluster
+(không import Cassandra driver: các hàm in bảng nằm ở đây, benchmark import từ report):
+- benchmark        → concurrency_sweep.png (chế độ --sweep)
+- consistency      → consistency_level_comparison.png
+- fault_tolerance  → fault_tolerance_benchmark.png
+- extreme_load     → extreme_load_benchmark.png
+- table_options    → table_options.png
+- speculative      → speculative_benchmark.png
+- unread           → unread_benchmark.png
+- inbox_update     → inbox_update_benchmark.png
+- bucketed         → bucketed_comparison.png
+- staleness        → staleness_benchmark.png
+- saturation       → saturation_curve.png
+- retry_policy     → retry_policy_benchmark.png
+Nhiều artifact: mỗi biểu đồ có tiền tố là tên file artifact, kèm bảng so sánh
+summary giữa các lần chạy của cùng 1 benchmark.
+
+Usage:
+    python3 report.py consistency_results.json
+    python3 report.py run1/benchmark_results.json run2/benchmark_results.json --output-dir charts
+"""
+
+import argparse
+import os
+import statistics
+from collections import Counter
+from results_io import load_results
+
+def _pyplot():
+    """matplotlib chỉ import khi vẽ; backend Agg để chạy được không cần màn hình"""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    return plt
+
+def save_figure(fig, path, dpi=150):
+    plt = _pyplot()
+    plt.savefig(path, dpi=dpi, bbox_inches='tight')
+    plt.close(fig)
+    print(f"\n📊 Biểu đồ đã lưu: {path}")
+
+# ============================================================================
+# BENCHMARK (concurrency sweep)
+# ============================================================================
+def print_sweep_table(results):
+    """In bảng kết quả sweep và ước lượng điểm bão hòa"""
+    for op_name, steps in results.items():
+        print(f"\n{'='*96}")
+        print(f"📊 CONCURRENCY SWEEP - {op_name.upper()}")
+        print(f"{'='*96}")
+        print(f"{'Concurrency':>11} {'Throughput':>12} {'p50 (ms)':>10} {'p99 (ms)':>10} "
+              f"{'Mean (ms)':>10} {'N/X (ms)':>10} {'Client (ms)':>12} {'Speedup':>8}")
+        print(f"{'-'*96}")
+        
+        base = steps[0]
+        for step in steps:
+            speedup = step['throughput'] / base['throughput']
+            print(f"{step['concurrency']:>11} {step['throughput']:>12,.0f} {step['p50']:>10.2f} "
+                  f"{step['p99']:>10.2f} {step['mean']:>10.2f} {step['little_latency']:>10.2f} "
+                  f"{step['client_overhead']:>12.2f} {speedup:>7.1f}x")
+        
+        # Bão hòa: mức đầu tiên mà tăng concurrency gần như không tăng throughput
+        knee = steps[-1]
+        for prev, step in zip(steps, steps[1:]):
+            if step['throughput'] < prev['throughput'] * 1.1:
+                knee = prev
+                break
+        
+        service_time = base['mean']
+        print(f"\n🔍 PHÂN TÍCH ({op_name.upper()}):")
+        print(f"   - Service time (latency @ c={base['concurrency']}): {service_time:.2f}ms "
+              f"→ trần lý tưởng 1 luồng: {1000 / service_time:,.0f} ops/s")
+        print(f"   - Bão hòa quanh c={knee['concurrency']} "
+              f"({knee['throughput']:,.0f} ops/s, p99 {knee['p99']:.1f}ms)")
+        worst = max(steps, key=lambda s: s['client_overhead'] / s['little_latency'])
+        if worst['client_overhead'] > 0.2 * worst['little_latency']:
+            print(f"   - ⚠️  Client bão hòa tại c={worst['concurrency']}: "
+                  f"{worst['client_overhead']:.1f}ms/request nằm ngoài latency đo được")
+        else:
+            print(f"   - Client giữ đủ request in-flight ở mọi mức (N/X ≈ latency)")
+
+def tables_benchmark(data):
+    if data['mode'] == 'sweep':
+        print_sweep_table(data['sweep'])
+        return
+    for op_name in ('write', 'read'):
+        r = data[op_name]
+        print(f"{op_name.upper():<5}: {r['throughput']:.0f} ops/s (p95: {r['p95']:.1f}ms, "
+              f"p99: {r['p99']:.1f}ms, concurrency: {r['concurrency']})")
+
+def chart_benchmark(data, path):
+    """Vẽ throughput, p50/p99 và N/X theo concurrency (chỉ có ở chế độ sweep)"""
+    if data['mode'] != 'sweep':
+        return
+    plt = _pyplot()
+    fig, axes = plt.subplots(1, 3, figsize=(18, 5))
+    fig.suptitle('Concurrency Sweep', fontsize=16, fontweight='bold')
+    colors = {'write': '#e74c3c', 'read': '#3498db'}
+
+    for op_name, steps in data['sweep'].items():
+        levels = [s['concurrency'] for s in steps]
+        color = colors.get(op_name)
+
+        axes[0].plot(levels, [s['throughput'] for s in steps], 'o-', color=color,
+                     linewidth=2, label=op_name.upper())
+        axes[1].plot(levels, [s['p50'] for s in steps], 'o-', color=color,
+                     linewidth=2, label=f'{op_name.upper()} p50')
+        axes[1].plot(levels, [s['p99'] for s in steps], 's--', color=color,
+                     linewidth=2, label=f'{op_name.upper()} p99')
+        axes[2].plot(levels, [s['little_latency'] for s in steps], 'o-', color=color,
+                     linewidth=2, label=f'{op_name.upper()} N/X')
+        axes[2].plot(levels, [s['mean'] for s in steps], 's--', color=color,
+                     linewidth=2, label=f'{op_name.upper()} measured mean')
+
+    titles = [('Throughput (ops/s)', 'Throughput vs Concurrency'),
+              ('Latency (ms)', 'Latency Percentiles vs Concurrency'),
+              ('Latency (ms)', "Little's Law N/X vs Measured Latency")]
+    for ax, (ylabel, title) in zip(axes, titles):
+        ax.set_xscale('log', base=2)
+        ax.set_xlabel('Concurrency (in-flight requests)', fontweight='bold')
+        ax.set_ylabel(ylabel, fontweight='bold')
+        ax.set_title(title)
+        ax.legend()
+        ax.grid(alpha=0.3)
+    axes[1].set_yscale('log')
+
+    plt.tight_layout()
+    save_figure(fig, path)
+
+# ============================================================================
+# CONSISTENCY
+# ============================================================================
+# t-Student 2 phía 95% theo bậc tự do (df lớn hơn bảng: 1.96)
+T_CRITICAL_95 = {1: 12.706, 2: 4.303, 3: 3.182, 4: 2.776, 5: 2.571, 6: 2.447, 7: 2.365,
+                 8: 2.306, 9: 2.262, 10: 2.228, 15: 2.131, 20: 2.086, 30: 2.042}
+
+def mean_confidence_interval(values):
+    """(mean, nửa độ rộng CI 95%); 1 giá trị thì CI = 0"""
+    mean = statistics.mean(values)
+    if len(values) < 2:
+        return mean, 0.0
+    df = len(values) - 1
+    # df nằm giữa 2 mốc trong bảng: lấy mốc nhỏ hơn (t lớn hơn, CI rộng hơn)
+    t = 1.96 if df > max(T_CRITICAL_95) else T_CRITICAL_95[max(k for k in T_CRITICAL_95 if k <= df)]
+    return mean, t * statistics.stdev(values) / len(values) ** 0.5
+
+def summarize(results, metric):
+    """
+    mean ± CI 95% của 1 metric qua các trial.
+    metric: 'throughput' / 'failures' hoặc (op, tên metric), ví dụ ('read', 'p99')
+    """
+    if isinstance(metric, tuple):
+        op, name = metric
+        values = [r['ops'][op][name] for r in results if op in r['ops']]
+    else:
+        values = [r[metric] for r in results]
+    if not values:
+        return None
+    return mean_confidence_interval(values)
+
+def format_ci(value, digits=2):
+    if value is None:
+        return '-'
+    mean, ci = value
+    return f"{mean:.{digits}f} ± {ci:.{digits}f}"
+
+def print_metric_table(title, columns, rows):
+    """Bảng N cột: columns là tên cột, rows là [(tên metric, [ô cho từng cột])]"""
+    label_width = max(len(name) for name, _ in rows) + 2
+    col_width = max([len(c) for c in columns] + [len(cell) for _, cells in rows for cell in cells]) + 2
+    width = label_width + col_width * len(columns)
+    print(f"\n{'='*width}")
+    print(title)
+    print(f"{'='*width}")
+    print(f"{'Metric':<{label_width}}" + ''.join(f"{c:>{col_width}}" for c in columns))
+    print(f"{'-'*width}")
+    for name, cells in rows:
+        print(f"{name:<{label_width}}" + ''.join(f"{cell:>{col_width}}" for cell in cells))
+    print(f"{'='*width}")
+
+def format_pair(pair):
+    """'QUORUM/ONE' -> 'W=QUORUM/R=ONE'"""
+    write_name, read_name = pair.split('/')
+    return f"W={write_name}/R={read_name}"
+
+def print_consistency_report(data):
+    """
+    In bảng tổng kết (mean ± CI 95% qua các trial) từ dữ liệu artifact:
+    trials theo tên cấu hình ('write:ONE', 'mixed:QUORUM/ONE'), strong = {cặp: R + W > RF}
+    """
+    trials, levels, pairs = data['trials'], data['levels'], data['pairs']
+    read_ratio, num_trials = data['read_ratio'], data['num_trials']
+    for op in ('write', 'read'):
+        results = [trials[f"{op}:{cl}"] for cl in levels]
+        print_metric_table(
+            f"📊 {op.upper()}-ONLY THEO CONSISTENCY LEVEL (mean ± CI 95%, {num_trials} trials)",
+            levels,
+            [('Throughput (ops/s)', [format_ci(summarize(r, 'throughput'), 0) for r in results])] +
+            [(f'Latency {m} (ms)', [format_ci(summarize(r, (op, m))) for r in results])
+             for m in ('avg', 'p50', 'p95', 'p99')] +
+            [('Failures', [format_ci(summarize(r, 'failures'), 1) for r in results])])
+
+    if not pairs:
+        return
+
+    mixed = [trials[f"mixed:{pair}"] for pair in pairs]
+    strong = data['strong']
+    print_metric_table(
+        f"📊 WORKLOAD TRỘN ({read_ratio:.0%} read) THEO CẶP W/R (mean ± CI 95%, {num_trials} trials)",
+        pairs,
+        [('R + W > RF', ['yes' if strong[pair] else 'no' for pair in pairs]),
+         ('Throughput (ops/s)', [format_ci(summarize(m, 'throughput'), 0) for m in mixed])] +
+        [(f'{op.capitalize()} {metric} (ms)', [format_ci(summarize(m, (op, metric))) for m in mixed])
+         for op in ('write', 'read') for metric in ('p50', 'p99')] +
+        [('Failures', [format_ci(summarize(m, 'failures'), 1) for m in mixed])])
+
+    # Analysis: khác biệt chỉ có ý nghĩa khi CI không chồng nhau
+    throughput = {pair: summarize(trials[f"mixed:{pair}"], 'throughput') for pair in pairs}
+    fastest = max(pairs, key=lambda p: throughput[p][0])
+    print(f"\n🔍 PHÂN TÍCH:")
+    print(f"   - Nhanh nhất: {format_pair(fastest)} ({format_ci(throughput[fastest], 0)} ops/s)")
+    strong_pairs = [p for p in pairs if strong[p]]
+    if strong_pairs and fastest not in strong_pairs:
+        best = max(strong_pairs, key=lambda p: throughput[p][0])
+        (fast_mean, fast_ci), (best_mean, best_ci) = throughput[fastest], throughput[best]
+        overlap = fast_mean - fast_ci <= best_mean + best_ci
+        print(f"   - Nhanh nhất với R + W > RF (đọc luôn thấy write đã ack): {format_pair(best)} "
+              f"({format_ci(throughput[best], 0)} ops/s, {fast_mean/best_mean:.2f}x chậm hơn"
+              f"{', CI chồng nhau: chưa phân biệt được' if overlap else ''})")
+    print(f"   - Cặp có R + W ≤ RF có thể đọc dữ liệu cũ ngay sau khi ghi "
+          f"(đo bằng benchmark_staleness.py)")
+
+def tables_consistency(data):
+    print_consistency_report(data)
+
+def bar_group(ax, labels, series, ylabel, title):
+    """N nhóm cột (1 nhóm / label), mỗi series là (tên, [(mean, ci) | None], màu)"""
+    width = 0.8 / len(series)
+    for i, (name, values, color) in enumerate(series):
+        means = [v[0] if v else 0 for v in values]
+        cis = [v[1] if v else 0 for v in values]
+        ax.bar([x + (i - (len(series) - 1) / 2) * width for x in range(len(labels))], means,
+               width, yerr=cis, capsize=3, label=name, color=color, alpha=0.7, edgecolor='black')
+    ax.set_ylabel(ylabel, fontweight='bold')
+    ax.set_title(title)
+    ax.set_xticks(range(len(labels)))
+    ax.set_xticklabels(labels, rotation=20)
+    if len(series) > 1:
+        ax.legend()
+    ax.grid(axis='y', alpha=0.3)
+
+def chart_consistency(data, path):
+    """Vẽ biểu đồ (mean ± CI 95%): latency theo level cho write/read, và chi phí các cặp (W, R)"""
+    trials = data['trials']
+    levels, pairs = data['levels'], data['pairs']
+    plt = _pyplot()
+    fig, axes = plt.subplots(2, 2, figsize=(max(16, 2.2 * max(len(levels), len(pairs))), 11))
+    fig.suptitle('Consistency Level Performance Comparison (mean ± 95% CI)',
+                 fontsize=16, fontweight='bold')
+
+    percentile_colors = {'p50': '#2ecc71', 'p95': '#f39c12', 'p99': '#e74c3c'}
+
+    # 1-2. Latency percentiles theo level, riêng write và read
+    for ax, op in ((axes[0, 0], 'write'), (axes[0, 1], 'read')):
+        series = [(metric, [summarize(trials[f"{op}:{cl}"], (op, metric)) for cl in levels], color)
+                  for metric, color in percentile_colors.items()]
+        bar_group(ax, levels, series, 'Latency (ms)',
+                  f'{op.capitalize()} Latency by Consistency Level')
+    # 3-4. Workload trộn theo cặp (W, R)
+    mixed = [trials[f"mixed:{pair}"] for pair in pairs]
+    bar_group(axes[1, 0], pairs,
+              [('throughput', [summarize(m, 'throughput') for m in mixed], '#3498db')],
+              'Throughput (ops/s)', f"Mixed Throughput by W/R Pair ({data['read_ratio']:.0%} reads)")
+    bar_group(axes[1, 1], pairs,
+              [(f'{op} p99', [summarize(m, (op, 'p99')) for m in mixed], color)
+               for op, color in (('write', '#e74c3c'), ('read', '#3498db'))],
+              'Latency (ms)', 'Mixed Workload p99 by Operation Type')
+
+    plt.tight_layout()
+    save_figure(fig, path, dpi=300)
+
+# ============================================================================
+# FAULT TOLERANCE
+# ============================================================================
+def print_fault_tolerance_report(data):
+    """Bảng theo pha, các mốc recovery và loại lỗi (data: artifact của fault_tolerance)"""
+    result, errors, steady = data['result'], data['errors'], data['steady']
+    baseline = result['baseline']
+    print(f"\n{'='*84}")
+    print("📊 KẾT QUẢ THEO PHA")
+    print(f"{'='*84}")
+    print(f"{'Phase':<14} {'Window (s)':>14} {'Ops/s':>9} {'p50 (ms)':>9} {'p99 (ms)':>9} "
+          f"{'p99 vs base':>12} {'Failures':>9}")
+    print(f"{'-'*84}")
+    for name, p in result['phases'].items():
+        ratio = f"{p['p99']/baseline['p99']:.2f}x" if baseline else '-'
+        print(f"{name:<14} {p['start']:>6.0f} - {p['end']:<5.0f} {p['throughput']:>9,.0f} "
+              f"{p['p50']:>9.2f} {p['p99']:>9.2f} {ratio:>12} {p['failure_rate']*100:>8.2f}%")
+    print(f"{'='*84}")
+
+    def seconds(value):
+        return f"{value:.1f}s" if value is not None else 'không quan sát được'
+
+    print(f"\n⏱️  RECOVERY:")
+    timeline = result['timeline']
+    if 'fault' in timeline:
+        print(f"   - Lỗi: {timeline['fault_description']} @ {timeline['fault']:.2f}s"
+              + (f", phục hồi: {timeline['recovery_description']} @ {timeline['recovery']:.2f}s"
+                 if 'recovery' in timeline else ''))
+    print(f"   - Time-to-detect (lỗi -> driver đánh dấu DOWN): {seconds(result.get('time_to_detect'))}")
+    print(f"   - Lỗi request đầu tiên sau khi tiêm lỗi: {seconds(result.get('first_failure_after_fault'))}")
+    print(f"   - Time-to-rejoin (phục hồi -> driver thấy UP): {seconds(result.get('time_to_rejoin'))}")
+    print(f"   - Time-to-steady-state (phục hồi -> {steady['window']}s liên tiếp ≥"
+          f"{steady['throughput']:.0%} throughput, p99 ≤ {steady['p99']}x baseline): "
+          f"{seconds(result.get('time_to_steady'))}")
+    hints = result.get('hints_window')
+    if hints:
+        end = f"{hints[1]:.0f}s" if hints[1] is not None else 'chưa xong khi kết thúc'
+        print(f"   - Hints: tối đa {result['hints_peak']} hint files, replay {hints[0]:.0f}s -> {end}")
+    else:
+        print(f"   - Hints: không thấy pending hints (listpendinghints)")
+
+    if errors:
+        print(f"\n❌ LOẠI LỖI:")
+        for error, count in Counter(errors).most_common():
+            print(f"   - {error}: {count} lần")
+
+def tables_fault_tolerance(data):
+    print_fault_tolerance_report(data)
+
+def chart_fault_tolerance(data, path):
+    """Vẽ chuỗi theo giây với các mốc lỗi (FaultScheduler) / detect / rejoin / steady"""
+    from analysis import rolling_mean
+    from fault_scheduler import RECOVERY_ACTIONS
+    series, result = data['series'], data['result']
+    steady_window = data['steady']['window']
+    plt = _pyplot()
+    fig, axes = plt.subplots(4, 1, figsize=(15, 14), sharex=True)
+    fig.suptitle('Fault Tolerance: Node Failure and Recovery Timeline', fontsize=16, fontweight='bold')
+
+    seconds = [p['second'] for p in series]
+    ops = [p['ops'] for p in series]
+    axes[0].plot(seconds, ops, color='#3498db', linewidth=1, alpha=0.5)
+    axes[0].plot(seconds, rolling_mean(ops, steady_window), color='#3498db', linewidth=2,
+                 label=f'{steady_window}s rolling mean')
+    axes[0].set_ylabel('Ops/s', fontweight='bold')
+    axes[0].set_title('Throughput')
+
+    axes[1].plot(seconds, [p['p50'] for p in series], color='#2ecc71', linewidth=1.5, label='p50')
+    axes[1].plot(seconds, [p['p99'] for p in series], color='#e74c3c', linewidth=1.5, label='p99')
+    axes[1].set_yscale('log')
+    axes[1].set_ylabel('Latency (ms)', fontweight='bold')
+    axes[1].set_title('Latency per Second')
+    axes[1].legend()
+
+    axes[2].plot(seconds, [p['failures'] / p['ops'] * 100 if p['ops'] else 0 for p in series],
+                 color='red', linewidth=2)
+    axes[2].set_ylabel('Failure Rate (%)', fontweight='bold')
+    axes[2].set_title('Failure Rate')
+
+    hint_samples = data['pending_hints']
+    if hint_samples:
+        axes[3].step([h['at'] for h in hint_samples], [h['files'] for h in hint_samples],
+                     where='post', color='#9b59b6', linewidth=2)
+    axes[3].set_ylabel('Pending hint files', fontweight='bold')
+    axes[3].set_title('Hinted Handoff Backlog (surviving nodes)')
+    axes[3].set_xlabel('Time (seconds)', fontweight='bold')
+
+    markers = [(e['fired'], e['description'],
+                'green' if e['action'] in RECOVERY_ACTIONS else 'red') for e in data['faults']]
+    markers.append((result.get('steady_at'), 'steady', 'black'))
+    markers += [(e['at'], f"driver {e['event']}", 'gray') for e in data['host_events']
+                if e['event'] in ('down', 'up')]
+    hints = result.get('hints_window')
+    for ax in axes:
+        for t, label, color in markers:
+            if t is not None:
+                ax.axvline(x=t, color=color, linestyle='--', linewidth=1.5, alpha=0.7, label=label)
+        if hints and hints[1] is not None:
+            ax.axvspan(hints[0], hints[1], color='#9b59b6', alpha=0.1)
+        ax.grid(alpha=0.3)
+    handles, labels = axes[0].get_legend_handles_labels()
+    unique = dict(zip(labels, handles))
+    axes[0].legend(unique.values(), unique.keys(), fontsize=8)
+
+    plt.tight_layout()
+    save_figure(fig, path)
+
+# ============================================================================
+# EXTREME LOAD
+# ============================================================================
+def summary_text(stats):
+    return f"""
+    PERFORMANCE SUMMARY
+    {'='*30}
+
+    Total Messages: {stats['target']:,}
+    Duration: {stats['total_time']:.1f}s ({stats['total_time']/60:.1f}min)
+    Throughput: {stats['throughput']:.0f} ops/s
+    Concurrency: {stats['concurrency']} ({stats['concurrency_mode']})
+    Failures: {stats['failures']} ({stats['failures']/stats['target']*100:.3f}%)
+
+    LATENCY METRICS
+    {'='*30}
+    Min: {stats['min']:.2f}ms
+    Avg: {stats['avg']:.2f}ms
+    p50: {stats['p50']:.2f}ms
+    p95: {stats['p95']:.2f}ms
+    p99: {stats['p99']:.2f}ms
+    Max: {stats['max']:.2f}ms
+    """
+
+def tables_extreme_load(data):
+    print(summary_text(data['stats']))
+
+def chart_extreme_load(data, path):
+    """Vẽ biểu đồ extreme load test từ histogram / CDF / mẫu scatter đã gom nhóm"""
+    result = data['stats']
+    plt = _pyplot()
+    fig = plt.figure(figsize=(16, 10))
+    gs = fig.add_gridspec(3, 3, hspace=0.3, wspace=0.3)
+
+    fig.suptitle(f'Extreme Load Test: {result["target"]:,} Messages',
+                 fontsize=18, fontweight='bold')
+
+    # 1. Summary metrics (text box) - Top left
+    ax1 = fig.add_subplot(gs[0, 0])
+    ax1.axis('off')
+    ax1.text(0.1, 0.9, summary_text(result), transform=ax1.transAxes,
+            fontsize=11, verticalalignment='top', fontfamily='monospace',
+            bbox=dict(boxstyle='round', facecolor='wheat', alpha=0.5))
+
+    # 2. Milestone progress - Top middle & right
+    ax2 = fig.add_subplot(gs[0, 1:])
+    milestones = result['milestone_labels']
+    times = result['milestone_times']
+
+    ax2.barh(milestones, times, color=['#2ecc71', '#3498db', '#f39c12', '#e74c3c'])
+    ax2.set_xlabel('Time (seconds)', fontweight='bold')
+    ax2.set_title('Progress Milestones')
+    ax2.grid(axis='x', alpha=0.3)
+
+    for i, (label, time) in enumerate(zip(milestones, times)):
+        ax2.text(time, i, f' {time:.1f}s', va='center', fontweight='bold')
+
+    # 3. Latency distribution - Middle left (histogram tính sẵn)
+    ax3 = fig.add_subplot(gs[1, 0])
+    histogram = data['histogram']
+    ax3.stairs(histogram['counts'], histogram['edges'], fill=True, color='#3498db', alpha=0.7)
+    ax3.axvline(result['p50'], color='green', linestyle='--', linewidth=2, label=f'p50: {result["p50"]:.1f}ms')
+    ax3.axvline(result['p95'], color='orange', linestyle='--', linewidth=2, label=f'p95: {result["p95"]:.1f}ms')
+    ax3.axvline(result['p99'], color='red', linestyle='--', linewidth=2, label=f'p99: {result["p99"]:.1f}ms')
+    ax3.set_xlabel('Latency (ms)', fontweight='bold')
+    ax3.set_ylabel('Frequency', fontweight='bold')
+    ax3.set_title('Latency Distribution')
+    ax3.legend()
+    ax3.grid(alpha=0.3)
+
+    # 4. Latency over time (scatter) - Middle middle, đã lấy mẫu (lấy đều + max mỗi bucket)
+    ax4 = fig.add_subplot(gs[1, 1])
+    scatter = data['scatter']
+
+    ax4.scatter(scatter['index'], scatter['latency'], alpha=0.3, s=1, color='blue')
+    ax4.axhline(result['p95'], color='orange', linestyle='--', linewidth=1, label='p95')
+    ax4.set_xlabel('Operation #', fontweight='bold')
+    ax4.set_ylabel('Latency (ms)', fontweight='bold')
+    ax4.set_title(f"Latency Over Time ({len(scatter['index']):,} of {result['target']:,} points, "
+                  f"strided + bucket peaks)")
+    ax4.legend()
+    ax4.grid(alpha=0.3)
+
+    # 5. CDF - Middle right
+    ax5 = fig.add_subplot(gs[1, 2])
+    ax5.plot(data['cdf']['latency'], data['cdf']['percent'], linewidth=2, color='#2ecc71')
+    ax5.axhline(50, color='green', linestyle='--', alpha=0.5, label='p50')
+    ax5.axhline(95, color='orange', linestyle='--', alpha=0.5, label='p95')
+    ax5.axhline(99, color='red', linestyle='--', alpha=0.5, label='p99')
+    ax5.set_xlabel('Latency (ms)', fontweight='bold')
+    ax5.set_ylabel('Percentile (%)', fontweight='bold')
+    ax5.set_title('Cumulative Distribution (CDF)')
+    ax5.legend()
+    ax5.grid(alpha=0.3)
+
+    # 6. Box plot percentiles - Bottom left (box stats tính sẵn, outlier đã lấy mẫu)
+    ax6 = fig.add_subplot(gs[2, 0])
+    bp = ax6.bxp(data['bands'], patch_artist=True)
+
+    colors = ['#2ecc71', '#3498db', '#f39c12', '#e74c3c']
+    for patch, color in zip(bp['boxes'], colors):
+        patch.set_facecolor(color)
+        patch.set_alpha(0.7)
+
+    ax6.set_ylabel('Latency (ms)', fontweight='bold')
+    ax6.set_title('Latency by Percentile Range')
+    ax6.grid(axis='y', alpha=0.3)
+
+    # 7. Throughput estimation - Bottom middle
+    # Little's law: concurrency / latency trung bình của mỗi cửa sổ
+    ax7 = fig.add_subplot(gs[2, 1])
+    windows = data['windows']
+    throughputs = [result['concurrency'] / (latency / 1000) if latency > 0 else 0
+                   for latency in windows['mean_latency']]
+
+    ax7.plot(windows['time'], throughputs, linewidth=2, color='#9b59b6')
+    ax7.axhline(result['throughput'], color='red', linestyle='--',
+               label=f'Avg: {result["throughput"]:.0f} ops/s')
+    ax7.set_xlabel('Time (seconds)', fontweight='bold')
+    ax7.set_ylabel('Throughput (ops/s)', fontweight='bold')
+    ax7.set_title('Estimated Throughput Over Time')
+    ax7.legend()
+    ax7.grid(alpha=0.3)
+
+    # 8. Comparison bar chart - Bottom right
+    ax8 = fig.add_subplot(gs[2, 2])
+
+    metrics = ['Avg', 'p50', 'p95', 'p99']
+    values = [result['avg'], result['p50'], result['p95'], result['p99']]
+    colors = ['#3498db', '#2ecc71', '#f39c12', '#e74c3c']
+
+    bars = ax8.bar(metrics, values, color=colors, alpha=0.7, edgecolor='black')
+    ax8.set_ylabel('Latency (ms)', fontweight='bold')
+    ax8.set_title('Latency Metrics Comparison')
+    ax8.grid(axis='y', alpha=0.3)
+
+    for bar in bars:
+        height = bar.get_height()
+        ax8.text(bar.get_x() + bar.get_width()/2., height,
+                f'{height:.1f}ms',
+                ha='center', va='bottom', fontweight='bold')
+
+    save_figure(fig, path)
+
+# ============================================================================
+# TABLE OPTIONS (compaction x compression)
+# ============================================================================
+def print_table_options_report(results):
+    print(f"\n{'='*104}")
+    print("📊 COMPACTION x COMPRESSION MATRIX")
+    print(f"{'='*104}")
+    print(f"{'Table':<26} {'Config':<22} {'Write/s':>9} {'W p99':>8} {'R p99':>8} "
+          f"{'Disk MB':>9} {'Ratio':>6} {'SST':>5} {'Pending':>8} {'Settle':>7}")
+    print(f"{'-'*104}")
+    for r in results:
+        ratio = f"{r['compression_ratio']:.2f}" if r['compression_ratio'] else '-'
+        pending = r['pending_compactions'] if r['pending_compactions'] is not None else '-'
+        settle = f"{r['settle_seconds']:.0f}s" if r['settle_seconds'] is not None else '-'
+        print(f"{r['table']:<26} {r['config']:<22} {r['write_throughput']:>9,.0f} "
+              f"{r['write_p99']:>8.2f} {r['read_p99']:>8.2f} {r['disk_mb']:>9.1f} "
+              f"{ratio:>6} {r['sstables']:>5} {pending:>8} {settle:>7}")
+    print(f"{'='*104}")
+
+def tables_table_options(data):
+    print_table_options_report(data['results'])
+
+def chart_table_options(data, path):
+    """Write throughput, read p99 và dung lượng cho từng cấu hình, 1 hàng / bảng"""
+    results = data['results']
+    plt = _pyplot()
+    tables = sorted({r['table'] for r in results})
+    fig, axes = plt.subplots(len(tables), 3, figsize=(20, 6 * len(tables)), squeeze=False)
+    fig.suptitle('Compaction x Compression Matrix', fontsize=16, fontweight='bold')
+    colors = {'STCS': '#3498db', 'LCS': '#e67e22', 'TWCS': '#2ecc71'}
+
+    for row_axes, table_name in zip(axes, tables):
+        table_results = [r for r in results if r['table'] == table_name]
+        labels = [r['config'] for r in table_results]
+        bar_colors = [colors.get(r['compaction'], 'gray') for r in table_results]
+        for ax, key, title in zip(row_axes,
+                                  ['write_throughput', 'read_p99', 'disk_mb'],
+                                  ['Write Throughput (rows/s)', 'Read p99 (ms)', 'Disk Used (MB)']):
+            ax.bar(range(len(labels)), [r[key] for r in table_results], color=bar_colors, alpha=0.85)
+            ax.set_xticks(range(len(labels)))
+            ax.set_xticklabels(labels, rotation=60, ha='right', fontsize=8)
+            ax.set_title(f'{table_name}: {title}')
+            ax.grid(axis='y', alpha=0.3)
+
+    plt.tight_layout()
+    save_figure(fig, path)
+
+# ============================================================================
+# SPECULATIVE EXECUTION
+# ============================================================================
+def speculative_results(data):
+    """Các dòng của artifact -> {(scenario, op, mode): kết quả}"""
+    return {(r['scenario'], r['op'], r['mode']): r for r in data['results']}
+
+def print_speculative_report(data):
+    results = speculative_results(data)
+    baseline_mode = data['modes'][0]   # Chế độ đầu tiên luôn là 'no speculation'
+    print(f"\n{'='*104}")
+    print("📊 SPECULATIVE EXECUTION: TAIL LATENCY VS REQUEST THÊM")
+    print(f"{'='*104}")
+    print(f"{'Scenario':<9} {'Op':<6} {'Mode':<18} {'Ops/s':>9} {'p50':>8} {'p99':>8} "
+          f"{'p99.9':>8} {'max':>8} {'Extra req':>10} {'Failures':>9}")
+    print(f"{'-'*104}")
+    for (scenario, op, mode), r in results.items():
+        print(f"{scenario:<9} {op:<6} {mode:<18} {r['throughput']:>9,.0f} {r['p50']:>7.2f}ms "
+              f"{r['p99']:>6.2f}ms {r['p999']:>6.2f}ms {r['max']:>6.0f}ms "
+              f"{r['extra_load']*100:>9.1f}% {r['failures']:>9}")
+    print(f"{'='*104}")
+
+    print(f"\n🔍 PHÂN TÍCH:")
+    for (scenario, op, mode), r in results.items():
+        baseline = results.get((scenario, op, baseline_mode))
+        if mode == baseline_mode or not baseline:
+            continue
+        print(f"   - {scenario}/{op} {mode}: p99 {baseline['p99']:.1f} -> {r['p99']:.1f}ms, "
+              f"p99.9 {baseline['p999']:.1f} -> {r['p999']:.1f}ms, "
+              f"+{r['extra_load']*100:.1f}% request")
+
+def tables_speculative(data):
+    print_speculative_report(data)
+
+def chart_speculative(data, path):
+    """p50 / p99 / p99.9 theo chế độ, nhãn trên cột: % request thêm"""
+    import numpy as np
+    plt = _pyplot()
+    results = speculative_results(data)
+    scenarios, modes = data['scenarios'], data['modes']
+    ops = sorted({op for _, op, _ in results}, reverse=True)
+    fig, axes = plt.subplots(len(ops), len(scenarios), figsize=(8 * len(scenarios), 5 * len(ops)),
+                             squeeze=False)
+    fig.suptitle('Speculative Execution: Tail Latency vs Extra Load', fontsize=16, fontweight='bold')
+
+    x = np.arange(len(modes))
+    width = 0.27
+    for row, op in enumerate(ops):
+        for col, scenario in enumerate(scenarios):
+            ax = axes[row, col]
+            points = [results[(scenario, op, mode)] for mode in modes]
+            for offset, (metric, color) in zip((-width, 0, width), (
+                    ('p50', '#2ecc71'), ('p99', '#f39c12'), ('p999', '#e74c3c'))):
+                ax.bar(x + offset, [p[metric] for p in points], width, color=color, alpha=0.7,
+                       edgecolor='black', label='p99.9' if metric == 'p999' else metric)
+            for i, p in enumerate(points):
+                ax.text(i, p['p999'], f"+{p['extra_load']*100:.0f}%", ha='center', va='bottom',
+                        fontsize=8)
+            ax.set_title(f'{op.capitalize()} - {scenario}')
+            ax.set_ylabel('Latency (ms)', fontweight='bold')
+            ax.set_xticks(x)
+            ax.set_xticklabels(modes, rotation=20)
+            ax.legend()
+            ax.grid(axis='y', alpha=0.3)
+
+    plt.tight_layout()
+    save_figure(fig, path)
+
+# ============================================================================
+# UNREAD TRACKING
+# ============================================================================
+def unread_results(data):
+    """Các dòng của artifact -> {(fanout, model): kết quả}"""
+    return {(r['fanout'], r['model']): r for r in data['results']}
+
+def print_unread_report(data):
+    results = unread_results(data)
+    print(f"\n{'='*108}")
+    print("📊 UNREAD TRACKING: THROUGHPUT / LATENCY / ĐỘ CHÍNH XÁC")
+    print(f"{'='*108}")
+    print(f"{'Fan-out':>7} {'Model':<20} {'Ops/s':>8} {'Send p99':>9} {'Open p99':>9} "
+          f"{'Badge p99':>10} {'Req/send':>9} {'Req/op':>7} {'Wrong':>7} {'Lost incr':>10}")
+    print(f"{'-'*108}")
+    for (fanout, name), r in results.items():
+        def p99(op):
+            return f"{r[op]['p99']:.2f}" if op in r else '-'
+        print(f"{fanout:>7} {name:<20} {r['throughput']:>8,.0f} {p99('send'):>9} {p99('open'):>9} "
+              f"{p99('badge'):>10} {r['requests_per_send']:>9.1f} {r['requests_per_op']:>7.2f} "
+              f"{r['wrong_rate']*100:>6.1f}% {r['lost']:>10,}")
+    print(f"{'='*108}")
+
+def tables_unread(data):
+    print_unread_report(data)
+
+def chart_unread(data, path):
+    plt = _pyplot()
+    results, fanouts = unread_results(data), data['fanouts']
+    fig, axes = plt.subplots(1, 3, figsize=(18, 5))
+    fig.suptitle('Unread Tracking under Group-Chat Fan-out', fontsize=16, fontweight='bold')
+    colors = {'read-modify-write': '#e74c3c', 'counter': '#3498db', 'last-read watermark': '#2ecc71'}
+
+    for name, color in colors.items():
+        points = [results[(f, name)] for f in fanouts if (f, name) in results]
+        if not points:
+            continue
+        axes[0].plot(fanouts, [p['throughput'] for p in points], 'o-', color=color,
+                     linewidth=2, label=name)
+        axes[1].plot(fanouts, [p['send']['p99'] if 'send' in p else 0 for p in points], 'o-',
+                     color=color, linewidth=2, label=f'{name} send')
+        axes[1].plot(fanouts, [p['badge']['p99'] if 'badge' in p else 0 for p in points], 's--',
+                     color=color, linewidth=1.5, label=f'{name} badge')
+        axes[2].plot(fanouts, [p['wrong_rate'] * 100 for p in points], 'o-', color=color,
+                     linewidth=2, label=name)
+
+    titles = [('Ops/s', 'Mixed Throughput'), ('Latency p99 (ms)', 'Send vs Badge p99'),
+              ('% badges wrong', 'Lost Updates (send-only phase)')]
+    for ax, (ylabel, title) in zip(axes, titles):
+        ax.set_xscale('log')
+        ax.set_xticks(fanouts)
+        ax.set_xticklabels([str(f) for f in fanouts])
+        ax.set_xlabel('Members per conversation', fontweight='bold')
+        ax.set_ylabel(ylabel, fontweight='bold')
+        ax.set_title(title)
+        ax.legend(fontsize=8)
+        ax.grid(alpha=0.3)
+
+    plt.tight_layout()
+    save_figure(fig, path)
+
+# ============================================================================
+# INBOX UPDATE
+# ============================================================================
+def print_inbox_round(results):
+    """Bảng 1 vòng: {mô hình: kết quả}"""
+    print(f"\n   {'Model':<15} {'Write/s':>9} {'Req/msg':>8} {'Rows/msg':>9} {'Tomb/msg':>9} "
+          f"{'Read p50':>9} {'Read p99':>9} {'Live/read':>10} {'Tomb/read':>10}")
+    for name, r in results.items():
+        live = f"{r['live_rows_per_read']:.1f}" if r['live_rows_per_read'] is not None else '-'
+        dead = f"{r['tombstones_per_read']:.1f}" if r['tombstones_per_read'] is not None else '-'
+        print(f"   {name:<15} {r['write_throughput']:>9,.0f} {r['requests_per_msg']:>8.2f} "
+              f"{r['rows_per_msg']:>9.2f} {r['tombstones_per_msg']:>9.2f} "
+              f"{r['read_p50']:>8.2f}ms {r['read_p99']:>7.2f}ms {live:>10} {dead:>10}")
+
+def tables_inbox_update(data):
+    history = data['history']
+    rounds = zip(*history.values())
+    for round_no, round_results in enumerate(rounds, 1):
+        print(f"\n🔄 Vòng {round_no}: {round_results[0]['messages']:,} tin nhắn")
+        print_inbox_round(dict(zip(history, round_results)))
+
+def chart_inbox_update(data, path):
+    """Diễn biến theo số tin nhắn đã ghi: read p99, tombstones/read, write throughput"""
+    plt = _pyplot()
+    fig, axes = plt.subplots(1, 3, figsize=(18, 5))
+    fig.suptitle('Inbox Update: delete+insert vs state+recency', fontsize=16, fontweight='bold')
+    colors = {'delete+insert': '#e74c3c', 'state+recency': '#2ecc71'}
+
+    for name, rounds in data['history'].items():
+        x = [r['messages'] for r in rounds]
+        color = colors.get(name)
+        axes[0].plot(x, [r['read_p99'] for r in rounds], 'o-', color=color, linewidth=2, label=name)
+        axes[1].plot(x, [r['tombstones_per_read'] or 0 for r in rounds], 'o-', color=color,
+                     linewidth=2, label=f'{name} tombstones')
+        axes[1].plot(x, [r['live_rows_per_read'] or 0 for r in rounds], 's--', color=color,
+                     linewidth=1.5, label=f'{name} live rows')
+        axes[2].plot(x, [r['write_throughput'] for r in rounds], 'o-', color=color,
+                     linewidth=2, label=name)
+
+    titles = [('Latency (ms)', 'Inbox Read p99'),
+              ('Cells per read', 'Rows Scanned per Inbox Read (tracing)'),
+              ('Messages/s', 'Inbox Update Throughput')]
+    for ax, (ylabel, title) in zip(axes, titles):
+        ax.set_xlabel('Messages written', fontweight='bold')
+        ax.set_ylabel(ylabel, fontweight='bold')
+        ax.set_title(title)
+        ax.legend()
+        ax.grid(alpha=0.3)
+
+    plt.tight_layout()
+    save_figure(fig, path)
+
+# ============================================================================
+# BUCKETED MESSAGES
+# ============================================================================
+def print_bucketed_report(results):
+    """results: {thiết kế: {'write', 'latest', 'deep' (nếu có)}}"""
+    print(f"\n{'='*84}")
+    print("📊 SO SÁNH THIẾT KẾ BẢNG MESSAGES")
+    print(f"{'='*84}")
+    print(f"{'Design':<18} {'Write msg/s':>12} {'Write p99':>10} "
+          f"{'Latest p50':>11} {'Latest p99':>11} {'Deep p50':>9} {'Deep p99':>9} {'Q/page':>7}")
+    print(f"{'-'*84}")
+    for name, r in results.items():
+        deep = r.get('deep')
+        deep_cols = (f"{deep['p50']:>9.2f} {deep['p99']:>9.2f} {deep['queries_per_op']:>7.2f}"
+                     if deep else f"{'-':>9} {'-':>9} {'-':>7}")
+        print(f"{name:<18} {r['write']['throughput']:>12,.0f} {r['write']['p99']:>10.2f} "
+              f"{r['latest']['p50']:>11.2f} {r['latest']['p99']:>11.2f} {deep_cols}")
+    print(f"{'='*84}")
+
+def tables_bucketed(data):
+    print_bucketed_report(data['results'])
+
+def chart_bucketed(data, path):
+    """Biểu đồ: write throughput, latency trang mới nhất, latency deep-scroll"""
+    plt = _pyplot()
+    results = data['results']
+    names = list(results)
+    colors = ['#3498db', '#e67e22']
+    fig, axes = plt.subplots(1, 3, figsize=(18, 5))
+    fig.suptitle('Single-Partition vs Time-Bucketed Messages', fontsize=16, fontweight='bold')
+
+    throughputs = [results[n]['write']['throughput'] for n in names]
+    axes[0].bar(names, throughputs, color=colors, alpha=0.85)
+    axes[0].set_ylabel('Messages/s', fontweight='bold')
+    axes[0].set_title('Write Throughput')
+    for i, value in enumerate(throughputs):
+        axes[0].text(i, value, f'{value:,.0f}', ha='center', va='bottom', fontweight='bold')
+
+    for ax, scenario, title in [(axes[1], 'latest', 'Latest Page Latency'),
+                                (axes[2], 'deep', f"Deep-Scroll Latency (page ≥ {data['deep_min_page']})")]:
+        width = 0.35
+        for i, name in enumerate(names):
+            r = results[name].get(scenario)
+            if not r:
+                continue
+            ax.bar([0 + (i - 0.5) * width, 1 + (i - 0.5) * width], [r['p50'], r['p99']],
+                   width, label=name, color=colors[i], alpha=0.85)
+        ax.set_xticks([0, 1])
+        ax.set_xticklabels(['p50', 'p99'])
+        ax.set_ylabel('Latency (ms)', fontweight='bold')
+        ax.set_title(title)
+        ax.legend()
+
+    for ax in axes:
+        ax.grid(axis='y', alpha=0.3)
+
+    plt.tight_layout()
+    save_figure(fig, path)
+
+# ============================================================================
+# STALENESS (PBS)
+# ============================================================================
+def print_staleness_report(data):
+    """data: {'delays': [ms], 'results': {'W/R': [điểm theo delay]}}"""
+    results, delays = data['results'], data['delays']
+    width = 16 + 10 * len(delays)
+    print(f"\n{'='*width}")
+    print("📊 P(STALE) THEO DELAY SAU KHI WRITE ĐƯỢC ACK")
+    print(f"{'='*width}")
+    print(f"{'W/R':<16}" + ''.join(f"{f'{d}ms':>10}" for d in delays))
+    print(f"{'-'*width}")
+    for label, points in results.items():
+        print(f"{label:<16}" + ''.join(f"{p['p_stale']*100:>9.2f}%" for p in points))
+    print(f"{'='*width}")
+
+    print(f"\n🔍 PHÂN TÍCH (95% CI, Wilson):")
+    for label, points in results.items():
+        first = points[0]
+        # Delay nhỏ nhất mà từ đó trở đi không còn quan sát thấy stale read
+        settled = next((p for i, p in enumerate(points)
+                        if all(q['stale'] == 0 for q in points[i:])), None)
+        errors = sum(p['errors'] for p in points)
+        line = (f"   - {label}: {first['p_stale']*100:.2f}% stale ngay sau ack "
+                f"[{first['ci_low']*100:.2f}%, {first['ci_high']*100:.2f}%]")
+        if settled:
+            line += (f", không còn stale từ {settled['delay_ms']}ms "
+                     f"(P ≤ {settled['ci_high']*100:.2f}%)")
+        if errors:
+            line += f", {errors} probe lỗi (không tính)"
+        print(line)
+
+def tables_staleness(data):
+    print_staleness_report(data)
+
+def chart_staleness(data, path):
+    plt = _pyplot()
+    results, delays = data['results'], data['delays']
+    fig, ax = plt.subplots(figsize=(11, 6))
+    for label, points in results.items():
+        x = [max(p['delay_ms'], 0.5) for p in points]   # log scale: 0ms vẽ tại 0.5ms
+        y = [p['p_stale'] * 100 for p in points]
+        low = [(p['p_stale'] - p['ci_low']) * 100 for p in points]
+        high = [(p['ci_high'] - p['p_stale']) * 100 for p in points]
+        ax.errorbar(x, y, yerr=[low, high], marker='o', linewidth=2, capsize=4, label=label)
+
+    ax.set_xscale('log')
+    ax.set_xticks([max(d, 0.5) for d in delays])
+    ax.set_xticklabels([f'{d}' for d in delays])
+    ax.set_xlabel('Delay after write ack (ms)', fontweight='bold')
+    ax.set_ylabel('P(stale read) (%)', fontweight='bold')
+    ax.set_title('Probabilistically Bounded Staleness by (W, R) Pair', fontsize=14, fontweight='bold')
+    ax.legend()
+    ax.grid(alpha=0.3)
+
+    plt.tight_layout()
+    save_figure(fig, path)
+
+# ============================================================================
+# SATURATION SEARCH
+# ============================================================================
+def print_saturation_report(data):
+    """Đường cong throughput-latency theo rate và con số capacity"""
+    slo_p99_ms, best = data['slo_p99_ms'], data['best']
+    print(f"\n{'='*60}")
+    print("📊 THROUGHPUT-LATENCY CURVE")
+    print(f"{'='*60}")
+    print(f"{'Offered':>12} {'Achieved':>12} {'p50 (ms)':>10} {'p99 (ms)':>10} {'Errors':>8}  SLO")
+    for step in sorted(data['steps'], key=lambda s: s['offered_rate']):
+        print(f"{step['offered_rate']:>12,.0f} {step['throughput']:>12,.0f} "
+              f"{step['p50']:>10.1f} {step['p99']:>10.1f} "
+              f"{step['error_rate']*100:>7.2f}%  {'✅' if step['passed'] else '❌'}")
+
+    if best:
+        print(f"\n🎯 CAPACITY: {best['throughput']:,.0f} msgs/s với p99 {best['p99']:.1f}ms "
+              f"< {slo_p99_ms:.0f}ms")
+    else:
+        print(f"\n❌ Không có bước nào đạt SLO p99 < {slo_p99_ms:.0f}ms "
+              f"(thử --start-rate nhỏ hơn)")
+
+def tables_saturation(data):
+    print_saturation_report(data)
+
+def chart_saturation(data, path):
+    """Offered vs achieved throughput và đường cong throughput-latency (PASS/FAIL theo SLO)"""
+    plt = _pyplot()
+    slo_p99_ms, best = data['slo_p99_ms'], data['best']
+    ordered = sorted(data['steps'], key=lambda s: s['offered_rate'])
+    fig, axes = plt.subplots(1, 2, figsize=(15, 6))
+    fig.suptitle(f'Saturation Search (SLO: p99 < {slo_p99_ms:.0f}ms)',
+                 fontsize=16, fontweight='bold')
+
+    ax1 = axes[0]
+    offered = [s['offered_rate'] for s in ordered]
+    ax1.plot(offered, [s['throughput'] for s in ordered], 'o-', color='#3498db',
+             linewidth=2, label='Achieved')
+    ax1.plot(offered, offered, '--', color='gray', alpha=0.6, label='Offered = achieved')
+    if best:
+        ax1.axhline(best['throughput'], color='#2ecc71', linestyle='--',
+                    label=f'Capacity: {best["throughput"]:,.0f} msgs/s')
+    ax1.set_xlabel('Offered rate (msgs/s)', fontweight='bold')
+    ax1.set_ylabel('Throughput (msgs/s)', fontweight='bold')
+    ax1.set_title('Offered vs Achieved Throughput')
+    ax1.legend()
+    ax1.grid(alpha=0.3)
+
+    ax2 = axes[1]
+    for passed, color, label in ((True, '#2ecc71', 'PASS'), (False, '#e74c3c', 'FAIL')):
+        points = [s for s in ordered if s['passed'] == passed]
+        ax2.scatter([s['throughput'] for s in points], [s['p99'] for s in points],
+                    color=color, s=60, label=label, zorder=3)
+    ax2.plot([s['throughput'] for s in ordered], [s['p99'] for s in ordered],
+             color='gray', alpha=0.4)
+    ax2.axhline(slo_p99_ms, color='red', linestyle='--', label=f'SLO {slo_p99_ms:.0f}ms')
+    ax2.set_xlabel('Throughput (msgs/s)', fontweight='bold')
+    ax2.set_ylabel('Latency p99 (ms)', fontweight='bold')
+    ax2.set_yscale('log')
+    ax2.set_title('Throughput-Latency Curve')
+    ax2.legend()
+    ax2.grid(alpha=0.3)
+
+    plt.tight_layout()
+    save_figure(fig, path)
+
+# ============================================================================
+# RETRY POLICY
+# ============================================================================
+def print_retry_policy_report(data):
+    """Availability, chi phí retry và rủi ro ghi trùng theo cấu hình (policy/statement)"""
+    results, timeline = data['results'], data['timeline']
+
+    def fmt(value, spec, suffix=''):
+        return f"{value:{spec}}{suffix}" if value is not None else '-'
+
+    print(f"\n{'='*100}")
+    print("📊 AVAILABILITY")
+    if 'fault' in timeline:
+        print(f"   Lỗi: {timeline['fault_description']} @ {timeline['fault']:.1f}s"
+              + (f", phục hồi: {timeline['recovery_description']} @ {timeline['recovery']:.1f}s"
+                 if 'recovery' in timeline else ''))
+    print(f"{'='*100}")
+    print(f"{'Config':<30} {'Ops':>8} {'Success':>9} {'Success(down)':>14} "
+          f"{'Goodput base':>13} {'Goodput down':>13} {'Kept':>7}")
+    print(f"{'-'*100}")
+    for name, r in results.items():
+        kept = (r['down_goodput'] / r['baseline_goodput'] * 100
+                if r['down_goodput'] is not None and r['baseline_goodput'] else None)
+        down_rate = r['down_success_rate'] * 100 if r['down_success_rate'] is not None else None
+        print(f"{name:<30} {r['ops']:>8,} {r['success_rate']*100:>8.2f}% {fmt(down_rate, '>13.2f', '%'):>14} "
+              f"{r['baseline_goodput']:>13,.0f} {fmt(r['down_goodput'], '>13,.0f'):>13} "
+              f"{fmt(kept, '>6.1f', '%'):>7}")
+
+    print(f"\n{'='*100}")
+    print("🔁 RETRY COST & DUPLICATE-WRITE RISK")
+    print(f"{'='*100}")
+    print(f"{'Config':<30} {'Retried':>8} {'Drv/App':>11} {'+p99 down':>10} {'+ms/retry':>10} "
+          f"{'Weakened':>9} {'Risky':>6} {'Dup':>5} {'Lost':>5} {'Fail->ok':>9}")
+    print(f"{'-'*100}")
+    for name, r in results.items():
+        print(f"{name:<30} {r['retried_ops']:>8,} {r['driver_retries']:>5}/{r['app_retries']:<5} "
+              f"{fmt(r['added_p99'], '>10.1f')} {fmt(r['retry_extra_latency'], '>10.1f')} "
+              f"{r['weakened']:>9} {r['risky_retries']:>6} {fmt(r.get('duplicates'), '>5')} "
+              f"{fmt(r.get('lost'), '>5')} {fmt(r.get('written_anyway'), '>9')}")
+    print(f"{'='*100}")
+    print("   Drv/App: retry do driver / do ứng dụng (bounded-backoff)")
+    print("   +p99 down: p99 khi node down trừ p99 baseline; +ms/retry: latency thêm của op có retry")
+    print("   Weakened: thành công nhờ hạ CL hoặc bỏ qua write timeout (không còn đảm bảo CL)")
+    print("   Risky: retry statement không idempotent sau write timeout / lỗi kết nối")
+    print("   Dup / Lost / Fail->ok: đọc lại: token có >1 dòng / thành công nhưng không có dòng "
+          "/ báo lỗi nhưng đã được ghi")
+
+    for name, r in results.items():
+        if r['errors']:
+            errors = ', '.join(f"{error}: {count}" for error, count in Counter(r['errors']).most_common())
+            print(f"   ❌ {name}: {errors}")
+        if r.get('verified_at') is None:
+            print(f"   ⚠️  {name}: không đọc lại được (cluster chưa sẵn sàng)")
+
+    safe = {name: r for name, r in results.items()
+            if not r['weakened'] and not r.get('duplicates') and not r.get('lost')}
+    if safe:
+        best = max(safe, key=lambda name: (safe[name]['down_goodput'] or 0, safe[name]['success_rate']))
+        print(f"\n🏆 Giữ throughput tốt nhất khi node down mà không ghi trùng / mất / hạ CL: {best}")
+
+def tables_retry_policy(data):
+    print_retry_policy_report(data)
+
+def chart_retry_policy(data, path):
+    """Goodput và tỷ lệ lỗi theo giây cho từng cấu hình, vạch dọc tại các lần tiêm lỗi"""
+    from fault_scheduler import RECOVERY_ACTIONS
+    plt = _pyplot()
+    fig, axes = plt.subplots(2, 1, figsize=(15, 10), sharex=True)
+    fig.suptitle('Retry Policy & Idempotence Under Node Failure', fontsize=16, fontweight='bold')
+
+    for name, series in data['series'].items():
+        seconds = [p['second'] for p in series]
+        style = '-' if data['results'][name]['idempotent'] else '--'
+        axes[0].plot(seconds, [p['ops'] - p['failures'] for p in series], style, linewidth=1.5,
+                     label=name)
+        axes[1].plot(seconds, [p['failures'] / p['ops'] * 100 if p['ops'] else 0 for p in series],
+                     style, linewidth=1.5, label=name)
+
+    axes[0].set_ylabel('Successful writes/s', fontweight='bold')
+    axes[0].set_title('Goodput per Configuration')
+    axes[1].set_ylabel('Failure Rate (%)', fontweight='bold')
+    axes[1].set_title('Failure Rate per Configuration')
+    axes[1].set_xlabel('Time (seconds)', fontweight='bold')
+    for ax in axes:
+        for event in data['faults']:
+            ax.axvline(x=event['fired'], color='green' if event['action'] in RECOVERY_ACTIONS else 'red',
+                       linestyle=':', linewidth=1.5, alpha=0.7)
+        ax.grid(alpha=0.3)
+        ax.legend(fontsize=8)
+
+    plt.tight_layout()
+    save_figure(fig, path)
+
+# ============================================================================
+# RENDER
+# ============================================================================
+# benchmark -> (in bảng, vẽ biểu đồ, tên file biểu đồ)
+RENDERERS = {
+    'benchmark': (tables_benchmark, chart_benchmark, 'concurrency_sweep.png'),
+    'consistency': (tables_consistency, chart_consistency, 'consistency_level_comparison.png'),
+    'fault_tolerance': (tables_fault_tolerance, chart_fault_tolerance, 'fault_tolerance_benchmark.png'),
+    'extreme_load': (tables_extreme_load, chart_extreme_load, 'extreme_load_benchmark.png'),
+    'table_options': (tables_table_options, chart_table_options, 'table_options.png'),
+    'speculative': (tables_speculative, chart_speculative, 'speculative_benchmark.png'),
+    'unread': (tables_unread, chart_unread, 'unread_benchmark.png'),
+    'inbox_update': (tables_inbox_update, chart_inbox_update, 'inbox_update_benchmark.png'),
+    'bucketed': (tables_bucketed, chart_bucketed, 'bucketed_comparison.png'),
+    'staleness': (tables_staleness, chart_staleness, 'staleness_benchmark.png'),
+    'saturation': (tables_saturation, chart_saturation, 'saturation_curve.png'),
+    'retry_policy': (tables_retry_policy, chart_retry_policy, 'retry_policy_benchmark.png'),
+}
+
+def render_artifact(artifact, output_dir='.', tables=True, charts=True, prefix=''):
+    """In bảng và/hoặc vẽ biểu đồ của 1 artifact (benchmark không có renderer: chỉ in summary)"""
+    renderer = RENDERERS.get(artifact['benchmark'])
+    if renderer is None:
+        if tables:
+            print_summary({'': artifact})
+        return
+    print_tables, draw_chart, filename = renderer
+    if tables:
+        print_tables(artifact['data'])
+    if charts:
+        os.makedirs(output_dir, exist_ok=True)
+        draw_chart(artifact['data'], os.path.join(output_dir, prefix + filename))
+
+def format_metric(value):
+    if value is None:
+        return '-'
+    if isinstance(value, float):
+        return f"{value:,.2f}"
+    return f"{value:,}"
+
+def print_summary(artifacts):
+    """Bảng summary: 1 cột cho mỗi artifact (tên -> artifact) của cùng benchmark"""
+    names = list(artifacts)
+    metrics = list(dict.fromkeys(m for a in artifacts.values() for m in a['summary']))
+    label_width = max([len(m) for m in metrics] + [6]) + 2
+    col_width = max([len(n) for n in names] + [12]) + 2
+    width = label_width + col_width * len(names)
+    benchmark = next(iter(artifacts.values()))['benchmark']
+    print(f"\n{'='*width}")
+    print(f"📊 SUMMARY - {benchmark.upper()}")
+    print(f"{'='*width}")
+    print(f"{'Metric':<{label_width}}" + ''.join(f"{n:>{col_width}}" for n in names))
+    print(f"{'-'*width}")
+    for metric in metrics:
+        print(f"{metric:<{label_width}}" + ''.join(
+            f"{format_metric(a['summary'].get(metric)):>{col_width}}" for a in artifacts.values()))
+    print(f"{'='*width}")
+
+def artifact_name(path):
+    """run1/consistency_results.json -> run1_consistency (phân biệt artifact trùng tên file)"""
+    stem = os.path.splitext(os.path.basename(path))[0].replace('_results', '')
+    parent = os.path.basename(os.path.dirname(os.path.abspath(path)))
+    return f"{parent}_{stem}"
+
+def main():
+    parser = argparse.ArgumentParser(description='Dựng bảng và biểu đồ từ artifact JSON của benchmark')
+    parser.add_argument('artifacts', nargs='+', help='File *_results.json')
+    parser.add_argument('--output-dir', default='.', help='Thư mục lưu biểu đồ')
+    parser.add_argument('--tables-only', action='store_true', help='Chỉ in bảng, không vẽ')
+    args = parser.parse_args()
+
+    loaded = [(path, load_results(path)) for path in args.artifacts]
+    compare = len(loaded) > 1
+    for path, artifact in loaded:
+        metadata = artifact['metadata']
+        print(f"\n📄 {path}: {artifact['benchmark']} @ {metadata['created_at']} "
+              f"(commit {metadata.get('git_commit') or '-'}, {metadata['command']})")
+        render_artifact(artifact, args.output_dir, charts=not args.tables_only,
+                        prefix=f"{artifact_name(path)}_" if compare else '')
+
+    if compare:
+        by_benchmark = {}
+        for path, artifact in loaded:
+            by_benchmark.setdefault(artifact['benchmark'], {})[artifact_name(path)] = artifact
+        for artifacts in by_benchmark.values():
+            print_summary(artifacts)
+
+if __name__ == "__main__":
+    main()
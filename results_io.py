@@ -0,0 +1,101 @@
+"""
+Results IO - File kết quả (artifact) JSON gọn cho mỗi lần chạy benchmark
+Artifact = metadata của lần chạy + summary (metric phẳng để so sánh giữa các lần chạy)
++ data (bảng, chuỗi thời gian, histogram đã gom nhóm - không chứa latency thô).
+Benchmark ghi artifact TRƯỚC khi vẽ, nên lỗi khi vẽ không làm mất dữ liệu; biểu đồ
+và bảng được dựng lại từ artifact bằng report.py.
+
+Module này chỉ dùng thư viện chuẩn (không import numpy/matplotlib).
+"""
+
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+from datetime import datetime
+
+ARTIFACT_FORMAT = 1
+
+def default_results_path(benchmark):
+    return f"{benchmark}_results.json"
+
+def add_results_arguments(parser, benchmark):
+    """--results PATH và --no-report cho CLI của benchmark"""
+    parser.add_argument('--results', default=default_results_path(benchmark), metavar='PATH',
+                        help='File JSON kết quả (artifact) cho report.py')
+    parser.add_argument('--no-report', action='store_true',
+                        help='Chỉ ghi artifact, không vẽ biểu đồ (chạy sau bằng report.py)')
+
+def git_commit():
+    try:
+        output = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                                text=True, timeout=5, cwd=os.path.dirname(os.path.abspath(__file__)))
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return output.stdout.strip() or None
+
+def run_metadata(benchmark, args=None, **extra):
+    """Thông tin lần chạy: thời điểm, lệnh, máy, commit và tham số CLI"""
+    metadata = {
+        'benchmark': benchmark,
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'command': ' '.join([os.path.basename(sys.argv[0])] + sys.argv[1:]),
+        'host': socket.gethostname(),
+        'python': platform.python_version(),
+        'git_commit': git_commit(),
+    }
+    if args is not None:
+        metadata['args'] = {key: value for key, value in vars(args).items()
+                            if key not in ('results', 'no_report')}
+    metadata.update(extra)
+    return metadata
+
+def _to_json(value):
+    """Giá trị không chuẩn JSON: ndarray/numpy scalar (tolist), tuple key đã xử lý ở nơi gọi"""
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    if isinstance(value, (set, frozenset)):
+        return sorted(value)
+    return str(value)
+
+def save_results(path, benchmark, summary, data, args=None, **metadata):
+    """
+    Ghi artifact (ghi file tạm rồi rename để không để lại file hỏng).
+    summary: {tên metric: số}; data: dữ liệu cho report.py (JSON được)
+    """
+    artifact = {
+        'format': ARTIFACT_FORMAT,
+        'benchmark': benchmark,
+        'metadata': run_metadata(benchmark, args, **metadata),
+        'summary': summary,
+        'data': data,
+    }
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w') as f:
+        json.dump(artifact, f, indent=1, default=_to_json)
+    os.replace(temp_path, path)
+    print(f"💾 Kết quả đã lưu: {path}")
+    return path
+
+def load_results(path):
+    with open(path) as f:
+        artifact = json.load(f)
+    if artifact.get('format') != ARTIFACT_FORMAT:
+        raise ValueError(f"{path}: artifact format {artifact.get('format')} không được hỗ trợ")
+    return artifact
+
+def render_after_run(path, no_report=False):
+    """Vẽ biểu đồ từ artifact vừa ghi (import report/matplotlib chỉ lúc này); lỗi không làm hỏng run"""
+    if no_report:
+        print(f"📄 Vẽ biểu đồ sau: python3 report.py {path}")
+        return
+    try:
+        from report import render_artifact
+        render_artifact(load_results(path), tables=False)
+    except Exception as e:
+        print(f"⚠️  Không vẽ được biểu đồ ({type(e).__name__}: {e}); "
+              f"dữ liệu vẫn ở {path}, chạy lại: python3 report.py {path}")
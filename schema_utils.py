@@ -0,0 +1,99 @@
+"""
+Schema Utils - Đọc schema.cql để các script lấy danh sách bảng, partition key
+và clustering key thay vì hard-code tên bảng.
+"""
+
+import os
+import re
+
+SCHEMA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'schema.cql')
+
+def _strip_comments(cql):
+    """Bỏ comment '-- ...' và '// ...' (schema không dùng chuỗi chứa '--')"""
+    return re.sub(r'(--|//)[^\n]*', '', cql)
+
+def _split_top_level(text, sep=','):
+    """Tách theo sep nhưng bỏ qua các sep nằm trong ngoặc hoặc <...>"""
+    parts, depth, current = [], 0, []
+    for ch in text:
+        if ch in '(<':
+            depth += 1
+        elif ch in ')>':
+            depth -= 1
+        if ch == sep and depth == 0:
+            parts.append(''.join(current).strip())
+            current = []
+        else:
+            current.append(ch)
+    if ''.join(current).strip():
+        parts.append(''.join(current).strip())
+    return parts
+
+def _parse_primary_key(definition):
+    """'((a, b), c, d)' hoặc '(a, c)' -> (['a', 'b'], ['c', 'd'])"""
+    inner = definition.strip()[1:-1]
+    parts = _split_top_level(inner)
+    partition = parts[0]
+    if partition.startswith('('):
+        partition_key = [p.strip() for p in partition[1:-1].split(',')]
+    else:
+        partition_key = [partition.strip()]
+    return partition_key, [p.strip() for p in parts[1:]]
+
+def _parse_table(statement):
+    """Phân tích 1 câu CREATE TABLE thành dict mô tả bảng"""
+    header = re.match(r'\s*CREATE\s+TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?([\w.]+)\s*\(',
+                      statement, re.IGNORECASE)
+    name = header.group(1).split('.')[-1]
+
+    # Tìm ngoặc đóng tương ứng với ngoặc mở sau tên bảng
+    depth, start = 0, header.end() - 1
+    for end in range(start, len(statement)):
+        if statement[end] == '(':
+            depth += 1
+        elif statement[end] == ')':
+            depth -= 1
+            if depth == 0:
+                break
+    body, options = statement[start + 1:end], statement[end + 1:].strip()
+
+    columns, partition_key, clustering_key = {}, [], []
+    for item in _split_top_level(body):
+        pk = re.match(r'PRIMARY\s+KEY\s*(\(.*\))\s*$', item, re.IGNORECASE | re.DOTALL)
+        if pk:
+            partition_key, clustering_key = _parse_primary_key(pk.group(1))
+            continue
+        column = re.match(r'(\w+)\s+(.+?)(\s+PRIMARY\s+KEY)?\s*$', item, re.IGNORECASE | re.DOTALL)
+        columns[column.group(1)] = ' '.join(column.group(2).split())
+        if column.group(3):
+            partition_key = [column.group(1)]
+
+    return {
+        'name': name,
+        'columns': columns,
+        'partition_key': partition_key,
+        'clustering_key': clustering_key,
+        'options': re.sub(r'^WITH\s+', '', options, flags=re.IGNORECASE),
+    }
+
+def load_tables(path=SCHEMA_PATH):
+    """Danh sách bảng (theo thứ tự trong file) với columns, partition/clustering key"""
+    with open(path, encoding='utf-8') as f:
+        cql = _strip_comments(f.read())
+
+    return [
+        _parse_table(statement)
+        for statement in cql.split(';')
+        if re.match(r'\s*CREATE\s+TABLE', statement, re.IGNORECASE)
+    ]
+
+def load_keyspace(path=SCHEMA_PATH):
+    """Tên keyspace trong câu CREATE KEYSPACE đầu tiên"""
+    with open(path, encoding='utf-8') as f:
+        cql = _strip_comments(f.read())
+    match = re.search(r'CREATE\s+KEYSPACE\s+(?:IF\s+NOT\s+EXISTS\s+)?(\w+)', cql, re.IGNORECASE)
+    return match.group(1) if match else None
+
+def token_expression(table):
+    """Biểu thức token(...) theo partition key của bảng"""
+    return f"token({', '.join(table['partition_key'])})"
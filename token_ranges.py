@@ -0,0 +1,160 @@
+"""
+Token Ranges - Chia token ring (Murmur3Partitioner) và lấy mẫu partition key
+phân tán đều trên toàn ring, dùng chung cho mọi benchmark.
+scan_token_ranges: chạy 1 query trên từng khoảng token song song (đếm, profile...).
+
+Vì sao: `SELECT ... LIMIT 500` luôn trả về các partition có token nhỏ nhất,
+nên toàn bộ tải rơi vào một góc của ring (một replica set). Ở đây ring được
+chia thành nhiều khoảng đều nhau, mỗi khoảng lấy vài key, chạy song song.
+"""
+
+import asyncio
+import functools
+import math
+import random
+import time
+
+from cassandra.concurrent import execute_concurrent_with_args
+from concurrency_control import InFlightLimiter, fetch_all_rows
+
+# Murmur3Partitioner: token nằm trong [-2^63, 2^63 - 1]
+MIN_TOKEN = -2**63
+MAX_TOKEN = 2**63 - 1
+RING_SIZE = 2**64
+
+def split_token_ring(num_ranges, offset=None):
+    """
+    Chia ring thành num_ranges khoảng (start, end] liên tiếp, phủ toàn bộ ring.
+    offset: dịch toàn bộ ranh giới (mặc định ngẫu nhiên) để mỗi lần lấy mẫu
+    không luôn bắt đầu ở cùng token. Khoảng vắt qua MAX_TOKEN được tách đôi.
+    """
+    if offset is None:
+        offset = random.randrange(RING_SIZE // num_ranges)
+    width = RING_SIZE // num_ranges
+
+    ranges = []
+    for i in range(num_ranges):
+        start = MIN_TOKEN + offset + i * width
+        end = start + width if i < num_ranges - 1 else MIN_TOKEN + offset + RING_SIZE
+        if end <= MAX_TOKEN:
+            ranges.append((start, end))
+        elif start >= MAX_TOKEN:
+            ranges.append((start - RING_SIZE, end - RING_SIZE))
+        else:
+            ranges.append((start, MAX_TOKEN))
+            if end - RING_SIZE > MIN_TOKEN:
+                ranges.append((MIN_TOKEN, end - RING_SIZE))
+    return ranges
+
+def sample_partition_keys(session, table, key_column, n, num_ranges=None,
+                          oversample=2, concurrency=32):
+    """
+    Lấy n partition key phân tán đều trên ring từ `table`.
+    Mỗi khoảng token lấy ceil(n * oversample / num_ranges) key (DISTINCT), sau đó
+    chọn ngẫu nhiên n key để khoảng nhiều dữ liệu không lấn át khoảng ít.
+    """
+    if num_ranges is None:
+        num_ranges = max(16, min(1024, n // 4))
+    per_range = max(1, math.ceil(n * oversample / num_ranges))
+
+    statement = session.prepare(
+        f"SELECT DISTINCT {key_column} FROM {table} "
+        f"WHERE token({key_column}) > ? AND token({key_column}) <= ? LIMIT ?"
+    )
+    params = [(start, end, per_range) for start, end in split_token_ring(num_ranges)]
+    results = execute_concurrent_with_args(
+        session, statement, params, concurrency=concurrency, raise_on_first_error=False
+    )
+
+    keys = []
+    failed = 0
+    for success, rows in results:
+        if not success:
+            failed += 1
+            continue
+        keys.extend(getattr(row, key_column) for row in rows)
+
+    if failed:
+        print(f"   ⚠️  {failed}/{len(params)} token ranges của {table} bị lỗi khi lấy mẫu")
+
+    random.shuffle(keys)
+    return keys[:n]
+
+def get_sample_data(session, num_users=100, num_conversations=100):
+    """
+    Lấy mẫu user IDs (users_by_id) và conversation IDs (members_by_conversation,
+    partition key là conversation_id nên không cần khử trùng lặp)
+    """
+    user_ids = sample_partition_keys(session, 'users_by_id', 'user_id', num_users)
+    conversation_ids = sample_partition_keys(
+        session, 'members_by_conversation', 'conversation_id', num_conversations
+    )
+    return user_ids, conversation_ids
+
+# ============================================================================
+# PARALLEL RANGE SCAN
+# ============================================================================
+def split_range(start, end):
+    """Tách khoảng (start, end] thành 2 nửa; trả về [] nếu không thể tách"""
+    middle = start + (end - start) // 2
+    if middle <= start or middle >= end:
+        return []
+    return [(start, middle), (middle, end)]
+
+async def scan_token_ranges(session, statement, handle_rows, num_ranges=256,
+                            concurrency=32, max_retries=3, max_splits=4,
+                            report_interval=5.0, label=''):
+    """
+    Chạy prepared statement có tham số (start, end) trên num_ranges khoảng token,
+    tối đa concurrency request in-flight. handle_rows(start, end, rows) được gọi
+    với toàn bộ rows (đủ mọi trang) của mỗi khoảng thành công và trả về số row
+    dữ liệu đã xử lý (để in tiến độ).
+    Khoảng lỗi được thử lại với backoff; hết max_retries lần thì tách đôi và quét
+    từng nửa (tối đa max_splits lần) vì khoảng nhỏ hơn ít bị timeout hơn.
+    Trả về danh sách khoảng vẫn lỗi sau cùng (rỗng nếu quét đủ ring).
+    """
+    ranges = split_token_ring(num_ranges)
+    limiter = InFlightLimiter(concurrency)
+    state = {'covered': 0, 'rows': 0, 'retries': 0, 'splits': 0, 'failed': []}
+    start_time = time.time()
+    last_report = [start_time]
+
+    def report(force=False):
+        now = time.time()
+        if not force and now - last_report[0] < report_interval:
+            return
+        last_report[0] = now
+        elapsed = now - start_time
+        print(f"   ⏳ {label} {state['covered'] / RING_SIZE * 100:5.1f}% ring | "
+              f"{state['rows']:,} rows | {elapsed:.0f}s | "
+              f"retry {state['retries']} | split {state['splits']}")
+
+    async def scan_range(start, end, depth=0):
+        for attempt in range(max_retries + 1):
+            try:
+                rows = await fetch_all_rows(session.execute_async(statement, (start, end)))
+            except Exception as e:
+                error = e
+                if attempt < max_retries:
+                    state['retries'] += 1
+                    await asyncio.sleep(min(2.0, 0.1 * 2 ** attempt) * random.uniform(0.5, 1.0))
+                continue
+            state['rows'] += handle_rows(start, end, rows) or 0
+            state['covered'] += end - start
+            report()
+            return
+
+        halves = split_range(start, end) if depth < max_splits else []
+        if not halves:
+            state['failed'].append((start, end, error))
+            print(f"   ❌ {label} khoảng ({start}, {end}] lỗi: {error}")
+            return
+        state['splits'] += 1
+        for half_start, half_end in halves:
+            await scan_range(half_start, half_end, depth + 1)
+
+    for start, end in ranges:
+        await limiter.submit(functools.partial(scan_range, start, end))
+    await limiter.drain()
+    report(force=True)
+    return state['failed']
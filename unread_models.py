@@ -0,0 +1,160 @@
+"""
+Unread Models - 3 cách theo dõi số tin nhắn chưa đọc
+- ReadModifyWriteUnread: unread_count int trong conversation_state_by_user,
+  mỗi tin nhắn đọc giá trị rồi ghi +1 cho từng member (không atomic, mất cập nhật)
+- CounterUnread: unread_counters_by_user (counter), +1 không cần đọc trước;
+  reset khi mở conversation = đọc rồi trừ đi giá trị hiện tại
+- WatermarkUnread: last_read_by_user lưu message_id đã đọc cuối cùng; gửi tin
+  không fan-out, số chưa đọc đếm từ messages_by_conversation khi hiển thị
+
+Mọi mô hình đều ghi message vào messages_by_conversation khi gửi, để so sánh
+chi phí của cả thao tác "gửi tin" chứ không chỉ phần unread.
+"""
+
+import asyncio
+
+from concurrency_control import wait_for_response
+
+UNREAD_CAP = 100   # Watermark: đếm tối đa 100 tin (hiển thị "99+")
+
+def first_row(rows):
+    """Row đầu tiên (callback của driver trả về list rows, không phải ResultSet)"""
+    return rows[0] if rows else None
+
+class UnreadModel:
+    """
+    Phần chung: ghi message và đếm số request. Mỗi mô hình có:
+    - on_send(convo, sender, message_id, text): ghi tin mới; người gửi về 0, member khác +1
+    - on_open(user_id, convo, latest_message_id): user mở conversation, đánh dấu đã đọc hết
+    - badge(user_id, convo): số tin chưa đọc hiển thị trên inbox
+    """
+
+    def __init__(self, session):
+        self.session = session
+        self.requests = 0
+        self._insert_message = session.prepare(
+            "INSERT INTO messages_by_conversation "
+            "(conversation_id, message_id, sender_id, sender_username, text_content, attachments) "
+            "VALUES (?, ?, ?, ?, ?, ?)"
+        )
+
+    async def _execute(self, statement, params):
+        self.requests += 1
+        return await wait_for_response(self.session.execute_async(statement, params))
+
+    async def _write_message(self, convo, sender, message_id, text):
+        await self._execute(self._insert_message, (
+            convo['conversation_id'], message_id, sender['user_id'], sender['username'], text, []
+        ))
+
+class ReadModifyWriteUnread(UnreadModel):
+    name = 'read-modify-write'
+
+    def __init__(self, session):
+        super().__init__(session)
+        self._read = session.prepare(
+            "SELECT unread_count FROM conversation_state_by_user "
+            "WHERE user_id = ? AND conversation_id = ?"
+        )
+        self._write = session.prepare(
+            "UPDATE conversation_state_by_user SET unread_count = ? "
+            "WHERE user_id = ? AND conversation_id = ?"
+        )
+
+    async def _increment(self, user_id, conversation_id):
+        row = first_row(await self._execute(self._read, (user_id, conversation_id)))
+        current = row.unread_count if row and row.unread_count is not None else 0
+        await self._execute(self._write, (current + 1, user_id, conversation_id))
+
+    async def on_send(self, convo, sender, message_id, text):
+        await asyncio.gather(
+            self._write_message(convo, sender, message_id, text),
+            self._execute(self._write, (0, sender['user_id'], convo['conversation_id'])),
+            *(self._increment(m['user_id'], convo['conversation_id'])
+              for m in convo['members'] if m['user_id'] != sender['user_id'])
+        )
+
+    async def on_open(self, user_id, convo, latest_message_id):
+        await self._execute(self._write, (0, user_id, convo['conversation_id']))
+
+    async def badge(self, user_id, convo):
+        row = first_row(await self._execute(self._read, (user_id, convo['conversation_id'])))
+        return row.unread_count if row and row.unread_count is not None else 0
+
+class CounterUnread(UnreadModel):
+    name = 'counter'
+
+    def __init__(self, session):
+        super().__init__(session)
+        self._read = session.prepare(
+            "SELECT unread FROM unread_counters_by_user WHERE user_id = ? AND conversation_id = ?"
+        )
+        self._add = session.prepare(
+            "UPDATE unread_counters_by_user SET unread = unread + ? "
+            "WHERE user_id = ? AND conversation_id = ?"
+        )
+
+    async def _reset(self, user_id, conversation_id):
+        # Counter không SET được: đọc rồi trừ (tin đến giữa 2 bước vẫn được giữ lại)
+        row = first_row(await self._execute(self._read, (user_id, conversation_id)))
+        if row and row.unread:
+            await self._execute(self._add, (-row.unread, user_id, conversation_id))
+
+    async def on_send(self, convo, sender, message_id, text):
+        await asyncio.gather(
+            self._write_message(convo, sender, message_id, text),
+            self._reset(sender['user_id'], convo['conversation_id']),
+            *(self._execute(self._add, (1, m['user_id'], convo['conversation_id']))
+              for m in convo['members'] if m['user_id'] != sender['user_id'])
+        )
+
+    async def on_open(self, user_id, convo, latest_message_id):
+        await self._reset(user_id, convo['conversation_id'])
+
+    async def badge(self, user_id, convo):
+        row = first_row(await self._execute(self._read, (user_id, convo['conversation_id'])))
+        return row.unread if row and row.unread else 0
+
+class WatermarkUnread(UnreadModel):
+    name = 'last-read watermark'
+
+    def __init__(self, session):
+        super().__init__(session)
+        self._read_watermark = session.prepare(
+            "SELECT last_read_message_id FROM last_read_by_user "
+            "WHERE user_id = ? AND conversation_id = ?"
+        )
+        self._write_watermark = session.prepare(
+            "UPDATE last_read_by_user SET last_read_message_id = ? "
+            "WHERE user_id = ? AND conversation_id = ?"
+        )
+        self._messages_after = session.prepare(
+            "SELECT message_id FROM messages_by_conversation "
+            "WHERE conversation_id = ? AND message_id > ? LIMIT ?"
+        )
+        self._messages = session.prepare(
+            "SELECT message_id FROM messages_by_conversation WHERE conversation_id = ? LIMIT ?"
+        )
+
+    async def on_send(self, convo, sender, message_id, text):
+        # Chỉ người gửi cập nhật watermark; không fan-out tới các member khác
+        await asyncio.gather(
+            self._write_message(convo, sender, message_id, text),
+            self._execute(self._write_watermark,
+                          (message_id, sender['user_id'], convo['conversation_id']))
+        )
+
+    async def on_open(self, user_id, convo, latest_message_id):
+        if latest_message_id is not None:
+            await self._execute(self._write_watermark,
+                                (latest_message_id, user_id, convo['conversation_id']))
+
+    async def badge(self, user_id, convo):
+        conversation_id = convo['conversation_id']
+        row = first_row(await self._execute(self._read_watermark, (user_id, conversation_id)))
+        if row and row.last_read_message_id:
+            rows = await self._execute(self._messages_after,
+                                       (conversation_id, row.last_read_message_id, UNREAD_CAP))
+        else:
+            rows = await self._execute(self._messages, (conversation_id, UNREAD_CAP))
+        return len(rows)
@@ -0,0 +1,161 @@
+"""
+Workload Manifest - File nhị phân chứa toàn bộ IDs do data_generator.py tạo ra
+để benchmark/worker khởi động ngay (mmap) thay vì query Cassandra lấy mẫu.
+
+Layout (little-endian, mọi section căn theo 16 bytes):
+  Header (96 bytes):
+    magic 'CHATWLM1' | version u32 | reserved u32
+    num_users u64 | num_conversations u64 | num_member_refs u64 | created_at u64 (epoch s)
+    keyspace (48 bytes - độ dài tối đa tên keyspace, utf-8, đệm \\0)
+  user_ids:          num_users x 16 bytes (UUID.bytes)
+  conversation_ids:  num_conversations x 16 bytes
+  member_offsets:    (num_conversations + 1) x u64 - vị trí trong member_refs
+  member_refs:       num_member_refs x u32 - index vào user_ids
+  message_counts:    num_conversations x u32 - số tin nhắn đã seed mỗi conversation
+"""
+
+import mmap
+import os
+import struct
+import time
+import uuid
+
+from token_ranges import get_sample_data as sample_by_token_range
+
+MAGIC = b'CHATWLM1'
+VERSION = 1
+HEADER = struct.Struct('<8sII4Q48s')
+HEADER_SIZE = 96
+assert HEADER.size == HEADER_SIZE
+DEFAULT_MANIFEST_PATH = os.getenv('WORKLOAD_MANIFEST', 'workload_manifest.bin')
+
+def _align(offset, alignment=16):
+    return (offset + alignment - 1) // alignment * alignment
+
+def _section_offsets(num_users, num_conversations, num_member_refs):
+    """Vị trí bắt đầu của từng section trong file"""
+    users = HEADER_SIZE
+    conversations = _align(users + 16 * num_users)
+    offsets = _align(conversations + 16 * num_conversations)
+    refs = _align(offsets + 8 * (num_conversations + 1))
+    counts = _align(refs + 4 * num_member_refs)
+    end = counts + 4 * num_conversations
+    return users, conversations, offsets, refs, counts, end
+
+# ============================================================================
+# WRITE
+# ============================================================================
+def write_manifest(path, users, conversations, keyspace):
+    """
+    Ghi manifest từ list users/conversations của data_generator.py.
+    Ghi ra file tạm rồi rename để benchmark đang đọc không thấy file dở dang.
+    """
+    user_index = {user['user_id']: i for i, user in enumerate(users)}
+    num_member_refs = sum(len(convo['members']) for convo in conversations)
+    sections = _section_offsets(len(users), len(conversations), num_member_refs)
+    users_at, convos_at, offsets_at, refs_at, counts_at, end = sections
+
+    buf = bytearray(end)
+    HEADER.pack_into(buf, 0, MAGIC, VERSION, 0, len(users), len(conversations),
+                     num_member_refs, int(time.time()),
+                     keyspace.encode('utf-8')[:48])
+
+    for i, user in enumerate(users):
+        buf[users_at + 16 * i:users_at + 16 * (i + 1)] = user['user_id'].bytes
+
+    ref = 0
+    for i, convo in enumerate(conversations):
+        buf[convos_at + 16 * i:convos_at + 16 * (i + 1)] = convo['conversation_id'].bytes
+        struct.pack_into('<Q', buf, offsets_at + 8 * i, ref)
+        for member in convo['members']:
+            struct.pack_into('<I', buf, refs_at + 4 * ref, user_index[member['user_id']])
+            ref += 1
+        struct.pack_into('<I', buf, counts_at + 4 * i, convo.get('message_count', 0))
+    struct.pack_into('<Q', buf, offsets_at + 8 * len(conversations), ref)
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(buf)
+    os.replace(tmp_path, path)
+    return end
+
+# ============================================================================
+# READ
+# ============================================================================
+class UUIDArray:
+    """
+    Dãy UUID đọc trực tiếp từ mmap (16 bytes/phần tử), không copy toàn bộ.
+    Hỗ trợ len() và index nên dùng được với random.choice() như list.
+    """
+
+    def __init__(self, buffer, offset, count):
+        self._buffer = buffer
+        self._offset = offset
+        self._count = count
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError('UUIDArray index out of range')
+        start = self._offset + 16 * index
+        return uuid.UUID(bytes=bytes(self._buffer[start:start + 16]))
+
+class WorkloadManifest:
+    """Manifest đã mmap: truy cập IDs, thành viên và kích thước conversation"""
+
+    def __init__(self, path=DEFAULT_MANIFEST_PATH):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        (magic, version, _, num_users, num_conversations, num_member_refs,
+         created_at, keyspace) = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} không phải workload manifest v{VERSION}")
+
+        self.num_users = num_users
+        self.num_conversations = num_conversations
+        self.created_at = created_at
+        self.keyspace = keyspace.rstrip(b'\0').decode('utf-8')
+
+        (users_at, convos_at, self._offsets_at, self._refs_at,
+         self._counts_at, _) = _section_offsets(num_users, num_conversations, num_member_refs)
+        self.user_ids = UUIDArray(self._mmap, users_at, num_users)
+        self.conversation_ids = UUIDArray(self._mmap, convos_at, num_conversations)
+
+    def conversation_members(self, index):
+        """User IDs của conversation thứ index"""
+        start, end = struct.unpack_from('<2Q', self._mmap, self._offsets_at + 8 * index)
+        refs = struct.unpack_from(f'<{end - start}I', self._mmap, self._refs_at + 4 * start)
+        return [self.user_ids[ref] for ref in refs]
+
+    def message_count(self, index):
+        """Số tin nhắn đã seed trong conversation thứ index"""
+        return struct.unpack_from('<I', self._mmap, self._counts_at + 4 * index)[0]
+
+    def close(self):
+        self._mmap.close()
+
+def get_sample_data(session, num_users=100, num_conversations=100,
+                    manifest_path=DEFAULT_MANIFEST_PATH, keyspace=None):
+    """
+    IDs cho benchmark: toàn bộ keyspace từ manifest nếu có (và đúng keyspace),
+    ngược lại lấy mẫu num_users/num_conversations theo token range từ Cassandra.
+    """
+    if os.path.exists(manifest_path):
+        try:
+            manifest = WorkloadManifest(manifest_path)
+        except (OSError, ValueError) as e:
+            print(f"   ⚠️  Bỏ qua manifest {manifest_path}: {e}")
+        else:
+            if keyspace is None or manifest.keyspace == keyspace:
+                print(f"📋 Manifest {manifest_path}: {manifest.num_users:,} users, "
+                      f"{manifest.num_conversations:,} conversations")
+                return manifest.user_ids, manifest.conversation_ids
+            print(f"   ⚠️  Manifest thuộc keyspace '{manifest.keyspace}', bỏ qua")
+
+    return sample_by_token_range(session, num_users, num_conversations)